@@ -1,11 +1,22 @@
 # ! @file api/app.py
 
-from flask import Flask, render_template, request, session, redirect, url_for, jsonify, make_response
+from flask import Flask, Response, render_template, request, session, redirect, url_for, jsonify, make_response, stream_with_context
+from src.annotation import get_annotator
+from src.autocomplete import get_autocomplete_index
+from src.cache import response_cache, result_cache
+from src.config import (
+    ANNOTATE_MAX_LENGTH, HANJA_MAX_PAGE_SIZE, HANJA_PAGE_SIZE, LOOKUP_MAX_BODY_SIZE, LOOKUP_MAX_WORDS, LOOKUP_MAX_WORD_LENGTH, LOOKUP_QUERY_BATCH_SIZE,
+    MEMORY_STORE, RELATED_WORDS_MAX_PAGE_SIZE, RELATED_WORDS_PAGE_SIZE, SNAPSHOT_PATH, HTTP_MAX_AGE, HTTP_S_MAXAGE, RELEASE
+)
 from src.data_access import DataAccess
-from src.data_processing import DataProcessor
-from itertools import zip_longest
+from src.metrics import (
+    http_request_queries, http_request_seconds, render_metrics, request_queries, start_request, template_render_seconds
+)
 
+from functools import wraps
+import json
 import os
+import time
 
 # Get the absolute path for templates folder
 
@@ -16,10 +27,59 @@ app = Flask(
 )
 app.secret_key = os.urandom(12).hex()
 
-# Instantiate the classes and specify the path to the folder
-folder_path = "data/전체 내려받기_한국어기초사전_json_20250112"
-data_access = DataAccess()
-data_processor = DataProcessor(folder_path)
+LANGUAGES = ('fr', 'en')
+
+# Instantiate the classes, serving from the snapshot or from memory when configured
+if SNAPSHOT_PATH:
+    from src.snapshot import SnapshotDataAccess
+    data_access = SnapshotDataAccess(SNAPSHOT_PATH)
+elif MEMORY_STORE:
+    from src.memory_store import MemoryDataAccess
+    data_access = MemoryDataAccess()
+else:
+    data_access = DataAccess()
+
+@app.before_request
+def start_request_metrics():
+    """!
+    @brief Starts the clock and the statement counter of the request.
+    """
+    request.start_time = time.perf_counter()
+    start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    """!
+    @brief Records the latency and the number of SQL statements of the request.
+    For streamed responses, only the time before the first byte is counted.
+    """
+    start_time = getattr(request, 'start_time', None)
+    if start_time is not None:
+        # The rule, not the path, so /w/<word> is one route
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_seconds.observe(time.perf_counter() - start_time, route, request.method, response.status_code)
+        http_request_queries.observe(request_queries(), route)
+    return response
+
+def timed_render_template(template_name, **context):
+    """!
+    @brief Renders a template, recording the time spent.
+    @param template_name The name of the template.
+    @param context The variables of the template.
+    @return The rendered HTML.
+    """
+    start = time.perf_counter()
+    html = render_template(template_name, **context)
+    template_render_seconds.observe(time.perf_counter() - start, template_name)
+    return html
+
+def preferred_language():
+    """!
+    @brief Retrieves the language chosen by the user, from the session or else from the cookie.
+    @return A language of LANGUAGES, French when none or an unknown one was chosen.
+    """
+    language = session.get('language') or request.cookies.get('language')
+    return language if language in LANGUAGES else 'fr'
 
 @app.route('/')
 def index():
@@ -29,8 +89,8 @@ def index():
     """
     # Get the current language, default to English if not set
     # Try to retrieve the language from the session, otherwise from the cookie
-    language = session.get('language') or request.cookies.get('language', 'fr')  
-    return render_template('index.html', language=language, is_homepage=True)
+    language = preferred_language()
+    return timed_render_template('index.html', language=language, is_homepage=True)
 
 @app.route('/set_language', methods=['POST'])
 def set_language():
@@ -38,82 +98,314 @@ def set_language():
     @brief Set the user's preferred language and store it in the session and cookie.
     @return Redirect response to the index page.
     """
-    language = request.form['language']
+    language = request.form.get('language')
+    if language not in LANGUAGES:
+        language = 'fr'
     session['language'] = language  # Store the language in the session
     resp = make_response(redirect(url_for('index')))
     resp.set_cookie('language', language, max_age=30*24*60*60, secure=True, httponly=True)  # Store the language in the cookie (30 days)
     return resp
 
+def accepted_encoding():
+    """!
+    @brief Chooses the compression of the response from the Accept-Encoding header of the request.
+    @return "br", "gzip", or None for an uncompressed response.
+    """
+    best, best_quality = None, 0
+    for encoding in response_cache.encodings:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def cacheable(view):
+    """!
+    @brief Makes the responses of a GET route cacheable by browsers and by the CDN.
+    The strong ETag changes with the dataset generation (and the deployed release), so a request
+    carrying the current one gets an empty 304. Responses whose language comes from the session
+    or the cookie, and not from the `lang` parameter of the URL, are only cached by the browser.
+    The bodies are also kept in the response cache, keyed by path, arguments and language, with
+    their gzip and brotli encodings, so repeated requests are sent without rendering nor compressing.
+    Each encoding has its own ETag, suffixed with the encoding.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        generation = data_access.get_dataset_generation()
+        etag = '{}-{}'.format(generation, RELEASE)
+        etags = [etag] + ['{}-{}'.format(etag, encoding) for encoding in response_cache.encodings]
+        matched_etag = next((candidate for candidate in etags if request.if_none_match.contains(candidate)), None)
+        if matched_etag is not None:
+            response = make_response('', 304)
+            etag = matched_etag
+        elif not response_cache.max_size:
+            response = make_response(view(*args, **kwargs))
+        else:
+            language = request.args.get('lang') or preferred_language()
+            key = (request.path, tuple(sorted(request.args.items(multi=True))), language)
+            found, entry = response_cache.get(key, generation)
+            if found:
+                response = None
+            else:
+                start = time.perf_counter()
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    entry = response_cache.store(key, generation, response.get_data(), response.mimetype, time.perf_counter() - start)
+            if entry is not None:
+                encoding, body = response_cache.body(entry, accepted_encoding(), found)
+                response = Response(body, mimetype=entry.mimetype)
+                if encoding:
+                    response.headers['Content-Encoding'] = encoding
+                    etag = '{}-{}'.format(etag, encoding)
+            response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        if request.args.get('lang') in LANGUAGES:
+            response.headers['Cache-Control'] = 'public, max-age={}, s-maxage={}'.format(HTTP_MAX_AGE, HTTP_S_MAXAGE)
+        else:
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+        return response
+    return wrapper
+
 @app.route('/search', methods=['POST'])
 def search():
     """!
-    @brief Handle search requests and display results based on the searched word.
+    @brief Handle search requests by redirecting to the cacheable page of the searched word.
+    @return Redirect response to the page of the word in the current language.
+    """
+    language = preferred_language()
+    word_to_search = request.form['word'].replace(" ", "")
+    if not word_to_search:
+        return redirect(url_for('index'), code=303)
+    return redirect(url_for('word_page', word=word_to_search, lang=language), code=303)
+
+@app.route('/w/<word>')
+@cacheable
+def word_page(word):
+    """!
+    @brief Display results based on the searched word, in the language given by the `lang` parameter.
+    @param word The Korean word.
     @return Rendered HTML template with search results.
     """
-    language = session.get('language') or request.cookies.get('language', 'fr')  
-    if request.method == 'POST':
-        # Set text language based on the selected language
-        text_language = {
-            'def': "Définition", 
-            "lang": "Français", 
-            "load": "Recherche des mots liés...", 
-            "no_res": "Pas de résultats pour", 
-            "no_res_hanja": "Pas de hanja associé au mot", 
-            "no_related": "Aucun mot lié trouvé.", 
-            "err_load": "Erreur lors du chargement des données."
-        } if language == "fr" else {
-            'def': "Definition", 
-            "lang": "English", 
-            "load": "Loading related words...", 
-            "no_res": "No results found for", 
-            "no_res_hanja": "No hanja character linked to the word", 
-            "no_related": "No related words found.", 
-            "err_load": "Error while loading the data."
-        }
-        word_to_search = request.form['word'].replace(" ", "")
-        hanja_characters = data_access.get_hanja_for_word(word_to_search)
-        hanja_results = []
-        korean_results = []
-        combined_results = []
-        hanja_characters_list = []
-        if hanja_characters is None:
-            korean_results = data_access.get_word_by_korean(word_to_search, language)
-        else:
-            for h in hanja_characters : 
-                korean_results.extend(data_access.get_word_by_korean(word_to_search, language, h))
-                hanja_results.append(data_processor.reorder_hanja_results(data_access.get_hanja_meanings_for_word(word_to_search, h, language), h))
-                hanja_characters_list.append("".join(h))
-        combined_results = list(zip_longest(korean_results, hanja_results, hanja_characters_list, fillvalue=None))
+    language = request.args.get('lang')
+    if language not in LANGUAGES:
+        # Canonical URL, with the language in it
+        language = preferred_language()
+        return redirect(url_for('word_page', word=word, lang=language))
+    # Set text language based on the selected language
+    text_language = {
+        'def': "Définition", 
+        "lang": "Français", 
+        "load": "Recherche des mots liés...", 
+        "no_res": "Pas de résultats pour", 
+        "no_res_hanja": "Pas de hanja associé au mot", 
+        "no_related": "Aucun mot lié trouvé.", 
+        "more": "Plus de mots liés",
+        "err_load": "Erreur lors du chargement des données."
+    } if language == "fr" else {
+        'def': "Definition", 
+        "lang": "English", 
+        "load": "Loading related words...", 
+        "no_res": "No results found for", 
+        "no_res_hanja": "No hanja character linked to the word", 
+        "no_related": "No related words found.", 
+        "more": "More related words",
+        "err_load": "Error while loading the data."
+    }
+    word_to_search = word.replace(" ", "")
+    # Entries, ordered hanja meanings and hanja of the word, fetched in one query
+    combined_results = data_access.lookup_word(word_to_search, language)
 
-        return render_template('index.html', word=word_to_search, combined_results=combined_results, text_language=text_language, language=language, is_homepage=False)
+    return timed_render_template('index.html', word=word_to_search, combined_results=combined_results, text_language=text_language, language=language, is_homepage=False)
 
 @app.route('/related-words')
+@cacheable
 def related_words():
     """!
-    @brief Retrieve related words for a given Hanja character.
-    @return JSON response containing unique related words.
+    @brief Retrieve a page of related words for a given Hanja character.
+    Query parameters : `hanja` the character, `lang` the language of the definitions, `original_word` the word to leave out, `after` the cursor
+    of the previous page, `limit` the number of words of the page.
+    @return JSON response containing the unique related words of the page and the cursor of the next page.
     """
-    language = session.get('language') or request.cookies.get('language', 'fr')  
+    language = request.args.get('lang') or preferred_language()
     hanja_character = request.args.get('hanja')
     original_word = request.args.get('original_word')  # Pass the original word from the client-side
-    
-    # Query the database for related words
-    related_words = data_access.get_related_words(hanja_character, language)
-    
-    # Filter duplicates by keeping only the first occurrence of each unique pair of Hanja
-    # Exclude the original word
-    seen_hanja_pairs = set()
-    unique_words = []
-    for word in related_words:
-        hanja = word['hanja']
-        korean_word = word['word']
-        
-        # Exclude the original word
-        if korean_word != original_word and hanja[:2] not in seen_hanja_pairs:
-            seen_hanja_pairs.add(hanja[:2])
-            unique_words.append(word)
-
-    return jsonify(unique_words)
+    after_id = max(request.args.get('after', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', RELATED_WORDS_PAGE_SIZE, type=int), 1), RELATED_WORDS_MAX_PAGE_SIZE)
+
+    # Query the database for the page, the duplicate pairs of Hanja and the original word are filtered by the query
+    return jsonify(data_access.get_related_words(hanja_character, language, original_word, after_id, limit))
+
+@app.route('/hanja/reading/<reading>')
+@cacheable
+def hanja_by_reading(reading):
+    """!
+    @brief List the hanja characters having a reading.
+    Query parameters : `lang` the language of the meanings.
+    @param reading The reading, a Hangul syllable like 가.
+    @return JSON response containing the characters with their gloss, stroke count, meaning and variant links.
+    """
+    language = request.args.get('lang') or preferred_language()
+    return jsonify({"reading": reading, "characters": data_access.get_hanja_by_reading(reading, language)})
+
+@app.route('/hanja/strokes')
+@cacheable
+def hanja_by_strokes():
+    """!
+    @brief Retrieve a page of the hanja characters written with a number of strokes in a range.
+    Query parameters : `min` and `max` the range of stroke counts (`max` is `min` by default), `lang` the language
+    of the meanings, `after` the cursor of the previous page, `limit` the number of characters of the page.
+    @return JSON response containing the characters of the page and the cursor of the next page.
+    """
+    language = request.args.get('lang') or preferred_language()
+    min_strokes = max(request.args.get('min', 1, type=int), 1)
+    max_strokes = request.args.get('max', min_strokes, type=int)
+    after = request.args.get('after') or None
+    limit = min(max(request.args.get('limit', HANJA_PAGE_SIZE, type=int), 1), HANJA_MAX_PAGE_SIZE)
+    return jsonify(data_access.get_hanja_by_strokes(min_strokes, max_strokes, language, after, limit))
+
+@app.route('/autocomplete')
+def autocomplete():
+    """!
+    @brief Suggest the words starting with the text typed in the search bar.
+    Query parameters : `q` the beginning of the word, `lang` the language of the lemmas, `limit` the number of words (10 by default).
+    @return JSON response containing the words and their lemma.
+    """
+    query = request.args.get('q', '').replace(" ", "")
+    language = request.args.get('lang') or preferred_language()
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    return jsonify(get_autocomplete_index(data_access).complete(query, language, limit))
+
+@app.route('/reverse-search')
+def reverse_search():
+    """!
+    @brief Find the Korean words from English or French words searched in their lemmas and definitions.
+    Query parameters : `q` the searched words, `lang` their language, `page` the page of results.
+    @return JSON response containing the ranked words of the page.
+    """
+    text = request.args.get('q', '')
+    language = request.args.get('lang') or preferred_language()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 50)
+    return jsonify(data_access.reverse_search(text, language, page, per_page))
+
+def lookup_entry_to_dict(entry, hanja_meanings, hanja):
+    """!
+    @brief Converts an entry returned by lookup_word to its JSON form.
+    @return A dictionary with the hanja, glossary, lemma, definition, pronounciation, senses and hanja meanings of the entry.
+    """
+    glossary, lemma, definition, pronounciation, senses = entry
+    return {
+        "hanja": hanja,
+        "glossary": glossary,
+        "lemma": lemma,
+        "definition": definition,
+        "pronounciation": pronounciation,
+        "senses": [
+            {"glossary": sense_glossary, "lemma": sense_lemma, "definition": sense_definition}
+            for sense_glossary, sense_lemma, sense_definition in senses
+        ],
+        "hanja_meanings": [
+            {"character": character, "korean": korean, "meaning": meaning}
+            for character, korean, meaning in (hanja_meanings or [])
+        ],
+    }
+
+@app.route('/api/lookup', methods=['POST'])
+def api_lookup():
+    """!
+    @brief Look up a list of words at once, for example to annotate a vocabulary list.
+    The JSON body is {"words": [...], "lang": "fr" | "en"}, or directly the list of words.
+    @return JSON response {"language": ..., "results": [{"word": ..., "found": ..., "entries": [...]}, ...]},
+            in the order of the request, streamed by batches of words.
+    """
+    if request.content_length is None:
+        return jsonify(error="The request must have a Content-Length."), 411
+    if request.content_length > LOOKUP_MAX_BODY_SIZE:
+        return jsonify(error="The request body must be JSON of at most {} bytes.".format(LOOKUP_MAX_BODY_SIZE)), 413
+    payload = request.get_json(silent=True)
+    if isinstance(payload, list):
+        payload = {"words": payload}
+    words = payload.get("words") if isinstance(payload, dict) else None
+    if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+        return jsonify(error="Expected a JSON array of words."), 400
+    if len(words) > LOOKUP_MAX_WORDS:
+        return jsonify(error="At most {} words can be looked up at once.".format(LOOKUP_MAX_WORDS)), 413
+    words = [word.replace(" ", "") for word in words]
+    if any(len(word) > LOOKUP_MAX_WORD_LENGTH for word in words):
+        return jsonify(error="Words are limited to {} characters.".format(LOOKUP_MAX_WORD_LENGTH)), 400
+    language = payload.get("lang")
+    if language not in LANGUAGES:
+        language = preferred_language()
+
+    def generate():
+        yield '{{"language": {}, "results": ['.format(json.dumps(language))
+        separator = ''
+        for start in range(0, len(words), LOOKUP_QUERY_BATCH_SIZE):
+            batch = words[start:start + LOOKUP_QUERY_BATCH_SIZE]
+            found = data_access.lookup_words(batch, language)
+            for word in batch:
+                entries = found.get(word, [])
+                item = {
+                    "word": word,
+                    "found": bool(entries),
+                    "entries": [lookup_entry_to_dict(*entry) for entry in entries],
+                }
+                yield separator + json.dumps(item, ensure_ascii=False)
+                separator = ', '
+        yield ']}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@app.route('/annotate', methods=['POST'])
+def annotate():
+    """!
+    @brief Annotate the Sino-Korean words of a text with their hanja and the meanings of its characters.
+    The JSON body is {"text": ..., "lang": "fr" | "en", "min_length": 2}.
+    @return JSON response containing the annotated words with their position in the text.
+    """
+    payload = request.get_json(silent=True)
+    text = payload.get("text") if isinstance(payload, dict) else None
+    if not isinstance(text, str):
+        return jsonify(error="Expected a JSON object with the text to annotate."), 400
+    if len(text) > ANNOTATE_MAX_LENGTH:
+        return jsonify(error="Texts are limited to {} characters.".format(ANNOTATE_MAX_LENGTH)), 413
+    language = payload.get("lang")
+    if language not in LANGUAGES:
+        language = preferred_language()
+    min_length = payload.get("min_length", 2)
+    if not isinstance(min_length, int) or min_length < 1:
+        return jsonify(error="min_length must be a positive integer."), 400
+    annotations = get_annotator(data_access).annotate(text, data_access, language, min_length)
+    return jsonify(language=language, annotations=annotations)
+
+@app.route('/cache-stats')
+def cache_stats():
+    """!
+    @brief Expose the counters of the result cache and of the response cache.
+    @return JSON response containing the cache statistics, with the bytes and the rendering time saved by the response cache.
+    """
+    return jsonify(results=result_cache.stats(), responses=response_cache.stats())
+
+@app.route('/metrics')
+def metrics():
+    """!
+    @brief Expose the request, SQL and template timings, and the result cache counters, in the Prometheus text format.
+    @return Plain text response.
+    """
+    stats = result_cache.stats()
+    cache_lines = []
+    for name in ('hits', 'misses', 'evictions'):
+        cache_lines += [f'# TYPE hanja_result_cache_{name}_total counter', f'hanja_result_cache_{name}_total {stats[name]}']
+    for name in ('entries', 'size', 'max_size'):
+        cache_lines += [f'# TYPE hanja_result_cache_{name} gauge', f'hanja_result_cache_{name} {stats[name]}']
+    stats = response_cache.stats()
+    for name in ('hits', 'misses', 'evictions', 'bytes_sent', 'bytes_uncompressed'):
+        cache_lines += [f'# TYPE hanja_response_cache_{name}_total counter', f'hanja_response_cache_{name}_total {stats[name]}']
+    for name in ('seconds_saved', 'compress_seconds'):
+        cache_lines += [f'# TYPE hanja_response_cache_{name}_total counter', f'hanja_response_cache_{name}_total {stats[name]:.6f}']
+    for name in ('entries', 'size', 'max_size'):
+        cache_lines += [f'# TYPE hanja_response_cache_{name} gauge', f'hanja_response_cache_{name} {stats[name]}']
+    return Response(render_metrics(cache_lines), mimetype='text/plain; version=0.0.4')
 
 # This is needed for Vercel to run the app as a serverless function
 def vercel_app(environ, start_response):
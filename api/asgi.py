@@ -0,0 +1,233 @@
+# ! @file api/asgi.py
+"""!
+@brief ASGI entry point : serves the Flask app of api/app.py, with the same routes, templates and JSON,
+from an event loop. Each request runs in a bounded pool of threads, so a slow search only holds one
+thread while the other requests (the /related-words fetches of the results page) are served by the
+others. SQLite releases the GIL while it executes a statement, and every thread keeps its own pooled
+read-only connection (src/database.py).
+
+The small chunks of a streamed response are joined up to HANJA_ASGI_SEND_BUFFER_SIZE bytes, so a long
+body takes a few messages and a few thread switches rather than one per chunk.
+
+Usage : pip install -r requirements-asgi.txt
+        uvicorn api.asgi:app [--workers 1], with HANJA_ASGI_THREADS requests served at the same time by each worker.
+"""
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from api.app import app as flask_app
+from src.config import ASGI_MAX_BODY_SIZE, ASGI_SEND_BUFFER_SIZE, ASGI_THREADS
+
+
+class ClientDisconnected(Exception):
+    """!
+    @brief Raised when the client goes away before the body of its request is received.
+    """
+
+
+def wsgi_environ(scope, body):
+    """!
+    @brief Builds the WSGI environ (PEP 3333) of an ASGI HTTP request.
+    @param scope The ASGI scope of the request.
+    @param body The body of the request, in bytes.
+    @return The environ dictionary.
+    """
+    # WSGI strings are bytes decoded as latin-1
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+    path_info = scope['path'].encode('utf-8').decode('latin-1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get('server') or ('localhost', None)
+    client = scope.get('client')
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0] if client else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        if key in environ:
+            # Repeated headers are joined, cookies with their own separator
+            value = environ[key] + ('; ' if key == 'HTTP_COOKIE' else ',') + value
+        environ[key] = value
+    return environ
+
+
+class WsgiCall:
+    """!
+    @brief One call of a WSGI application, consumed step by step by the event loop.
+    Every step runs in a thread of the pool, never on the event loop.
+    """
+
+    def __init__(self, wsgi_app, environ, buffer_size=ASGI_SEND_BUFFER_SIZE):
+        """!
+        @brief Prepares the call.
+        @param wsgi_app The WSGI application.
+        @param environ The WSGI environ of the request.
+        @param buffer_size Size, in bytes, up to which the chunks of the body are joined.
+        """
+        self.wsgi_app = wsgi_app
+        self.environ = environ
+        self.buffer_size = buffer_size
+        self.status = None
+        self.headers = None
+        self._written = []
+        self._iterable = None
+        self._iterator = None
+
+    def start_response(self, status, headers, exc_info=None):
+        """!
+        @brief The start_response callable of WSGI. Nothing is sent before the first chunk of
+        the body is ready, so the status and the headers can always be replaced by an error page.
+        """
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        return self._written.append
+
+    def start(self):
+        """!
+        @brief Calls the application and produces the first chunk of the body.
+        @return The first chunk, None if the body is empty.
+        """
+        self._iterable = self.wsgi_app(self.environ, self.start_response)
+        self._iterator = iter(self._iterable)
+        return self.next_chunk()
+
+    def next_chunk(self):
+        """!
+        @brief Produces the next part of the body : the chunks of the application are joined until
+        they reach the buffer size or the end of the body.
+        @return The part, None at the end of the body.
+        """
+        chunks = self._written
+        self._written = []
+        size = sum(len(chunk) for chunk in chunks)
+        for chunk in self._iterator:
+            if chunk:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= self.buffer_size:
+                    break
+        return b''.join(chunks) if chunks else None
+
+    def close(self):
+        """!
+        @brief Closes the body, which runs the teardown callbacks of the application.
+        """
+        iterable, self._iterable = self._iterable, None
+        if hasattr(iterable, 'close'):
+            iterable.close()
+
+
+class AsgiAdapter:
+    """!
+    @brief ASGI application running a WSGI application in a bounded pool of threads.
+    """
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS, max_body_size=ASGI_MAX_BODY_SIZE, buffer_size=ASGI_SEND_BUFFER_SIZE):
+        """!
+        @brief Creates the pool of threads.
+        @param wsgi_app The WSGI application.
+        @param threads Maximum number of requests executed at the same time, the others wait on the event loop.
+        @param max_body_size Maximum size, in bytes, of a request body.
+        @param buffer_size Size, in bytes, up to which the chunks of a response are joined.
+        """
+        self.wsgi_app = wsgi_app
+        self.max_body_size = max_body_size
+        self.buffer_size = buffer_size
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        """!
+        @brief Handles the startup and the shutdown of the server.
+        """
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope, receive):
+        """!
+        @brief Receives the body of a request.
+        @return The body, None if it is larger than the maximum size.
+        """
+        for name, value in scope['headers']:
+            if name == b'content-length' and value.isdigit() and int(value) > self.max_body_size:
+                return None
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def http(self, scope, receive, send):
+        """!
+        @brief Serves an HTTP request, streaming the body of the response part by part.
+        """
+        try:
+            body = await self.read_body(scope, receive)
+        except ClientDisconnected:
+            return
+        if body is None:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+            await send({'type': 'http.response.body', 'body': b'Request body too large.'})
+            return
+
+        loop = asyncio.get_running_loop()
+        # The steps of a request run one after the other, possibly in different threads, in the same
+        # context : the Flask request context kept by stream_with_context is found by every step
+        context = contextvars.copy_context()
+        call = WsgiCall(self.wsgi_app, wsgi_environ(scope, body), self.buffer_size)
+
+        def step(function):
+            return loop.run_in_executor(self.executor, context.run, function)
+
+        try:
+            chunk = await step(call.start)
+            await send({'type': 'http.response.start', 'status': call.status, 'headers': call.headers})
+            while chunk is not None:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await step(call.next_chunk)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            await step(call.close)
+
+
+app = AsgiAdapter(flask_app)
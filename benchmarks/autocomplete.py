@@ -0,0 +1,63 @@
+#! @file benchmarks/autocomplete.py
+"""!
+@brief Measures the latency of the autocomplete index on the prefixes of the dictionary words,
+the way they are typed : syllable by syllable, with the last syllable partially composed.
+
+Usage : python -m benchmarks.autocomplete [--queries 20000] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from benchmarks.common import summarize, time_calls
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autocomplete latency benchmark.")
+    parser.add_argument('--queries', type=int, default=20000, help="number of prefixes looked up")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.autocomplete import AutocompleteIndex, decompose
+    from src.data_access import DataAccess
+
+    rows = DataAccess().get_all_words()
+    start = time.perf_counter()
+    index = AutocompleteIndex(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(0)
+    words = [row[0] for row in rows if row[0]]
+    prefixes = []
+    for _ in range(args.queries):
+        word = rng.choice(words)
+        cut = rng.randint(1, len(word))
+        prefix = word[:cut]
+        if rng.random() < 0.5:
+            # The last syllable is still being composed : its jamo without the final consonant
+            jamo = decompose(prefix[-1])
+            prefix = prefix[:-1] + jamo[:max(1, len(jamo) - 1)]
+        prefixes.append(prefix)
+
+    timings = time_calls(lambda prefix: index.complete(prefix, 'fr'), prefixes)
+
+    results = {
+        'words': len(index),
+        'build_ms': build_ms,
+        'queries': len(timings),
+        **summarize(timings),
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#! @file benchmarks/cold_start.py
+"""!
+@brief Measures the time from the start of a new Python process to the first /search response,
+serving from SQLite and from a snapshot built by src/snapshot.py.
+
+Usage : python -m benchmarks.cold_start [--runs 10] [--word 사기] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Run in a fresh interpreter, prints the seconds spent importing the app and serving the first request
+FIRST_RESPONSE = '''
+import sys, time
+start = time.perf_counter()
+from api.app import app
+response = app.test_client().post('/search', data={'word': sys.argv[1]}, follow_redirects=True)
+assert response.status_code == 200, response.status_code
+print(time.perf_counter() - start)
+'''
+
+
+def measure(word, runs, snapshot_path=None):
+    """!
+    @brief Starts new processes serving one request.
+    @param word The word searched.
+    @param runs Number of processes.
+    @param snapshot_path Path of the snapshot to serve from, None for SQLite.
+    @return A dictionary with the median and the maximum, in milliseconds, of the first response
+            time measured inside the process and of the whole process.
+    """
+    env = dict(os.environ)
+    env.pop('HANJA_SNAPSHOT', None)
+    if snapshot_path:
+        env['HANJA_SNAPSHOT'] = snapshot_path
+    first_response, process = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', FIRST_RESPONSE, word], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        process.append((time.perf_counter() - start) * 1000)
+        first_response.append(float(output.split()[-1]) * 1000)
+    return {
+        'first_response_ms_median': statistics.median(first_response),
+        'first_response_ms_max': max(first_response),
+        'process_ms_median': statistics.median(process),
+        'process_ms_max': max(process),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark, SQLite against the snapshot.")
+    parser.add_argument('--runs', type=int, default=10, help="processes started for each mode")
+    parser.add_argument('--word', default='사기', help="word searched by the first request")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from src.snapshot import build_snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot_path = os.path.join(directory, 'korean_learning.snapshot')
+        build_snapshot(snapshot_path)
+        results = {
+            'word': args.word,
+            'runs': args.runs,
+            'sqlite': measure(args.word, args.runs),
+            'snapshot': measure(args.word, args.runs, snapshot_path),
+        }
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#! @file benchmarks/common.py
+"""!
+@brief Helpers shared by the benchmarks : timing of repeated calls and summary of the latencies.
+"""
+import statistics
+import time
+
+
+def percentile(values, fraction):
+    """!
+    @brief Returns a percentile of a list of values.
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(timings):
+    """!
+    @brief Returns the median, the p99 and the maximum of latencies in milliseconds, nothing if there are none.
+    """
+    if not timings:
+        return {}
+    return {
+        'p50_ms': percentile(timings, 0.50),
+        'p99_ms': percentile(timings, 0.99),
+        'max_ms': max(timings),
+    }
+
+
+def time_calls(function, arguments):
+    """!
+    @brief Calls a function once for each item of a list of arguments.
+    @return The latency of each call, in milliseconds.
+    """
+    timings = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def latencies(function, arguments):
+    """!
+    @brief Calls a function once for each item of a list of arguments.
+    @return A dictionary with the number of calls and the mean, median, p99 and maximum latency in milliseconds.
+    """
+    timings = time_calls(function, arguments)
+    return {'calls': len(timings), 'mean_ms': statistics.mean(timings), **summarize(timings)}
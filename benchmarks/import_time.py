@@ -0,0 +1,78 @@
+#! @file benchmarks/import_time.py
+"""!
+@brief Guards the cold start of the web server : imports api.app in new interpreters with
+`python -X importtime`, reports the import time and the heaviest modules, and fails when the
+median goes over a budget or when a module of the ingestion is imported by the serving path.
+
+Usage : python -m benchmarks.import_time [--runs 5] [--budget-ms 400] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODULE = 'api.app'
+# Modules only needed by the ingestion (python -m src.main), see requirements-ingest.txt
+INGESTION_MODULES = ('datapackage', 'deep_translator', 'regex', 'src.data_processing', 'src.translation', 'src.main', 'multiprocessing')
+
+
+def import_times(module):
+    """!
+    @brief Imports a module in a new interpreter.
+    @param module Name of the module.
+    @return A dictionary mapping each imported module to its (self, cumulative) import time in microseconds.
+    """
+    env = dict(os.environ)
+    env.pop('HANJA_SNAPSHOT', None)
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        # "import time:       299 |      37435 |       importlib.resources"
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the web server, with a budget.")
+    parser.add_argument('--runs', type=int, default=5, help="interpreters started")
+    parser.add_argument('--budget-ms', type=float, default=400, help="maximum median import time of api.app")
+    parser.add_argument('--top', type=int, default=10, help="heaviest modules reported")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    runs = [import_times(MODULE) for _ in range(args.runs)]
+    totals = [times[MODULE][1] / 1000 for times in runs]
+    last = runs[-1]
+    heaviest = sorted(last.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    ingestion = sorted(name for name in last if name.split('.')[0] in INGESTION_MODULES or name in INGESTION_MODULES)
+
+    results = {
+        'module': MODULE,
+        'runs': args.runs,
+        'import_ms_median': statistics.median(totals),
+        'import_ms_max': max(totals),
+        'budget_ms': args.budget_ms,
+        'modules': len(last),
+        'heaviest_self_ms': {name: self_us / 1000 for name, (self_us, _) in heaviest},
+        'ingestion_modules_imported': ingestion,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    if ingestion:
+        sys.exit(f"{MODULE} imports modules of the ingestion : {', '.join(ingestion)}")
+    if results['import_ms_median'] > args.budget_ms:
+        sys.exit(f"{MODULE} takes {results['import_ms_median']:.0f} ms to import, over the budget of {args.budget_ms:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+#! @file benchmarks/load.py
+"""!
+@brief Load test of the two serving modes : the WSGI app under gunicorn (sync workers) and the ASGI
+entry point (api/asgi.py) under uvicorn, with the same number of processes so they use about the same
+memory. Concurrent clients send the requests of a results page : a search (GET /w/<word>) followed by
+the /related-words fetches of its characters. The throughput, the latency percentiles of each kind of
+request and the memory (RSS) of the server processes are written as JSON.
+
+The database is a synthetic dictionary built like benchmarks/run.py (requirements-ingest.txt is needed),
+or an existing database given with --database. The ASGI mode needs requirements-asgi.txt.
+
+Usage : python -m benchmarks.load [--entries 10k | --database path] [--clients 32] [--duration 10]
+        [--workers 1] [--asgi-threads 8] [--search-share 0.2] [--no-result-cache] [--output results.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from benchmarks.common import summarize
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def free_port():
+    """!
+    @brief Returns a TCP port nobody listens on.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, workers):
+    """!
+    @brief Returns the command starting a server.
+    @param mode "wsgi" (gunicorn) or "asgi" (uvicorn).
+    @param port Port to listen on.
+    @param workers Number of worker processes.
+    """
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+                '--log-level', 'warning', 'api.app:app']
+    return [sys.executable, '-m', 'uvicorn', 'api.asgi:app', '--workers', str(workers), '--host', '127.0.0.1',
+            '--port', str(port), '--no-access-log', '--log-level', 'warning']
+
+
+def wait_until_ready(port, process, timeout=30):
+    """!
+    @brief Waits for a server to answer its first request.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"The server exited with code {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("The server didn't start in time")
+
+
+def process_tree_rss(pid):
+    """!
+    @brief Returns the resident memory, in MiB, of a process and of its children (Linux only).
+    """
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status', 'r') as file:
+                for line in file:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+            with open(f'/proc/{current}/task/{current}/children', 'r') as file:
+                pending.extend(int(child) for child in file.read().split())
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+def load_requests(database_path, count, seed):
+    """!
+    @brief Draws the searched words, and for each one the character fetched by /related-words.
+    @param database_path Path of the database served.
+    @param count Number of (word, character) drawn.
+    @param seed Seed of the random generator.
+    @return A list of (word, hanja character).
+    """
+    conn = sqlite3.connect(database_path)
+    rows = conn.execute("SELECT word, hanja FROM korean_words WHERE hanja IS NOT NULL AND hanja != '' ORDER BY id").fetchall()
+    conn.close()
+    rng = random.Random(seed)
+    requests = []
+    for word, hanja in rng.choices(rows, k=count):
+        # CJK ideographs, the hanja of a 하다 verb ends with 하다
+        characters = [char for char in hanja if '\u3400' <= char <= '\u9fff' or '\uf900' <= char <= '\ufaff']
+        if characters:
+            requests.append((word, rng.choice(characters)))
+    return requests
+
+
+def client(port, requests, search_share, seed, deadline, results):
+    """!
+    @brief Sends requests until the deadline, on one keep-alive connection when the server allows it.
+    @param results List receiving a (kind, milliseconds, status) for each request, None as status for an error.
+    """
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while time.monotonic() < deadline:
+        word, character = rng.choice(requests)
+        if rng.random() < search_share:
+            kind, url = 'search', f'/w/{quote(word)}?lang=fr'
+        else:
+            kind, url = 'related', f'/related-words?hanja={quote(character)}&lang=fr&original_word={quote(word)}'
+        start = time.perf_counter()
+        try:
+            connection.request('GET', url)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            status = None
+        results.append((kind, (time.perf_counter() - start) * 1000, status))
+    connection.close()
+
+
+def drive(port, requests, clients, duration, search_share, seed):
+    """!
+    @brief Runs the clients for a duration.
+    @return The list of (kind, milliseconds, status) of every request.
+    """
+    results = []
+    deadline = time.monotonic() + duration
+    threads = [threading.Thread(target=client, args=(port, requests, search_share, seed + number, deadline, results))
+               for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def measure(mode, args, env, requests):
+    """!
+    @brief Starts a server, warms it up, loads it and stops it.
+    @param mode "wsgi" or "asgi".
+    @param args The parsed arguments.
+    @param env Environment of the server.
+    @param requests The (word, character) list returned by load_requests.
+    @return The dictionary of the results of the server.
+    """
+    port = free_port()
+    command = server_command(mode, port, args.workers)
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        wait_until_ready(port, process)
+        drive(port, requests, args.clients, args.warmup, args.search_share, args.seed)
+        results = drive(port, requests, args.clients, args.duration, args.search_share, args.seed)
+        rss_mb = process_tree_rss(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    succeeded = [(kind, ms) for kind, ms, status in results if status == 200]
+    return {
+        'command': ' '.join(command[1:]),
+        'requests': len(results),
+        'errors': len(results) - len(succeeded),
+        'requests_per_second': len(succeeded) / args.duration,
+        'latency': {
+            name: {'requests': len(timings), **summarize(timings)}
+            for name, timings in (
+                ('all', [ms for _, ms in succeeded]),
+                ('search', [ms for kind, ms in succeeded if kind == 'search']),
+                ('related', [ms for kind, ms in succeeded if kind == 'related']),
+            )
+        },
+        'rss_mb': rss_mb,
+    }
+
+
+def main():
+    from benchmarks.run import build, git_commit
+    from benchmarks.synthetic import parse_size
+
+    parser = argparse.ArgumentParser(description="Load test of the WSGI and ASGI serving modes.")
+    parser.add_argument('--entries', type=parse_size, default=parse_size('10k'), help="size of the synthetic dictionary : 10k, 100k...")
+    parser.add_argument('--database', help="serve an existing database instead of a synthetic one")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent clients")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of load of each server")
+    parser.add_argument('--warmup', type=float, default=2, help="seconds of load before the measure")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes of each server")
+    parser.add_argument('--asgi-threads', type=int, default=8, help="requests served at the same time by an ASGI worker")
+    parser.add_argument('--search-share', type=float, default=0.2, help="share of searches, the others are /related-words")
+    parser.add_argument('--no-result-cache', action='store_true', help="disable the result cache of the servers")
+    parser.add_argument('--modes', default='wsgi,asgi', help="servers measured")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the dictionary and of the requests")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            database_path = os.path.abspath(args.database)
+        else:
+            build(args.entries, args.seed, directory)
+            database_path = os.environ['HANJA_DATABASE']
+
+        env = dict(os.environ, HANJA_DATABASE=database_path, HANJA_ASGI_THREADS=str(args.asgi_threads))
+        env.pop('HANJA_SNAPSHOT', None)
+        if args.no_result_cache:
+            env['HANJA_RESULT_CACHE_SIZE'] = '0'
+        requests = load_requests(database_path, 5000, args.seed)
+        servers = {mode: measure(mode, args, env, requests) for mode in args.modes.split(',')}
+
+    results = {
+        'commit': git_commit(),
+        'database': args.database or f'synthetic, {args.entries} entries',
+        'clients': args.clients,
+        'duration': args.duration,
+        'workers': args.workers,
+        'asgi_threads': args.asgi_threads,
+        'search_share': args.search_share,
+        'result_cache': not args.no_result_cache,
+        'servers': servers,
+    }
+    print(json.dumps(results, indent=2))
+    for mode, server in servers.items():
+        latency = server['latency']
+        print(f"{mode}: {server['requests_per_second']:8.1f} req/s, p99 {latency['all'].get('p99_ms', 0):7.1f} ms "
+              f"(search {latency['search'].get('p99_ms', 0):7.1f} ms, related {latency['related'].get('p99_ms', 0):7.1f} ms), "
+              f"{server['errors']} errors, {server['rss_mb']:.0f} MiB")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#! @file benchmarks/memory.py
+"""!
+@brief Measures the resident memory of the dictionary served from SQLite, loaded as Python dictionaries
+(like process_data produces them) and loaded in the columnar store of src/memory_store.py. Each one is
+measured in a new process, as the growth of its RSS, and reported per 100k entries.
+
+The database is a synthetic dictionary built like benchmarks/run.py (requirements-ingest.txt is needed),
+or an existing database given with --database.
+
+Usage : python -m benchmarks.memory [--entries 100k | --database path] [--output results.json]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Run in a fresh interpreter, prints the RSS growth (in bytes) and the seconds spent loading
+MEASURE = '''
+import gc, json, sys, time
+
+def rss():
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+
+from src.data_access import DataAccess
+from src.database import DatabaseConnection, read_pool
+from src.memory_store import ColumnarStore, MemoryDataAccess
+mode = sys.argv[1]
+DataAccess().get_dataset_generation()
+gc.collect()
+before = rss()
+start = time.perf_counter()
+details = None
+if mode == 'sqlite':
+    # Every word and the related words of every character are read once, so the page cache is warm
+    data_access = DataAccess()
+    with DatabaseConnection() as conn:
+        words = [row[0] for row in conn.execute('SELECT DISTINCT word FROM korean_words')]
+        characters = [row[0] for row in conn.execute('SELECT character FROM hanja_char_stats')]
+    for word in words:
+        data_access.lookup_word(word, 'fr')
+    for character in characters:
+        data_access.get_related_words(character, 'fr')
+    del words, characters
+elif mode == 'dicts':
+    with DatabaseConnection() as conn:
+        cursor = conn.execute('SELECT * FROM korean_words')
+        columns = [column[0] for column in cursor.description]
+        dictionary = [dict(zip(columns, row)) for row in cursor]
+        cursor = conn.execute('SELECT * FROM hanja_characters')
+        columns = [column[0] for column in cursor.description]
+        hanja = {row[1]: dict(zip(columns, row)) for row in cursor}
+else:
+    store = ColumnarStore.from_database()
+    details = store.memory_usage()
+seconds = time.perf_counter() - start
+if mode != 'sqlite':
+    # The pages of the database file mapped while loading aren't part of the loaded dictionary
+    read_pool.close()
+gc.collect()
+print(json.dumps({'rss_bytes': rss() - before, 'seconds': seconds, 'details': details}))
+'''
+
+
+def measure(mode, database_path):
+    """!
+    @brief Loads the dictionary in a new process.
+    @param mode "sqlite", "dicts" or "columnar".
+    @param database_path Path of the database.
+    @return A dictionary with the RSS growth in bytes, the seconds spent and, for the columnar store, the size of its parts.
+    """
+    env = dict(os.environ, HANJA_DATABASE=database_path, HANJA_RESULT_CACHE_SIZE='0')
+    env.pop('HANJA_SNAPSHOT', None)
+    output = subprocess.run([sys.executable, '-c', MEASURE, mode], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from benchmarks.run import build, git_commit
+    from benchmarks.synthetic import parse_size
+
+    parser = argparse.ArgumentParser(description="Resident memory of the dictionary, from SQLite, as dictionaries and as columns.")
+    parser.add_argument('--entries', type=parse_size, default=parse_size('100k'), help="size of the synthetic dictionary : 10k, 100k...")
+    parser.add_argument('--database', help="measure an existing database instead of a synthetic one")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic dictionary")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            database_path = os.path.abspath(args.database)
+        else:
+            build(args.entries, args.seed, directory)
+            database_path = os.environ['HANJA_DATABASE']
+        conn = sqlite3.connect(database_path)
+        entries = conn.execute('SELECT COUNT(*) FROM korean_words').fetchone()[0]
+        conn.close()
+        database_mb = os.path.getsize(database_path) / (1024 * 1024)
+        modes = {mode: measure(mode, database_path) for mode in ('sqlite', 'dicts', 'columnar')}
+
+    results = {
+        'commit': git_commit(),
+        'entries': entries,
+        'database_mb': database_mb,
+        'modes': {
+            mode: {
+                'rss_mb': result['rss_bytes'] / (1024 * 1024),
+                'rss_mb_per_100k_entries': result['rss_bytes'] / (1024 * 1024) * 100000 / entries if entries else None,
+                'seconds': result['seconds'],
+                'parts_mb': {part: size / (1024 * 1024) for part, size in result['details'].items()} if result['details'] else None,
+            }
+            for mode, result in modes.items()
+        },
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
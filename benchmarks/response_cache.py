@@ -0,0 +1,112 @@
+#! @file benchmarks/response_cache.py
+"""!
+@brief Measures the response cache (src/cache.py) : the same requests of results pages (GET /w/<word> and
+the /related-words fetches of its characters) are sent to the app, through the Flask test client, without
+the response cache then with it, asking for brotli or gzip. Reports the latencies, the CPU time per request
+and the bytes sent against the uncompressed bodies.
+
+The database is a synthetic dictionary built like benchmarks/run.py (requirements-ingest.txt is needed),
+or an existing database given with --database.
+
+Usage : python -m benchmarks.response_cache [--entries 10k | --database path] [--requests 2000]
+        [--distinct 200] [--encoding br] [--output results.json]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from urllib.parse import quote
+
+from benchmarks.common import summarize
+
+
+def measure(client, urls, encoding):
+    """!
+    @brief Sends requests and times them.
+    @param client The Flask test client.
+    @param urls The URLs requested, in order.
+    @param encoding The Accept-Encoding header of the requests.
+    @return A dictionary with the latencies, the CPU seconds per request and the bytes received.
+    """
+    timings = []
+    received = 0
+    cpu_start = time.process_time()
+    for url in urls:
+        start = time.perf_counter()
+        response = client.get(url, headers={'Accept-Encoding': encoding})
+        body = response.get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, (url, response.status_code)
+        received += len(body)
+    cpu_seconds = time.process_time() - cpu_start
+    return {
+        'requests': len(urls),
+        **summarize(timings),
+        'cpu_ms_per_request': cpu_seconds * 1000 / len(urls),
+        'bytes_received': received,
+    }
+
+
+def main():
+    from benchmarks.load import load_requests
+    from benchmarks.run import build, git_commit
+    from benchmarks.synthetic import parse_size
+
+    parser = argparse.ArgumentParser(description="Latency, CPU and bytes of the responses with and without the response cache.")
+    parser.add_argument('--entries', type=parse_size, default=parse_size('10k'), help="size of the synthetic dictionary : 10k, 100k...")
+    parser.add_argument('--database', help="use an existing database instead of a synthetic one")
+    parser.add_argument('--requests', type=int, default=2000, help="requests sent in each mode")
+    parser.add_argument('--distinct', type=int, default=200, help="distinct results pages the requests are drawn from")
+    parser.add_argument('--encoding', default='br', help="Accept-Encoding of the requests : br, gzip or identity")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the dictionary and of the requests")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            os.environ['HANJA_DATABASE'] = os.path.abspath(args.database)
+        else:
+            build(args.entries, args.seed, directory)
+        os.environ.pop('HANJA_SNAPSHOT', None)
+
+        rng = random.Random(args.seed)
+        pages = load_requests(os.environ['HANJA_DATABASE'], args.distinct, args.seed)
+        urls = []
+        for word, character in rng.choices(pages, k=args.requests):
+            urls.append(f'/w/{quote(word)}?lang=fr')
+            urls.append(f'/related-words?hanja={quote(character)}&lang=fr&original_word={quote(word)}')
+
+        from api.app import app
+        from src.cache import response_cache, result_cache
+        client = app.test_client()
+        max_size = response_cache.max_size
+        modes = {}
+        for mode, size in (('uncached', 0), ('cached', max_size)):
+            # The result cache is emptied too, so both modes start from the same state
+            result_cache.clear()
+            response_cache.clear()
+            response_cache.max_size = size
+            modes[mode] = measure(client, urls, args.encoding)
+            modes[mode]['response_cache'] = response_cache.stats()
+
+    cached, uncached = modes['cached'], modes['uncached']
+    stats = cached['response_cache']
+    results = {
+        'commit': git_commit(),
+        'database': args.database or f'synthetic, {args.entries} entries',
+        'encoding': args.encoding,
+        'distinct_pages': args.distinct,
+        'modes': modes,
+        'cpu_saved_percent': (1 - cached['cpu_ms_per_request'] / uncached['cpu_ms_per_request']) * 100,
+        'bytes_saved_percent': (1 - stats['bytes_sent'] / stats['bytes_uncompressed']) * 100 if stats['bytes_uncompressed'] else None,
+    }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#! @file benchmarks/run.py
+"""!
+@brief Benchmark runner : generates a synthetic dictionary (benchmarks/synthetic.py), loads it into a
+new database, and times the ingestion steps and the queries of the web server. The results are written
+as JSON with the commit they were measured on, so two commits can be compared.
+
+Usage : python -m benchmarks.run [--entries 10k] [--queries 500] [--seed 0] [--output results.json] [--compare previous.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import latencies
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def git_commit():
+    """!
+    @brief Returns the commit of the working tree, None outside of a git repository.
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(function, *args):
+    """!
+    @brief Calls a function once.
+    @return A tuple (result, seconds).
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def build(entries, seed, directory):
+    """!
+    @brief Generates a synthetic dictionary and loads it into a new database of a directory,
+    which becomes the database of the process (HANJA_DATABASE).
+    @param entries Number of entries of the synthetic dictionary.
+    @param seed Seed of the synthetic dictionary.
+    @param directory Working directory.
+    @return A tuple (generate_seconds, seconds of each ingestion step, processed entries).
+    """
+    # The database path is read from the environment when src.config is imported
+    os.environ['HANJA_DATABASE'] = os.path.join(directory, 'benchmark.db')
+    os.environ.pop('HANJA_SNAPSHOT', None)
+    sys.path.insert(0, ROOT)
+    from benchmarks.synthetic import HANJA_PATH, generate
+    from src.data_access import DataAccess
+    from src.data_processing import DataProcessor
+    from src.translation import get_translator
+
+    folder = os.path.join(directory, 'dump')
+    _, generate_seconds = timed(generate, folder, entries, 5000, seed)
+
+    data_access = DataAccess()
+    data_processor = DataProcessor(folder)
+    data_access.initialize_database()
+    stages = {}
+
+    raw_data, seconds = timed(data_processor.extract_data)
+    stages['extract_data'] = seconds
+    processed_data, seconds = timed(data_processor.process_data, raw_data)
+    stages['process_data'] = seconds
+    del raw_data
+    data_access.begin_load()
+    _, seconds = timed(data_access.insert_data, processed_data)
+    stages['insert_data'] = seconds
+    _, seconds = timed(data_access.end_load)
+    stages['end_load'] = seconds
+    hanja_dict = data_processor.process_hanja_data(data_processor.read_hanja_file(HANJA_PATH), get_translator('offline'))
+    _, seconds = timed(data_access.insert_hanja_data, hanja_dict)
+    stages['insert_hanja_data'] = seconds
+    return generate_seconds, stages, processed_data
+
+
+def run(entries, queries, seed, directory):
+    """!
+    @brief Runs the benchmark in a directory receiving the synthetic files and the database.
+    @param entries Number of entries of the synthetic dictionary.
+    @param queries Number of calls of each query.
+    @param seed Seed of the synthetic dictionary and of the queries.
+    @param directory Working directory.
+    @return The dictionary of the results.
+    """
+    generate_seconds, stages, processed_data = build(entries, seed, directory)
+    from src.cache import response_cache, result_cache
+    from src.data_access import DataAccess
+    data_access = DataAccess()
+
+    rng = random.Random(seed)
+    words = [row['word'] for row in processed_data if row['word']]
+    characters = sorted({char for row in processed_data if row['hanja'] for char in row['hanja']})
+    searched_words = [rng.choice(words) for _ in range(queries)]
+    searched_characters = [rng.choice(characters) for _ in range(queries)]
+    del processed_data
+
+    from api.app import app
+    client = app.test_client()
+
+    def search(word):
+        # Full path of a search : the form, then the page it redirects to
+        response = client.post('/search', data={'word': word}, follow_redirects=True)
+        assert response.status_code == 200, response.status_code
+
+    query_results = {}
+    # Each query is measured on empty caches, then with the same arguments again
+    result_cache.clear()
+    query_results['get_related_words'] = latencies(lambda char: data_access.get_related_words(char, 'fr'), searched_characters)
+    query_results['get_related_words_cached'] = latencies(lambda char: data_access.get_related_words(char, 'fr'), searched_characters)
+    result_cache.clear()
+    response_cache.clear()
+    query_results['search'] = latencies(search, searched_words)
+    query_results['search_cached'] = latencies(search, searched_words)
+
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'entries': entries,
+        'seed': seed,
+        'generate_seconds': generate_seconds,
+        'database_mb': os.path.getsize(os.environ['HANJA_DATABASE']) / (1024 * 1024),
+        'stages': {
+            name: {
+                'seconds': seconds,
+                # The hanja file doesn't grow with the dictionary
+                'entries_per_second': entries / seconds if seconds and name != 'insert_hanja_data' else None,
+            }
+            for name, seconds in stages.items()
+        },
+        'queries': query_results,
+    }
+
+
+def compare(previous, current):
+    """!
+    @brief Prints the change of each measure between two results, positive when the current one is slower.
+    @param previous Results of an earlier run.
+    @param current Results of this run.
+    """
+    print(f"Compared with {previous.get('commit')} ({previous.get('entries')} entries) :")
+    for name, stage in current['stages'].items():
+        before = previous.get('stages', {}).get(name, {}).get('seconds')
+        if before:
+            print(f"  {name:28} {before:9.3f} s -> {stage['seconds']:9.3f} s  {(stage['seconds'] / before - 1) * 100:+6.1f} %")
+    for name, query in current['queries'].items():
+        before = previous.get('queries', {}).get(name, {}).get('p50_ms')
+        if before:
+            print(f"  {name + ' p50':28} {before:9.3f} ms -> {query['p50_ms']:8.3f} ms {(query['p50_ms'] / before - 1) * 100:+6.1f} %")
+
+
+def main():
+    from benchmarks.synthetic import parse_size
+
+    parser = argparse.ArgumentParser(description="Ingestion and query benchmark on a synthetic dictionary.")
+    parser.add_argument('--entries', type=parse_size, default=parse_size('10k'), help="size of the dictionary : 10k, 100k, 1M...")
+    parser.add_argument('--queries', type=int, default=500, help="calls of each query")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the dictionary and of the queries")
+    parser.add_argument('--output', help="JSON file receiving the results")
+    parser.add_argument('--compare', help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run(args.entries, args.queries, args.seed, directory)
+
+    print(json.dumps(results, indent=2))
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            compare(json.load(file), results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#! @file benchmarks/synthetic.py
+"""!
+@brief Generates a synthetic dictionary shaped like the 한국어기초사전 JSON dump, so the ingestion
+and the queries can be measured without the real files (only Git LFS pointers in the repository).
+
+Sino-Korean words are built from the characters of data/hanja.txt : the word is the reading of
+each character, the characters are drawn with a Zipf distribution so a few of them are found in
+many words, like 人 or 大 in the real dictionary. The other words are native words without hanja.
+
+Usage : python -m benchmarks.synthetic output_folder [--entries 100k] [--per-file 5000] [--seed 0]
+"""
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import re
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HANJA_PATH = os.path.join(ROOT, 'data', 'hanja.txt')
+
+HANJA_WORD_RATIO = 0.6  # Share of the entries written with hanja
+HANJA_LENGTHS = (1, 2, 3, 4)  # Number of characters of a Sino-Korean word...
+HANJA_LENGTH_WEIGHTS = (5, 60, 25, 10)  # ...and how often each length is drawn
+HADA_RATIO = 0.1  # Share of the Sino-Korean words turned into 하다 verbs
+SENSE_COUNTS = (1, 2, 3)
+SENSE_COUNT_WEIGHTS = (70, 20, 10)
+NATIVE_SYLLABLES = '가나다라마바사아자차카타파하고노도로모보소오조초코토포호구누두루무부수우주추쿠투푸후'
+
+
+def parse_size(text):
+    """!
+    @brief Parses a number of entries written as 10000, 10k or 1M.
+    """
+    match = re.fullmatch(r'(\d+)([kKmM]?)', text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size '{text}'")
+    return int(match.group(1)) * {'': 1, 'k': 1000, 'm': 1000000}[match.group(2).lower()]
+
+
+def load_hanja(hanja_path=HANJA_PATH):
+    """!
+    @brief Reads the characters of the hanja file with their reading.
+    @param hanja_path Path of the hanja file.
+    @return A list of (character, reading syllable), in the order of the file.
+    """
+    characters = []
+    seen = set()
+    reading = None
+    with open(hanja_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('[') and line.endswith(']'):
+                # "[가]" starts the characters read 가
+                reading = line[1:-1]
+            elif '=' in line and reading:
+                # "價=값 가, price, value (15)"
+                character = line.split('=', 1)[0]
+                if len(character) == 1 and character not in seen:
+                    seen.add(character)
+                    characters.append((character, reading))
+    return characters
+
+
+class SyntheticDictionary:
+    """!
+    @brief Draws the entries of a synthetic dictionary, reproducibly for a given seed.
+    """
+
+    def __init__(self, hanja, seed=0):
+        """!
+        @brief Prepares the distributions.
+        @param hanja The (character, reading) list returned by load_hanja.
+        @param seed Seed of the random generator.
+        """
+        self.random = random.Random(seed)
+        # The frequency rank of a character doesn't follow the order of the file
+        self.hanja = list(hanja)
+        self.random.shuffle(self.hanja)
+        # Cumulated Zipf weights (1/rank) for bisect
+        self.cumulated = list(itertools.accumulate(1 / rank for rank in range(1, len(self.hanja) + 1)))
+
+    def draw_character(self):
+        """!
+        @brief Draws a hanja character and its reading.
+        """
+        index = bisect.bisect(self.cumulated, self.random.random() * self.cumulated[-1])
+        return self.hanja[min(index, len(self.hanja) - 1)]
+
+    def draw_word(self):
+        """!
+        @brief Draws a Korean word, and its hanja if it is a Sino-Korean word.
+        @return A tuple (word, hanja), hanja being None for native words.
+        """
+        if self.random.random() >= HANJA_WORD_RATIO:
+            length = self.random.choice((1, 2, 2, 3))
+            return ''.join(self.random.choice(NATIVE_SYLLABLES) for _ in range(length)), None
+        length = self.random.choices(HANJA_LENGTHS, HANJA_LENGTH_WEIGHTS)[0]
+        characters = [self.draw_character() for _ in range(length)]
+        word = ''.join(reading for _, reading in characters)
+        hanja = ''.join(character for character, _ in characters)
+        if length > 1 and self.random.random() < HADA_RATIO:
+            word += '하다'
+            hanja += '하다'
+        return word, hanja
+
+    def entry(self, entry_id):
+        """!
+        @brief Builds a LexicalEntry in the format of the dump.
+        @param entry_id Id of the entry.
+        @return The dictionary of the entry.
+        """
+        word, hanja = self.draw_word()
+        features = [
+            {"att": "homonym_number", "val": str(self.random.randint(0, 3))},
+            {"att": "lexicalUnit", "val": "단어"},
+            {"att": "partOfSpeech", "val": self.random.choice(("명사", "동사", "형용사", "부사"))},
+        ]
+        if hanja:
+            features.append({"att": "origin", "val": hanja})
+        senses = []
+        for sense_number in range(self.random.choices(SENSE_COUNTS, SENSE_COUNT_WEIGHTS)[0]):
+            sense = {
+                "att": "id",
+                "val": f"{entry_id}.{sense_number}",
+                "feat": [{"att": "definition", "val": f"{word}의 뜻풀이 {sense_number + 1}."}],
+                "Equivalent": [
+                    {"feat": [
+                        {"att": "language", "val": "영어"},
+                        {"att": "lemma", "val": f"meaning {entry_id}-{sense_number}"},
+                        {"att": "definition", "val": f"English definition of {word}, sense {sense_number + 1}."},
+                    ]},
+                    {"feat": [
+                        {"att": "language", "val": "프랑스어"},
+                        {"att": "lemma", "val": f"sens {entry_id}-{sense_number}"},
+                        {"att": "definition", "val": f"Définition française de {word}, sens {sense_number + 1}."},
+                    ]},
+                ],
+            }
+            senses.append(sense)
+        return {
+            "att": "id",
+            "val": str(entry_id),
+            "Lemma": {"feat": {"att": "writtenForm", "val": word}},
+            "feat": features,
+            "Sense": senses[0] if len(senses) == 1 else senses,
+            "WordForm": {"feat": [
+                {"att": "type", "val": "발음"},
+                {"att": "pronunciation", "val": word},
+                {"att": "sound", "val": f"https://example.org/sound/{entry_id}.wav"},
+            ]},
+        }
+
+
+def generate(output_folder, entries, per_file=5000, seed=0, hanja_path=HANJA_PATH):
+    """!
+    @brief Writes the JSON files of a synthetic dictionary, named like the files of the dump (1_5000_..., 2_5000_...).
+    @param output_folder Folder receiving the files, created if needed.
+    @param entries Total number of entries.
+    @param per_file Number of entries of each file.
+    @param seed Seed of the random generator.
+    @param hanja_path Path of the hanja file the characters are drawn from.
+    @return The list of the paths written.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    dictionary = SyntheticDictionary(load_hanja(hanja_path), seed)
+    paths = []
+    for file_number, start in enumerate(range(0, entries, per_file), 1):
+        count = min(per_file, entries - start)
+        document = {"LexicalResource": {
+            "GlobalInformation": {"feat": {"att": "label", "val": "synthetic 한국어기초사전"}},
+            "Lexicon": {
+                "feat": {"att": "language", "val": "ko"},
+                "LexicalEntry": [dictionary.entry(start + offset + 1) for offset in range(count)],
+            },
+        }}
+        path = os.path.join(output_folder, f"{file_number}_{count}_synthetic.json")
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(document, file, ensure_ascii=False)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic 한국어기초사전 dump generator.")
+    parser.add_argument('output', help="folder receiving the JSON files")
+    parser.add_argument('--entries', type=parse_size, default=parse_size('100k'), help="number of entries : 10k, 100k, 1M...")
+    parser.add_argument('--per-file', type=int, default=5000, help="entries of each file")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the random generator")
+    args = parser.parse_args()
+    paths = generate(args.output, args.entries, args.per_file, args.seed)
+    print(f"{args.entries} entries written to {len(paths)} files in '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
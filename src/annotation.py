@@ -0,0 +1,158 @@
+#! @file src/annotation.py
+import threading
+from collections import deque
+
+# Characters looked up by one query of get_hanja_meanings_for_word, under the SQLite parameter limit
+MEANINGS_BATCH_SIZE = 500
+
+
+class Annotator:
+    """!
+    @brief Aho-Corasick automaton over the dictionary words written with hanja.
+    A text is scanned once, whatever the number of words, and segmented by longest match.
+    Transitions are kept in a single dictionary keyed by (state, character) rather than
+    one dictionary per state, which is much smaller for a trie of this size.
+    """
+
+    def __init__(self, rows):
+        """!
+        @brief Builds the automaton.
+        @param rows An iterable of (word, hanja), the first hanja of a word is kept.
+        """
+        self._hanja = {}
+        self._goto = {}
+        self._fail = [0]
+        # Length of the word ending at each state, 0 when the state isn't the end of a word
+        self._length = [0]
+        # Nearest state, following the failure links, which is the end of a word
+        self._output = [0]
+        for word, hanja in rows:
+            if word and hanja and word not in self._hanja:
+                self._hanja[word] = hanja
+                self._add(word)
+        self._link()
+
+    def __len__(self):
+        return len(self._hanja)
+
+    def _add(self, word):
+        """!
+        @brief Adds a word to the trie.
+        """
+        state = 0
+        for char in word:
+            child = self._goto.get((state, char))
+            if child is None:
+                child = len(self._fail)
+                self._goto[(state, char)] = child
+                self._fail.append(0)
+                self._length.append(0)
+                self._output.append(0)
+            state = child
+        self._length[state] = len(word)
+
+    def _link(self):
+        """!
+        @brief Computes the failure and output links, breadth first.
+        """
+        children = {}
+        for (state, char), child in self._goto.items():
+            children.setdefault(state, []).append((char, child))
+        queue = deque(child for _, child in children.get(0, []))
+        while queue:
+            state = queue.popleft()
+            for char, child in children.get(state, []):
+                fallback = self._fail[state]
+                while fallback and (fallback, char) not in self._goto:
+                    fallback = self._fail[fallback]
+                fail = self._goto.get((fallback, char), 0)
+                self._fail[child] = fail
+                self._output[child] = fail if self._length[fail] else self._output[fail]
+                queue.append(child)
+
+    def segment(self, text, min_length=2):
+        """!
+        @brief Finds the dictionary words of a text, by longest match from left to right.
+        @param text The text to annotate.
+        @param min_length Words shorter than this are ignored (one-syllable words match most particles).
+        @return A list of (start, end, word, hanja), in the order of the text, without overlaps.
+        """
+        # Longest word starting at each position
+        longest = [0] * len(text)
+        state = 0
+        goto = self._goto
+        for end, char in enumerate(text, 1):
+            while state and (state, char) not in goto:
+                state = self._fail[state]
+            state = goto.get((state, char), 0)
+            match = state if self._length[state] else self._output[state]
+            while match:
+                length = self._length[match]
+                if length >= min_length and length > longest[end - length]:
+                    longest[end - length] = length
+                match = self._output[match]
+
+        words = []
+        start = 0
+        while start < len(text):
+            length = longest[start]
+            if length:
+                word = text[start:start + length]
+                words.append((start, start + length, word, self._hanja[word]))
+                start += length
+            else:
+                start += 1
+        return words
+
+    def annotate(self, text, data_access, language, min_length=2):
+        """!
+        @brief Annotates the Sino-Korean words of a text with their hanja and the meanings of its characters.
+        The meanings of all the characters are fetched together with get_hanja_meanings_for_word.
+        @param text The text to annotate.
+        @param data_access The DataAccess (or SnapshotDataAccess) providing the meanings.
+        @param language The language of the meanings ("fr" or "en").
+        @param min_length Minimum length of the annotated words.
+        @return A list of dictionaries with the start, end, word, hanja and character meanings of each word.
+        """
+        words = self.segment(text, min_length)
+        characters = list(dict.fromkeys(char for _, _, _, hanja in words for char in hanja))
+        meanings = {}
+        for index in range(0, len(characters), MEANINGS_BATCH_SIZE):
+            batch = characters[index:index + MEANINGS_BATCH_SIZE]
+            for character, korean, meaning in data_access.get_hanja_meanings_for_word(text, batch, language) or []:
+                meanings[character] = (korean, meaning)
+
+        annotations = []
+        for start, end, word, hanja in words:
+            annotations.append({
+                "start": start,
+                "end": end,
+                "word": word,
+                "hanja": hanja,
+                "meanings": [
+                    {"character": char, "korean": meanings[char][0], "meaning": meanings[char][1]}
+                    for char in dict.fromkeys(hanja) if char in meanings
+                ],
+            })
+        return annotations
+
+
+_annotator = None
+_annotator_generation = None
+_annotator_lock = threading.Lock()
+
+
+def get_annotator(data_access):
+    """!
+    @brief Returns the automaton of the current dataset, building it on first use and after each ingestion.
+    @param data_access The DataAccess (or SnapshotDataAccess) providing the words.
+    @return An Annotator.
+    """
+    global _annotator, _annotator_generation
+    generation = data_access.get_dataset_generation()
+    if _annotator is None or _annotator_generation != generation:
+        with _annotator_lock:
+            if _annotator is None or _annotator_generation != generation:
+                _annotator = Annotator(data_access.get_hanja_words())
+                _annotator_generation = generation
+    return _annotator
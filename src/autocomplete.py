@@ -0,0 +1,120 @@
+#! @file src/autocomplete.py
+import threading
+from bisect import bisect_left
+
+# Compatibility jamo of the initial consonants, vowels and final consonants of a Hangul syllable
+INITIALS = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+VOWELS = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+FINALS = ['', 'ㄱ', 'ㄲ', 'ㄳ', 'ㄴ', 'ㄵ', 'ㄶ', 'ㄷ', 'ㄹ', 'ㄺ', 'ㄻ', 'ㄼ', 'ㄽ', 'ㄾ', 'ㄿ', 'ㅀ',
+          'ㅁ', 'ㅂ', 'ㅄ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+# Compound jamo split into the jamo typed to write them, so "ㅎㅗ" is a prefix of "화"
+COMPOUND_JAMO = {
+    'ㄳ': 'ㄱㅅ', 'ㄵ': 'ㄴㅈ', 'ㄶ': 'ㄴㅎ', 'ㄺ': 'ㄹㄱ', 'ㄻ': 'ㄹㅁ', 'ㄼ': 'ㄹㅂ', 'ㄽ': 'ㄹㅅ',
+    'ㄾ': 'ㄹㅌ', 'ㄿ': 'ㄹㅍ', 'ㅀ': 'ㄹㅎ', 'ㅄ': 'ㅂㅅ',
+    'ㅘ': 'ㅗㅏ', 'ㅙ': 'ㅗㅐ', 'ㅚ': 'ㅗㅣ', 'ㅝ': 'ㅜㅓ', 'ㅞ': 'ㅜㅔ', 'ㅟ': 'ㅜㅣ', 'ㅢ': 'ㅡㅣ',
+}
+SYLLABLE_START = 0xAC00
+SYLLABLE_END = 0xD7A3
+
+
+def decompose(text):
+    """!
+    @brief Decomposes Hangul syllables into the sequence of jamo typed to write them.
+    Other characters are kept as they are.
+    @param text The text to decompose, for example "한자" or "하ㄴ".
+    @return The jamo string, for example "ㅎㅏㄴㅈㅏ" or "ㅎㅏㄴ".
+    """
+    jamo = []
+    for char in text:
+        code = ord(char)
+        if SYLLABLE_START <= code <= SYLLABLE_END:
+            index = code - SYLLABLE_START
+            parts = (INITIALS[index // 588], VOWELS[index % 588 // 28], FINALS[index % 28])
+        else:
+            parts = (char,)
+        for part in parts:
+            jamo.append(COMPOUND_JAMO.get(part, part))
+    return ''.join(jamo)
+
+
+class AutocompleteIndex:
+    """!
+    @brief Sorted-array index answering prefix queries on the dictionary words.
+    Words are kept twice, sorted by their text and by their jamo decomposition, so a query
+    is two binary searches followed by a scan of at most `limit` matches.
+    """
+
+    def __init__(self, rows):
+        """!
+        @brief Builds the index.
+        @param rows An iterable of (word, englishLemma, frenchLemma), the first row of a word is kept.
+        """
+        lemmas = {}
+        for word, english_lemma, french_lemma in rows:
+            if word and word not in lemmas:
+                lemmas[word] = (english_lemma, french_lemma)
+        self._lemmas = lemmas
+        self._words = sorted(lemmas)
+        pairs = sorted((decompose(word), word) for word in lemmas)
+        self._jamo_keys = [key for key, _ in pairs]
+        self._jamo_words = [word for _, word in pairs]
+
+    def __len__(self):
+        return len(self._words)
+
+    def complete(self, prefix, language, limit=10):
+        """!
+        @brief Finds the words starting with a prefix. Words starting with the prefix as typed
+        come first, then the words matching it jamo by jamo ("하ㄴ" or "한" also find "하나").
+        @param prefix The beginning of the word.
+        @param language The language of the lemmas ("fr" or "en").
+        @param limit Maximum number of words returned.
+        @return A list of dictionaries with the word and its lemma.
+        """
+        if not prefix or limit <= 0:
+            return []
+        matches = list(self._scan(self._words, self._words, prefix, limit))
+        if len(matches) < limit:
+            seen = set(matches)
+            for word in self._scan(self._jamo_keys, self._jamo_words, decompose(prefix), limit + len(matches)):
+                if word not in seen:
+                    matches.append(word)
+                    if len(matches) == limit:
+                        break
+        lemma_index = 1 if language == "fr" else 0
+        return [{"word": word, "lemma": self._lemmas[word][lemma_index]} for word in matches]
+
+    def _scan(self, keys, words, prefix, limit):
+        """!
+        @brief Yields the words whose key starts with the prefix, in key order.
+        @param keys The sorted keys.
+        @param words The words, in the order of the keys.
+        @param prefix The prefix of the keys.
+        @param limit Maximum number of words yielded.
+        """
+        index = bisect_left(keys, prefix)
+        end = min(len(keys), index + limit)
+        while index < end and keys[index].startswith(prefix):
+            yield words[index]
+            index += 1
+
+
+_index = None
+_index_generation = None
+_index_lock = threading.Lock()
+
+
+def get_autocomplete_index(data_access):
+    """!
+    @brief Returns the index of the current dataset, building it on first use and after each ingestion.
+    @param data_access The DataAccess (or SnapshotDataAccess) providing the words.
+    @return An AutocompleteIndex.
+    """
+    global _index, _index_generation
+    generation = data_access.get_dataset_generation()
+    if _index is None or _index_generation != generation:
+        with _index_lock:
+            if _index is None or _index_generation != generation:
+                _index = AutocompleteIndex(data_access.get_all_words())
+                _index_generation = generation
+    return _index
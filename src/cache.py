@@ -0,0 +1,320 @@
+#! @file src/cache.py
+import functools
+import gzip
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from src.config import (
+    GENERATION_CHECK_INTERVAL, RESULT_CACHE_SIZE, RESPONSE_BROTLI_QUALITY, RESPONSE_CACHE_SIZE, RESPONSE_GZIP_LEVEL, RESPONSE_MIN_COMPRESS_SIZE
+)
+
+try:
+    import brotli
+except ImportError:  # Optional (requirements-brotli.txt) : without it the responses are only compressed with gzip
+    brotli = None
+
+class ResultCache:
+    """!
+    @brief A bounded LRU cache for the results of the DataAccess read methods.
+    Every entry is tagged with the dataset generation it was computed from, so the cache
+    empties itself as soon as an ingestion changes the generation stored in the database.
+    The size of an entry is the number of rows of its result, which keeps the large
+    related-words lists of common characters from crowding out everything else.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE):
+        """!
+        @brief Initializes an empty cache.
+        @param max_size Maximum total size (in rows) of the cached results.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, generation):
+        """!
+        @brief Looks up a cached result.
+        @param key The key of the result.
+        @param generation The current dataset generation.
+        @return A tuple (found, result).
+        """
+        with self._lock:
+            if generation != self.generation:
+                self._reset(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, generation, result, size=None):
+        """!
+        @brief Stores a result, evicting the least recently used ones if the cache is full.
+        @param key The key of the result.
+        @param generation The dataset generation the result was computed from.
+        @param result The result to store, it must not be modified afterwards.
+        @param size The size of the result, its number of rows by default.
+        """
+        if size is None:
+            size = len(result) + 1 if isinstance(result, (list, tuple)) else 1
+        if size > self.max_size:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (result, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """!
+        @brief Empties the cache and resets its counters.
+        """
+        with self._lock:
+            self._reset(None)
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """!
+        @brief Returns the counters of the cache.
+        @return A dictionary with the hits, misses, evictions, entries, size and generation.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size': self.size,
+                'max_size': self.max_size,
+                'generation': self.generation,
+            }
+
+    def _reset(self, generation):
+        """!
+        @brief Drops every entry, the lock must be held.
+        @param generation The new dataset generation.
+        """
+        self._entries.clear()
+        self.size = 0
+        self.generation = generation
+
+
+class CachedResponse:
+    """!
+    @brief The body of a response, serialized once, and its compressed encodings.
+    """
+    __slots__ = ('mimetype', 'bodies', 'seconds')
+
+    def __init__(self, body, mimetype, seconds):
+        """!
+        @brief Compresses the body. Small bodies are only kept uncompressed, compressing them saves nothing.
+        @param body The body, in bytes.
+        @param mimetype The mimetype of the response.
+        @param seconds Time spent producing the body, saved by every hit.
+        """
+        self.mimetype = mimetype
+        self.seconds = seconds
+        self.bodies = {None: body}
+        if len(body) >= RESPONSE_MIN_COMPRESS_SIZE:
+            # mtime=0 : the same body always gives the same bytes
+            self.bodies['gzip'] = gzip.compress(body, RESPONSE_GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.bodies['br'] = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+
+    @property
+    def size(self):
+        """!
+        @brief Returns the size, in bytes, of every encoding of the body.
+        """
+        return sum(len(body) for body in self.bodies.values())
+
+
+class ResponseCache(ResultCache):
+    """!
+    @brief A bounded LRU cache of serialized response bodies, stored with their gzip and brotli
+    encodings so a hit is sent without rendering, serializing or compressing anything.
+    Its size is counted in bytes, and it empties itself when the dataset generation changes.
+    """
+
+    def __init__(self, max_size=RESPONSE_CACHE_SIZE):
+        """!
+        @brief Initializes an empty cache.
+        @param max_size Maximum total size (in bytes) of the cached bodies.
+        """
+        super().__init__(max_size)
+        self.bytes_sent = 0
+        self.bytes_uncompressed = 0
+        self.seconds_saved = 0.0
+        self.compress_seconds = 0.0
+
+    @property
+    def encodings(self):
+        """!
+        @brief Returns the encodings the responses can be sent with, the preferred one first.
+        """
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def store(self, key, generation, body, mimetype, seconds):
+        """!
+        @brief Compresses a body and stores it.
+        @param key The key of the response.
+        @param generation The dataset generation the body was produced from.
+        @param body The body, in bytes.
+        @param mimetype The mimetype of the response.
+        @param seconds Time spent producing the body.
+        @return The CachedResponse, even when it is too large to be kept.
+        """
+        start = time.perf_counter()
+        entry = CachedResponse(body, mimetype, seconds)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.compress_seconds += elapsed
+        self.put(key, generation, entry, entry.size)
+        return entry
+
+    def body(self, entry, encoding, hit):
+        """!
+        @brief Returns the body to send for an encoding, and counts the bytes sent and the time saved.
+        @param entry The CachedResponse.
+        @param encoding The encoding accepted by the client, None for the uncompressed body.
+        @param hit True if the entry was found in the cache.
+        @return A tuple (encoding used, body).
+        """
+        if encoding not in entry.bodies:
+            encoding = None
+        body = entry.bodies[encoding]
+        with self._lock:
+            self.bytes_sent += len(body)
+            self.bytes_uncompressed += len(entry.bodies[None])
+            if hit:
+                self.seconds_saved += entry.seconds
+        return encoding, body
+
+    def clear(self):
+        """!
+        @brief Empties the cache and resets its counters.
+        """
+        super().clear()
+        with self._lock:
+            self.bytes_sent = 0
+            self.bytes_uncompressed = 0
+            self.seconds_saved = 0.0
+            self.compress_seconds = 0.0
+
+    def stats(self):
+        """!
+        @brief Returns the counters of the cache.
+        @return The counters of ResultCache, the size being in bytes, with the bytes sent, the bytes the
+                same responses would have taken uncompressed, the seconds of rendering saved by the hits
+                and the seconds spent compressing.
+        """
+        stats = super().stats()
+        with self._lock:
+            stats.update({
+                'bytes_sent': self.bytes_sent,
+                'bytes_uncompressed': self.bytes_uncompressed,
+                'seconds_saved': self.seconds_saved,
+                'compress_seconds': self.compress_seconds,
+                'encodings': list(self.encodings),
+            })
+        return stats
+
+
+class GenerationCache:
+    """!
+    @brief Keeps the dataset generation read from the database for a short interval, so a hit of the
+    result cache is served without any query. Another process's ingestion is seen at most `interval`
+    seconds later, and the process writing the database sees its own ingestion at once.
+    """
+
+    def __init__(self, interval=GENERATION_CHECK_INTERVAL):
+        """!
+        @brief Initializes the cache, the first call reads the generation.
+        @param interval Seconds a generation read from the database is kept, 0 to read it every time.
+        """
+        self.interval = interval
+        self._generation = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, read):
+        """!
+        @brief Returns the dataset generation, read again once the interval has elapsed.
+        @param read Function reading the generation from the database.
+        @return The generation number.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._expires:
+                return self._generation
+        generation = read()
+        with self._lock:
+            self._generation = generation
+            self._expires = now + self.interval
+        return generation
+
+    def invalidate(self):
+        """!
+        @brief Makes the next call read the generation from the database, used after an ingestion.
+        """
+        with self._lock:
+            self._expires = 0.0
+
+
+# Shared by every DataAccess of the process
+result_cache = ResultCache()
+dataset_generation = GenerationCache()
+# Shared by the cacheable routes of the web server
+response_cache = ResponseCache()
+
+
+def rows_size(field):
+    """!
+    @brief Size function of the results holding their rows in a field, like the pages of related words.
+    @param field Name of the list of rows in the result.
+    @return A function giving the number of rows of a result, plus one.
+    """
+    return lambda result: len(result[field]) + 1
+
+
+def cached(endpoint, size=None):
+    """!
+    @brief Decorator caching a DataAccess read method in result_cache.
+    The key is made of the endpoint name and the values of every parameter of the call (word or hanja,
+    language...), defaults included, so passing an argument by name or leaving it out gives the same key.
+    @param endpoint Name of the endpoint the method serves.
+    @param size Function giving the size of a result, see rows_size. By default a list counts its rows.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            values = list(bound.arguments.values())[1:]
+            key = (endpoint,) + tuple(tuple(value) if isinstance(value, list) else value for value in values)
+            generation = self.get_dataset_generation()
+            found, result = result_cache.get(key, generation)
+            if not found:
+                result = method(self, *args, **kwargs)
+                result_cache.put(key, generation, result, size(result) if size is not None else None)
+            return result
+        return wrapper
+    return decorator
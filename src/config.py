@@ -3,6 +3,68 @@ import os
 
 # Chemin vers la base de données
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DATABASE_PATH = os.path.join(BASE_DIR, '..', 'database', 'korean_learning.db')
+DATABASE_PATH = os.environ.get('HANJA_DATABASE', os.path.join(BASE_DIR, '..', 'database', 'korean_learning.db'))
 
-# Autres configurations (par exemple, chemins vers les données, paramètres, etc.)
\ No newline at end of file
+# Instantané binaire en lecture seule (python -m src.snapshot), utilisé par le serveur si la variable est définie
+SNAPSHOT_PATH = os.environ.get('HANJA_SNAPSHOT')
+# Dictionnaire chargé en mémoire au démarrage (src/memory_store.py) si HANJA_MEMORY_STORE=1
+MEMORY_STORE = os.environ.get('HANJA_MEMORY_STORE') == '1'
+
+# Réglages SQLite des connexions de lecture (serveur web)
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # Bytes of the database file mapped in memory
+SQLITE_CACHE_SIZE = -64 * 1024  # Negative value : page cache size in KiB
+SQLITE_STATEMENT_CACHE_SIZE = 256  # Prepared statements kept by each connection
+
+# Les requêtes SQL plus longues que ce seuil (en millisecondes) sont affichées dans les logs, désactivé si non défini
+SLOW_QUERY_THRESHOLD_MS = float(os.environ['HANJA_SLOW_QUERY_MS']) if os.environ.get('HANJA_SLOW_QUERY_MS') else None
+
+# Taille maximale du cache des résultats (en nombre de lignes), 0 pour le désactiver
+RESULT_CACHE_SIZE = int(os.environ.get('HANJA_RESULT_CACHE_SIZE', 200000))
+# Intervalle (en secondes) entre deux lectures de la génération du jeu de données par un processus du serveur
+GENERATION_CHECK_INTERVAL = float(os.environ.get('HANJA_GENERATION_CHECK_INTERVAL', 1.0))
+
+# Cache des réponses sérialisées et compressées des routes GET (en octets), 0 pour le désactiver
+RESPONSE_CACHE_SIZE = int(os.environ.get('HANJA_RESPONSE_CACHE_SIZE', 64 * 1024 * 1024))
+RESPONSE_GZIP_LEVEL = 6
+RESPONSE_BROTLI_QUALITY = 5  # 0 to 11, the bodies are only compressed once
+RESPONSE_MIN_COMPRESS_SIZE = 512  # Bytes, smaller bodies are sent uncompressed
+
+# Nombre d'entrées insérées par transaction pendant l'ingestion
+INSERT_BATCH_SIZE = 5000
+
+# Traduction des définitions des hanja pendant l'ingestion
+TRANSLATION_BACKEND = os.environ.get('HANJA_TRANSLATOR', 'google')  # 'google' or 'offline'
+TRANSLATION_CACHE_PATH = os.path.join(BASE_DIR, '..', 'database', 'translation_cache.db')
+TRANSLATION_BATCH_SIZE = 50  # Texts sent to the backend by one task
+TRANSLATION_WORKERS = 8  # Batches translated at the same time
+
+# Limites de l'API de recherche par lots (POST /api/lookup)
+LOOKUP_MAX_BODY_SIZE = 256 * 1024  # Bytes of the JSON request body
+LOOKUP_MAX_WORDS = 2000  # Words in one request
+LOOKUP_MAX_WORD_LENGTH = 64  # Characters of one word
+LOOKUP_QUERY_BATCH_SIZE = 500  # Words looked up by one query, the response is streamed batch by batch
+
+# Nombre de mots liés par page de /related-words (par défaut, et au maximum)
+RELATED_WORDS_PAGE_SIZE = 30
+RELATED_WORDS_MAX_PAGE_SIZE = 100
+
+# Nombre de caractères par page de /hanja/strokes (par défaut, et au maximum)
+HANJA_PAGE_SIZE = 100
+HANJA_MAX_PAGE_SIZE = 500
+
+# Cache HTTP des pages GET (/w/<mot>, /related-words) : navigateur et CDN (Vercel)
+HTTP_MAX_AGE = 300  # Seconds a browser keeps a response before revalidating it
+HTTP_S_MAXAGE = 86400  # Seconds the CDN keeps a response, the ETag changes with each ingestion
+# Version déployée, incluse dans les ETag pour qu'un nouveau déploiement invalide les pages en cache
+RELEASE = os.environ.get('VERCEL_GIT_COMMIT_SHA', 'dev')[:12]
+
+# Longueur maximale (en caractères) d'un texte annoté par POST /annotate
+ANNOTATE_MAX_LENGTH = 20000
+
+# Mode ASGI (uvicorn api.asgi:app) : requêtes exécutées en même temps, et taille maximale du corps d'une requête
+ASGI_THREADS = int(os.environ.get('HANJA_ASGI_THREADS', 8))
+ASGI_MAX_BODY_SIZE = 1024 * 1024
+# Taille (en octets) jusqu'à laquelle les morceaux d'une réponse en flux sont regroupés avant d'être envoyés
+ASGI_SEND_BUFFER_SIZE = int(os.environ.get('HANJA_ASGI_SEND_BUFFER_SIZE', 64 * 1024))
+
+# Autres configurations (par exemple, chemins vers les données, paramètres, etc.)
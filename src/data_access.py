@@ -1,8 +1,32 @@
 #! @file src/data_access.py
+import itertools
+import json
+import re
 import sqlite3
-from src.config import DATABASE_PATH
+from src.cache import cached, dataset_generation, rows_size
+from src.config import DATABASE_PATH, HANJA_PAGE_SIZE, INSERT_BATCH_SIZE, RELATED_WORDS_PAGE_SIZE
 from src.database import DatabaseConnection
 
+# Code points of the CJK ideographs : the unified ideographs, their extensions A to H and the compatibility
+# ideographs. The other characters of a hanja, like the hangul of the 하다 verbs, aren't indexed.
+IDEOGRAPH_RANGES = ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0x20000, 0x323AF))
+
+def is_ideograph_sql(column):
+    """!
+    @brief Builds the SQL condition checking that a single character is a CJK ideograph.
+    @param column The SQL expression of the character.
+    @return The condition, to be embedded in a query.
+    """
+    return '(' + ' OR '.join(f'unicode({column}) BETWEEN {low} AND {high}' for low, high in IDEOGRAPH_RANGES) + ')'
+
+def is_ideograph(character):
+    """!
+    @brief Checks that a single character is a CJK ideograph, the Python version of is_ideograph_sql.
+    @param character The character.
+    @return True if it is indexed in 'word_hanja_chars'.
+    """
+    return any(low <= ord(character) <= high for low, high in IDEOGRAPH_RANGES)
+
 class DataAccess:
     """!
     @brief A class to handle database operations for managing Korean words and their associated Hanja characters.
@@ -22,18 +46,82 @@ class DataAccess:
         - `englishDefinition` (TEXT): English definition of the word.
         - `frenchLemma` (TEXT): Lemma/word in French.
         - `frenchDefinition` (TEXT): French definition of the word.
+        The glossary is the definition of the first sense, the lemmas and definitions those of the first sense translated in each language.
+        `idx_korean_words_word_id` gives the entries of a word in id order.
+
+        **senses**
+        - `word_id` (INTEGER, NOT NULL): Id of the entry in `korean_words`.
+        - `sense_number` (INTEGER, NOT NULL): Position of the sense in the entry, starting at 0.
+        - `definition` (TEXT): Definition of the sense in Korean.
+
+        **equivalents**
+        - `word_id` (INTEGER, NOT NULL): Id of the entry in `korean_words`.
+        - `language` (TEXT, NOT NULL): `en` or `fr`.
+        - `sense_number` (INTEGER, NOT NULL): The sense translated.
+        - `lemma` (TEXT): Lemma/word in the language.
+        - `definition` (TEXT): Definition of the sense in the language.
+        Both are keyed by entry first, so the senses of an entry, and their translation in one language, are read in one range.
 
         **hanja_characters**
         - `id` (INTEGER, PRIMARY KEY AUTOINCREMENT): Unique identifier for each Hanja character.
         - `character` (TEXT, NOT NULL, UNIQUE): The Hanja character.
         - `korean` (TEXT, NOT NULL): Korean pronunciation of the Hanja.
         - `englishDefinition` (TEXT): Meaning of the Hanja character in english.
-        - `frenchDefinition` (TEXT): Meaning of the Hanja character in french.
+        - `frenchDefinition` (TEXT): Meaning of the Hanja character in french, NULL while it isn't translated.
         - `pronounciation` (TEXT): html link of audio for the word's pronounciation.
+        - `reading` (TEXT): Reading of the character, the `[가]` group of the hanja file it is first found in.
+        - `gloss` (TEXT): Meaning and sound (훈음) of the character for that reading, like `거짓 가`.
+        - `stroke_count` (INTEGER): Number of strokes of the character.
+
+        **hanja_readings**
+        - `reading` (TEXT, NOT NULL): A reading of a character, a character can have several (樂 : 락, 악, 요).
+        - `character` (TEXT, NOT NULL): The Hanja character.
+        - `gloss` (TEXT): Meaning and sound (훈음) of the character for that reading.
+
+        **hanja_variants**
+        - `variant` (TEXT, NOT NULL): A variant form of a character, like 仮.
+        - `character` (TEXT, NOT NULL): The character it is a variant of, like 假.
+        - `relation` (TEXT, NOT NULL): The kind of variant : 略字, 同字, 俗字, 古字, 本字...
+
+        **word_hanja_chars**
+        - `character` (TEXT, NOT NULL): One CJK ideograph of `korean_words.hanja`, the hangul of the 하다 verbs isn't indexed.
+        - `position` (INTEGER, NOT NULL): Position of the character in `korean_words.hanja`, starting at 0.
+        - `word_id` (INTEGER, NOT NULL): Id of the word in `korean_words`.
+
+        **hanja_char_words**
+        - `character` (TEXT, NOT NULL): One character of `korean_words.hanja`.
+        - `word` (TEXT, NOT NULL): A word written with that character.
+        - `entry_count` (INTEGER, NOT NULL): Number of entries of that word written with that character.
+
+        **hanja_char_stats**
+        - `character` (TEXT, PRIMARY KEY): One character of `korean_words.hanja`.
+        - `word_count` (INTEGER, NOT NULL): Number of distinct words written with the character.
+        - `entry_count` (INTEGER, NOT NULL): Number of entries written with the character.
+        - `first_word_id` (INTEGER, NOT NULL): Id of the first entry written with the character.
+        - `rank` (INTEGER): Rank of the character by `word_count`, 1 for the most used.
+        Both tables are maintained by triggers on `word_hanja_chars`, and the ranks after each ingestion.
+
+        **dataset_info**
+        - `key` (TEXT, PRIMARY KEY): Name of the value, `generation` is increased by every ingestion write.
+        - `value` (INTEGER): The value.
+
+        **source_files**
+        - `source` (TEXT, PRIMARY KEY): Name of an ingested file (JSON file of the dump, or `hanja.txt`).
+        - `kind` (TEXT, NOT NULL): `words` for the dump files, `hanja` for the hanja file.
+        - `content_hash` (TEXT, NOT NULL): SHA-256 of the file when it was ingested.
+
+        **source_file_entries**
+        - `source` (TEXT, NOT NULL): Name of a dump file in `source_files`.
+        - `word_id` (INTEGER, NOT NULL): Id of a word of `korean_words` found in that file.
+
+        **korean_words_fts_en**, **korean_words_fts_fr**
+        - FTS5 indexes over `korean_words` (`englishLemma`, `englishDefinition`, `glossary` and
+          `frenchLemma`, `frenchDefinition`, `glossary`), kept in sync by triggers. English is stemmed
+          with the porter tokenizer, accents are ignored in both.
 
         @image html database_diagram.png width=400
         """
-        with DatabaseConnection() as conn:
+        with DatabaseConnection(writable=True) as conn:
             cursor = conn.cursor()
             # Check if the 'korean_words' table exists
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='korean_words'")
@@ -53,25 +141,382 @@ class DataAccess:
                     pronounciation TEXT
                 )
                 ''')
-                """ cursor.execute('''
-                CREATE TABLE hanja_characters (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    character TEXT NOT NULL UNIQUE,
-                    korean TEXT NOT NULL,
-                    englishDefinition TEXT,
-                    frenchDefinition TEXT
-                )
-                ''') """
                 conn.commit()  # Save the changes to the database
                 print("Tables created.")
             else:
                 print("Tables already exist.")
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hanja_characters (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                character TEXT NOT NULL UNIQUE,
+                korean TEXT NOT NULL,
+                englishDefinition TEXT,
+                frenchDefinition TEXT,
+                reading TEXT,
+                gloss TEXT,
+                stroke_count INTEGER
+            )
+            ''')
+            # Columns parsed from the hanja file, added to the databases created before them
+            cursor.execute('PRAGMA table_info(hanja_characters)')
+            hanja_columns = {row[1] for row in cursor.fetchall()}
+            hanja_migrated = 'stroke_count' not in hanja_columns
+            for column, column_type in (('reading', 'TEXT'), ('gloss', 'TEXT'), ('stroke_count', 'INTEGER')):
+                if column not in hanja_columns:
+                    cursor.execute(f'ALTER TABLE hanja_characters ADD COLUMN {column} {column_type}')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_hanja_characters_stroke_count ON hanja_characters (stroke_count, character)')
+            # Every reading of a character, 樂 is read 락, 악 and 요
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hanja_readings (
+                reading TEXT NOT NULL,
+                character TEXT NOT NULL,
+                gloss TEXT,
+                PRIMARY KEY (reading, character)
+            ) WITHOUT ROWID
+            ''')
+            # "仮=거짓 가, 假의 略字" : the variant 仮 is the 略字 of the character 假
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hanja_variants (
+                variant TEXT NOT NULL,
+                character TEXT NOT NULL,
+                relation TEXT NOT NULL,
+                PRIMARY KEY (variant, character, relation)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_hanja_variants_character ON hanja_variants (character)')
+            # One row per (word, hanja), used by INSERT OR IGNORE and by the lookups by word
+            cursor.execute('DROP INDEX IF EXISTS idx_korean_words_word')
+            cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_korean_words_word_hanja ON korean_words (word, hanja)')
+
+            # Every sense of the entries and its translations, korean_words only keeps the first ones
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='senses'")
+            senses_exist = cursor.fetchone()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS senses (
+                word_id INTEGER NOT NULL,
+                sense_number INTEGER NOT NULL,
+                definition TEXT,
+                PRIMARY KEY (word_id, sense_number)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS equivalents (
+                word_id INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                sense_number INTEGER NOT NULL,
+                lemma TEXT,
+                definition TEXT,
+                PRIMARY KEY (word_id, language, sense_number)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS korean_words_delete_senses AFTER DELETE ON korean_words
+            BEGIN
+                DELETE FROM senses WHERE word_id = OLD.id;
+                DELETE FROM equivalents WHERE word_id = OLD.id;
+            END
+            ''')
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM korean_words)')
+            senses_migrated = not senses_exist and cursor.fetchone()[0]
+
+            # Inverted index of the hanja characters, so lookups by character don't scan korean_words
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='word_hanja_chars'")
+            index_exists = cursor.fetchone()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS word_hanja_chars (
+                character TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                word_id INTEGER NOT NULL,
+                PRIMARY KEY (character, word_id, position)
+            ) WITHOUT ROWID
+            ''')
+            # The covering indexes of the earlier versions, replaced by idx_korean_words_word_id
+            cursor.execute('DROP INDEX IF EXISTS idx_korean_words_word_en')
+            cursor.execute('DROP INDEX IF EXISTS idx_korean_words_word_fr')
+            self.create_secondary_indexes(cursor)
+            # Before the delete, so the triggers of the statistics below can still read the word
+            cursor.execute('DROP TRIGGER IF EXISTS korean_words_delete_hanja_chars')
+            cursor.execute('''
+            CREATE TRIGGER korean_words_delete_hanja_chars BEFORE DELETE ON korean_words
+            BEGIN
+                DELETE FROM word_hanja_chars WHERE word_id = OLD.id;
+            END
+            ''')
+            if not index_exists:
+                # Fill the index for the words inserted before it existed
+                self.build_hanja_char_index(cursor)
+
+            # Statistics of the hanja characters, updated for each row added to or removed from word_hanja_chars
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='hanja_char_stats'")
+            stats_exist = cursor.fetchone()
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hanja_char_words (
+                character TEXT NOT NULL,
+                word TEXT NOT NULL,
+                entry_count INTEGER NOT NULL,
+                PRIMARY KEY (character, word)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hanja_char_stats (
+                character TEXT PRIMARY KEY,
+                word_count INTEGER NOT NULL,
+                entry_count INTEGER NOT NULL,
+                first_word_id INTEGER NOT NULL,
+                rank INTEGER
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_hanja_char_stats_word_count ON hanja_char_stats (word_count, character)')
+            # The triggers are created again : the earlier versions also counted the hangul of the hanja
+            # (하다 verbs...), whose rows are removed
+            cursor.execute('DROP TRIGGER IF EXISTS word_hanja_chars_insert_stats')
+            cursor.execute('DROP TRIGGER IF EXISTS word_hanja_chars_delete_stats')
+            cursor.execute(f'''
+            DELETE FROM word_hanja_chars WHERE character IN (
+                SELECT character FROM hanja_char_stats WHERE NOT {is_ideograph_sql('character')}
+            )
+            ''')
+            cursor.execute(f"DELETE FROM hanja_char_words WHERE NOT {is_ideograph_sql('character')}")
+            cursor.execute(f"DELETE FROM hanja_char_stats WHERE NOT {is_ideograph_sql('character')}")
+            if cursor.rowcount:
+                self.refresh_hanja_char_ranks(cursor)
+            # A character repeated in a hanja (人人) counts once for the entry : only the first
+            # of its rows to be inserted, and the last one to be deleted, update the statistics
+            cursor.execute(f'''
+            CREATE TRIGGER word_hanja_chars_insert_stats AFTER INSERT ON word_hanja_chars
+            WHEN {is_ideograph_sql('NEW.character')} AND NOT EXISTS (
+                SELECT 1 FROM word_hanja_chars
+                WHERE character = NEW.character AND word_id = NEW.word_id AND position <> NEW.position
+            )
+            BEGIN
+                INSERT INTO hanja_char_stats (character, word_count, entry_count, first_word_id)
+                VALUES (NEW.character, 0, 1, NEW.word_id)
+                ON CONFLICT (character) DO UPDATE SET
+                    entry_count = entry_count + 1,
+                    first_word_id = min(first_word_id, excluded.first_word_id);
+                INSERT INTO hanja_char_words (character, word, entry_count)
+                VALUES (NEW.character, (SELECT word FROM korean_words WHERE id = NEW.word_id), 1)
+                ON CONFLICT (character, word) DO UPDATE SET entry_count = entry_count + 1;
+            END
+            ''')
+            cursor.execute(f'''
+            CREATE TRIGGER word_hanja_chars_delete_stats AFTER DELETE ON word_hanja_chars
+            WHEN {is_ideograph_sql('OLD.character')} AND NOT EXISTS (
+                SELECT 1 FROM word_hanja_chars WHERE character = OLD.character AND word_id = OLD.word_id
+            )
+            BEGIN
+                UPDATE hanja_char_words SET entry_count = entry_count - 1
+                WHERE character = OLD.character AND word = (SELECT word FROM korean_words WHERE id = OLD.word_id);
+                DELETE FROM hanja_char_words WHERE character = OLD.character AND entry_count = 0;
+                UPDATE hanja_char_stats SET
+                    entry_count = entry_count - 1,
+                    first_word_id = CASE WHEN first_word_id = OLD.word_id
+                        THEN coalesce((SELECT min(word_id) FROM word_hanja_chars WHERE character = OLD.character), 0)
+                        ELSE first_word_id END
+                WHERE character = OLD.character;
+                DELETE FROM hanja_char_stats WHERE character = OLD.character AND entry_count = 0;
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS hanja_char_words_insert_stats AFTER INSERT ON hanja_char_words
+            BEGIN
+                UPDATE hanja_char_stats SET word_count = word_count + 1 WHERE character = NEW.character;
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS hanja_char_words_delete_stats AFTER DELETE ON hanja_char_words
+            BEGIN
+                UPDATE hanja_char_stats SET word_count = word_count - 1 WHERE character = OLD.character;
+            END
+            ''')
+            if not stats_exist:
+                # Compute the statistics of the characters indexed before the tables existed, once
+                cursor.execute(f"DELETE FROM word_hanja_chars WHERE NOT {is_ideograph_sql('character')}")
+                cursor.execute('''
+                INSERT INTO hanja_char_words (character, word, entry_count)
+                SELECT c.character, kw.word, COUNT(DISTINCT c.word_id)
+                FROM word_hanja_chars c JOIN korean_words kw ON kw.id = c.word_id
+                GROUP BY c.character, kw.word
+                ''')
+                cursor.execute('''
+                INSERT INTO hanja_char_stats (character, word_count, entry_count, first_word_id)
+                SELECT w.character, COUNT(*), SUM(w.entry_count),
+                       (SELECT min(word_id) FROM word_hanja_chars WHERE character = w.character)
+                FROM hanja_char_words w
+                GROUP BY w.character
+                ''')
+                self.refresh_hanja_char_ranks(cursor)
+
+            # Manifest of the ingested files, used to only reload the files that changed
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS source_files (
+                source TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+            ''')
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS source_file_entries (
+                source TEXT NOT NULL,
+                word_id INTEGER NOT NULL,
+                PRIMARY KEY (source, word_id)
+            ) WITHOUT ROWID
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_source_file_entries_word_id ON source_file_entries (word_id)')
+            if hanja_migrated:
+                # The new columns are filled by the next ingestion of the hanja file
+                cursor.execute("DELETE FROM source_files WHERE kind = 'hanja'")
+            if senses_migrated:
+                # The words loaded before the senses existed are loaded again by the next ingestion
+                cursor.execute("DELETE FROM source_files WHERE kind = 'words'")
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS korean_words_delete_source_entries AFTER DELETE ON korean_words
+            BEGIN
+                DELETE FROM source_file_entries WHERE word_id = OLD.id;
+            END
+            ''')
+
+            # Full-text indexes of the lemmas and definitions, for the search from English or French
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='korean_words_fts_en'")
+            fts_exists = cursor.fetchone()
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS korean_words_fts_en USING fts5(
+                englishLemma, englishDefinition, glossary,
+                content='korean_words', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            )
+            ''')
+            cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS korean_words_fts_fr USING fts5(
+                frenchLemma, frenchDefinition, glossary,
+                content='korean_words', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS korean_words_fts_insert AFTER INSERT ON korean_words
+            BEGIN
+                INSERT INTO korean_words_fts_en (rowid, englishLemma, englishDefinition, glossary)
+                VALUES (NEW.id, NEW.englishLemma, NEW.englishDefinition, NEW.glossary);
+                INSERT INTO korean_words_fts_fr (rowid, frenchLemma, frenchDefinition, glossary)
+                VALUES (NEW.id, NEW.frenchLemma, NEW.frenchDefinition, NEW.glossary);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS korean_words_fts_delete AFTER DELETE ON korean_words
+            BEGIN
+                INSERT INTO korean_words_fts_en (korean_words_fts_en, rowid, englishLemma, englishDefinition, glossary)
+                VALUES ('delete', OLD.id, OLD.englishLemma, OLD.englishDefinition, OLD.glossary);
+                INSERT INTO korean_words_fts_fr (korean_words_fts_fr, rowid, frenchLemma, frenchDefinition, glossary)
+                VALUES ('delete', OLD.id, OLD.frenchLemma, OLD.frenchDefinition, OLD.glossary);
+            END
+            ''')
+            cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS korean_words_fts_update AFTER UPDATE ON korean_words
+            BEGIN
+                INSERT INTO korean_words_fts_en (korean_words_fts_en, rowid, englishLemma, englishDefinition, glossary)
+                VALUES ('delete', OLD.id, OLD.englishLemma, OLD.englishDefinition, OLD.glossary);
+                INSERT INTO korean_words_fts_fr (korean_words_fts_fr, rowid, frenchLemma, frenchDefinition, glossary)
+                VALUES ('delete', OLD.id, OLD.frenchLemma, OLD.frenchDefinition, OLD.glossary);
+                INSERT INTO korean_words_fts_en (rowid, englishLemma, englishDefinition, glossary)
+                VALUES (NEW.id, NEW.englishLemma, NEW.englishDefinition, NEW.glossary);
+                INSERT INTO korean_words_fts_fr (rowid, frenchLemma, frenchDefinition, glossary)
+                VALUES (NEW.id, NEW.frenchLemma, NEW.frenchDefinition, NEW.glossary);
+            END
+            ''')
+            if not fts_exists:
+                # Index the words inserted before the full-text indexes existed
+                cursor.execute("INSERT INTO korean_words_fts_en (korean_words_fts_en) VALUES ('rebuild')")
+                cursor.execute("INSERT INTO korean_words_fts_fr (korean_words_fts_fr) VALUES ('rebuild')")
+            conn.commit()
+
+    def create_secondary_indexes(self, cursor):
+        """!
+        @brief Creates the indexes that aren't needed while loading, begin_load drops them and end_load builds them again.
+        @param cursor A cursor on a writable connection.
+        """
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_word_hanja_chars_word_id ON word_hanja_chars (word_id)')
+        # The entries of a word in id order, their columns are read from the table. No index covers the
+        # projections of get_word_by_korean and lookup_word : they read the definitions, and on 100k entries
+        # one such index per language took 12.5 MB each against 17.3 MB for the table, for no measurable gain
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_korean_words_word_id ON korean_words (word, id)')
+
+    def drop_secondary_indexes(self, cursor):
+        """!
+        @brief Drops the indexes created by create_secondary_indexes.
+        @param cursor A cursor on a writable connection.
+        """
+        cursor.execute('DROP INDEX IF EXISTS idx_word_hanja_chars_word_id')
+        cursor.execute('DROP INDEX IF EXISTS idx_korean_words_word_id')
+
+    def build_hanja_char_index(self, cursor, after_id=0):
+        """!
+        @brief Fills 'word_hanja_chars' with one row per ideograph of every 'korean_words.hanja' value.
+        Rows already in the index are left untouched.
+        @param cursor A cursor on a writable connection, the caller is responsible for committing.
+        @param after_id Only the words with a greater id are indexed.
+        """
+        cursor.execute('''
+        WITH RECURSIVE split(word_id, position, character, rest) AS (
+            SELECT id, 0, substr(hanja, 1, 1), substr(hanja, 2)
+            FROM korean_words
+            WHERE id > ? AND hanja IS NOT NULL AND hanja <> ''
+            UNION ALL
+            SELECT word_id, position + 1, substr(rest, 1, 1), substr(rest, 2)
+            FROM split
+            WHERE rest <> ''
+        )
+        INSERT OR IGNORE INTO word_hanja_chars (character, position, word_id)
+        SELECT character, position, word_id FROM split WHERE {is_ideograph}
+        '''.format(is_ideograph=is_ideograph_sql('character')), (after_id,))
+
+    def refresh_hanja_char_ranks(self, cursor):
+        """!
+        @brief Updates the rank of the characters in 'hanja_char_stats' after their counts changed.
+        Only the rows whose rank moved are written.
+        @param cursor A cursor on a writable connection, the caller is responsible for committing.
+        """
+        cursor.execute('''
+        UPDATE hanja_char_stats SET rank = ranked.rank
+        FROM (SELECT character, RANK() OVER (ORDER BY word_count DESC) AS rank FROM hanja_char_stats) AS ranked
+        WHERE hanja_char_stats.character = ranked.character AND hanja_char_stats.rank IS NOT ranked.rank
+        ''')
+
+    def begin_load(self, drop_indexes=True):
+        """!
+        @brief Prepares the database for the insert_data calls of an ingestion run, which end with end_load.
+        @param drop_indexes True to drop the secondary indexes until end_load, which is faster when most of the
+            rows are loaded by the run. A run updating a few files keeps them, rather than building them again
+            over the whole table.
+        """
+        if drop_indexes:
+            with DatabaseConnection(writable=True) as conn:
+                cursor = conn.cursor()
+                self.drop_secondary_indexes(cursor)
+                conn.commit()
+
+    def end_load(self):
+        """!
+        @brief Ends an ingestion run started by begin_load : builds the secondary indexes, updates the rank
+        of the hanja characters and invalidates the cached results, once for the whole run.
+        """
+        with DatabaseConnection(writable=True) as conn:
+            cursor = conn.cursor()
+            self.create_secondary_indexes(cursor)
+            self.refresh_hanja_char_ranks(cursor)
+            self.bump_dataset_generation(cursor)
+            conn.commit()
 
-    def insert_data(self, processed_data):
+    def insert_data(self, processed_data, source=None, earlier_sources=None):
         """!
         @brief Inserts processed data into the 'korean_words' table.
+        Within the entries, the first one of each word and hanja is kept. Without `earlier_sources`,
+        the entries whose word and hanja are already in the table are skipped ; with it, their row
+        takes the content of the entry unless a file loaded before this one contains them.
+        The calls are made between begin_load and end_load.
         
-        @param processed_data (list): A list of dictionaries containing word data. Each dictionary should have:
+        @param processed_data (iterable): A list of dictionaries containing word data, or a generator such as
+            DataProcessor.stream_data which is consumed as the rows are inserted. Each dictionary should have:
             - `id` (int): The unique ID for the word (optional if the database assigns it automatically).
             - `word` (str): The Korean word.
             - `hanja` (str): Associated Hanja characters.
@@ -81,80 +526,304 @@ class DataAccess:
             - `frenchLemma` (str): Lemma/word in French.
             - `frenchDefinition` (str): French definition of the word.
             - `pronounciation` (str): html link of audio for the word's pronounciation.
+            - `senses` (list): Every sense of the word, see DataProcessor.extract_senses (optional).
+        @param source (str): Name of the file the entries come from, recorded in 'source_file_entries'
+            for every entry, including the ones already in the table.
+        @param earlier_sources (list): Names of the files coming before `source` in the order of the dump,
+            whose content is kept for the words they share with it. None to never update a row.
+        @return The number of entries read.
         """
-        with DatabaseConnection() as conn:
+        entries = iter(processed_data)
+        count = 0
+        # Word and hanja of the entries already read, only the first one is written
+        seen = set()
+        with DatabaseConnection(bulk_load=True) as conn:
             cursor = conn.cursor()
-            for entry in processed_data:
-                word = entry['word']
-                hanja = entry.get('hanja')
-                glossary = entry.get('glossary')
-                english_lemma = entry.get('englishLemma')
-                english_definition = entry.get('englishDefinition')
-                french_lemma = entry.get('frenchLemma')
-                french_definition = entry.get('frenchDefinition')
-                pronounciation = entry.get('pronounciation')
-                query = """
+            cursor.execute('SELECT COALESCE(MAX(id), 0) FROM korean_words')
+            last_id = cursor.fetchone()[0]
+            earlier = json.dumps(earlier_sources or [])
+            while True:
+                entry_batch = list(itertools.islice(entries, INSERT_BATCH_SIZE))
+                if not entry_batch:
+                    break
+                batch = [
+                    (
+                        entry['word'],
+                        entry.get('hanja'),
+                        entry.get('glossary'),
+                        entry.get('englishLemma'),
+                        entry.get('englishDefinition'),
+                        entry.get('frenchLemma'),
+                        entry.get('frenchDefinition'),
+                        entry.get('pronounciation'),
+                    )
+                    for entry in entry_batch
+                ]
+                # The rows already in the table, and whether an earlier file contains them
+                keys = list({row[:2] for row in batch if row[1] is not None})
+                cursor.execute('''
+                SELECT id, word, hanja, EXISTS (
+                    SELECT 1 FROM source_file_entries
+                    WHERE word_id = korean_words.id AND source IN (SELECT value FROM json_each(?))
+                )
+                FROM korean_words
+                WHERE (word, hanja) IN (SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))
+                ''', (earlier, json.dumps(keys)))
+                existing = {(word, hanja): (word_id, owned) for word_id, word, hanja, owned in cursor.fetchall()}
+                # The entries whose content is written, with the id of their row when it already exists.
+                # The words without hanja are never merged.
+                written = []
+                for position, row in enumerate(batch):
+                    key = row[:2]
+                    if row[1] is not None:
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    word_id, owned = existing.get(key, (None, False))
+                    if word_id is None or (earlier_sources is not None and not owned):
+                        written.append((position, word_id))
+                cursor.execute('SELECT COALESCE(MAX(id), 0) FROM korean_words')
+                batch_last_id = cursor.fetchone()[0]
+                # The unchanged rows aren't rewritten, to keep their full-text indexes as they are
+                cursor.executemany('''
                 INSERT INTO korean_words (word, hanja, glossary, englishLemma, englishDefinition, frenchLemma, frenchDefinition, pronounciation)
-                SELECT ?, ?, ?, ?, ?, ?, ?, ?
-                WHERE NOT EXISTS (
-                    SELECT 1
-                    FROM korean_words
-                    WHERE word = ? AND hanja = ?
-                );
-                """
-                cursor.execute(query, (word, hanja, glossary, english_lemma, english_definition, french_lemma, french_definition, pronounciation, word, hanja))
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (word, hanja) DO UPDATE SET
+                    glossary = excluded.glossary, englishLemma = excluded.englishLemma,
+                    englishDefinition = excluded.englishDefinition, frenchLemma = excluded.frenchLemma,
+                    frenchDefinition = excluded.frenchDefinition, pronounciation = excluded.pronounciation
+                WHERE (glossary, englishLemma, englishDefinition, frenchLemma, frenchDefinition, pronounciation)
+                    IS NOT (excluded.glossary, excluded.englishLemma, excluded.englishDefinition,
+                            excluded.frenchLemma, excluded.frenchDefinition, excluded.pronounciation)
+                ''', [batch[position] for position, word_id in written])
+                # The new rows have increasing ids in the order of the written entries
+                cursor.execute('SELECT id FROM korean_words WHERE id > ? ORDER BY id', (batch_last_id,))
+                new_ids = iter(row[0] for row in cursor.fetchall())
+                # The senses of the updated rows are replaced
+                updated_ids = [(word_id,) for _, word_id in written if word_id is not None]
+                cursor.executemany('DELETE FROM senses WHERE word_id = ?', updated_ids)
+                cursor.executemany('DELETE FROM equivalents WHERE word_id = ?', updated_ids)
+                written = [(position, word_id if word_id is not None else next(new_ids)) for position, word_id in written]
+                sense_rows = []
+                equivalent_rows = []
+                for position, word_id in written:
+                    for sense_number, sense in enumerate(entry_batch[position].get('senses') or ()):
+                        sense_rows.append((word_id, sense_number, sense['definition']))
+                        for language, (lemma, definition) in sense['equivalents'].items():
+                            equivalent_rows.append((word_id, language, sense_number, lemma, definition))
+                cursor.executemany('INSERT INTO senses (word_id, sense_number, definition) VALUES (?, ?, ?)', sense_rows)
+                cursor.executemany('''
+                INSERT INTO equivalents (word_id, language, sense_number, lemma, definition) VALUES (?, ?, ?, ?, ?)
+                ''', equivalent_rows)
+                if source is not None:
+                    # The written rows, and the existing rows matching an entry of the batch
+                    cursor.executemany(
+                        'INSERT OR IGNORE INTO source_file_entries (source, word_id) VALUES (?, ?)',
+                        [(source, word_id) for _, word_id in written]
+                    )
+                    cursor.executemany(
+                        'INSERT OR IGNORE INTO source_file_entries (source, word_id) VALUES (?, ?)',
+                        [(source, word_id) for word_id, _ in existing.values()]
+                    )
+                conn.commit()
+                count += len(batch)
+            # Index the characters of the new words
+            self.build_hanja_char_index(cursor, last_id)
             conn.commit()
             print("Values inserted in the table korean_words.")
+        return count
 
 
-    def insert_hanja_data(self, hanja_dict):
+    def insert_hanja_data(self, hanja_dict, replace=False):
         """!
-        @brief Inserts Hanja data into the 'hanja_characters' table.
+        @brief Inserts Hanja data into the 'hanja_characters' table, every reading of the characters
+        into 'hanja_readings' and their variant links into 'hanja_variants'.
         
-        @param hanja_dict (dict): A dictionary mapping Hanja characters to a list of related Korean data. 
+        @param hanja_dict (dict): A dictionary mapping Hanja characters to a list of related Korean data, one item per reading.
         Example:
         @code{.json}
                     {
-                        '漢': [{'kor': '한', 'englishDefinition': 'China'}, 'frenchDefinition': 'Chine'}],
-                        '字': [{'kor': '자', 'englishDefinition': 'Character'}, 'frenchDefinition': 'Caractère'}]
+                        '仮': [{'kor': '거짓 가, 假의 略字', 'reading': '가', 'gloss': '거짓 가', 'stroke_count': 6,
+                                'variants': [('假', '略字')], 'english_def': 'Falsehood', 'french_def': 'Mensonge'}]
                     }
         @endcode
+        @param replace (bool): True to delete the characters already in the table first.
         """
-        with DatabaseConnection() as conn:
+        # The first reading of a character is its main one, the stroke count may only be given by another line
+        rows = (
+            (hanja, items[0]['kor'], items[0]['english_def'], items[0]['french_def'], items[0].get('reading'), items[0].get('gloss'),
+             next((item['stroke_count'] for item in items if item.get('stroke_count')), None))
+            for hanja, items in hanja_dict.items()
+        )
+        readings = [
+            (item['reading'], hanja, item.get('gloss'))
+            for hanja, items in hanja_dict.items() for item in items if item.get('reading')
+        ]
+        variants = [
+            (hanja, character, relation)
+            for hanja, items in hanja_dict.items() for item in items for character, relation in item.get('variants', ())
+        ]
+        with DatabaseConnection(bulk_load=True) as conn:
             cursor = conn.cursor()
-            for hanja, items in hanja_dict.items():
-                for item in items:
-                    korean = item['kor']
-                    english_def = item['english_def']
-                    french_def = item['french_def']
-                    cursor.execute('''
-                    INSERT OR IGNORE INTO hanja_characters (character, korean, englishDefinition, frenchDefinition)
-                    VALUES (?, ?, ?, ?)
-                    ''', (hanja, korean, english_def, french_def))
+            if replace:
+                cursor.execute('DELETE FROM hanja_characters')
+                cursor.execute('DELETE FROM hanja_readings')
+                cursor.execute('DELETE FROM hanja_variants')
+            while True:
+                batch = list(itertools.islice(rows, INSERT_BATCH_SIZE))
+                if not batch:
+                    break
+                cursor.executemany('''
+                INSERT OR IGNORE INTO hanja_characters (character, korean, englishDefinition, frenchDefinition, reading, gloss, stroke_count)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', batch)
+                conn.commit()
+            cursor.executemany('INSERT OR IGNORE INTO hanja_readings (reading, character, gloss) VALUES (?, ?, ?)', readings)
+            cursor.executemany('INSERT OR IGNORE INTO hanja_variants (variant, character, relation) VALUES (?, ?, ?)', variants)
+            self.bump_dataset_generation(cursor)
             conn.commit()
             print("Values inserted in the table hanja_characters.")
 
     def drop_tables(self):
         """!
-        @brief Drops the 'hanja_characters' and 'korean_words' tables if they exist.
+        @brief Drops the 'korean_words' table, its senses, its 'word_hanja_chars' and full-text indexes, the character statistics and the manifest of the dump files if they exist.
         """
-        with DatabaseConnection() as conn:
+        with DatabaseConnection(writable=True) as conn:
             cursor = conn.cursor()
             try:
+                cursor.execute('DROP TABLE IF EXISTS korean_words_fts_en')
+                cursor.execute('DROP TABLE IF EXISTS korean_words_fts_fr')
+                cursor.execute('DROP TABLE IF EXISTS hanja_char_stats')
+                cursor.execute('DROP TABLE IF EXISTS hanja_char_words')
+                cursor.execute('DROP TABLE IF EXISTS word_hanja_chars')
+                cursor.execute('DROP TABLE IF EXISTS source_file_entries')
+                cursor.execute('DROP TABLE IF EXISTS senses')
+                cursor.execute('DROP TABLE IF EXISTS equivalents')
                 cursor.execute('DROP TABLE IF EXISTS korean_words')
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='source_files'")
+                if cursor.fetchone():
+                    cursor.execute("DELETE FROM source_files WHERE kind = 'words'")
+                self.bump_dataset_generation(cursor)
+                conn.commit()
                 print("Table 'korean_words' has been dropped.")
             except sqlite3.Error as e:
                 print(f"Error dropping tables: {e}")
-       
+
+    def get_source_hashes(self, kind):
+        """!
+        @brief Retrieves the content hashes of the ingested files.
+        @param kind (str): `words` for the dump files, `hanja` for the hanja file.
+        @return A dictionary mapping the name of each file to its hash.
+        """
+        with DatabaseConnection(writable=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT source, content_hash FROM source_files WHERE kind = ?', (kind,))
+            return dict(cursor.fetchall())
+
+    def record_source(self, source, kind, content_hash):
+        """!
+        @brief Records that a file has been ingested.
+        @param source (str): Name of the file.
+        @param kind (str): `words` for the dump files, `hanja` for the hanja file.
+        @param content_hash (str): Hash of the content of the file.
+        """
+        with DatabaseConnection(writable=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            INSERT INTO source_files (source, kind, content_hash) VALUES (?, ?, ?)
+            ON CONFLICT (source) DO UPDATE SET kind = excluded.kind, content_hash = excluded.content_hash
+            ''', (source, kind, content_hash))
+            conn.commit()
+
+    def get_sharing_sources(self, sources):
+        """!
+        @brief Finds the other dump files containing a word of the given files.
+        @param sources (list): Names of the files.
+        @return The set of the names of the other files sharing at least one word with them.
+        """
+        with DatabaseConnection(writable=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            SELECT DISTINCT other.source
+            FROM source_file_entries entry
+            JOIN source_file_entries other ON other.word_id = entry.word_id
+            WHERE entry.source IN (SELECT value FROM json_each(?))
+              AND other.source NOT IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(sources), json.dumps(sources)))
+            return {row[0] for row in cursor.fetchall()}
+
+    def forget_source(self, source):
+        """!
+        @brief Forgets which words a dump file contains, and the file itself. The words are kept, see
+        delete_unreferenced_words.
+        @param source (str): Name of the file.
+        """
+        with DatabaseConnection(writable=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM source_file_entries WHERE source = ?', (source,))
+            cursor.execute('DELETE FROM source_files WHERE source = ?', (source,))
+            conn.commit()
+
+    def delete_unreferenced_words(self):
+        """!
+        @brief Deletes the words that no dump file contains anymore, before the end_load of the run.
+        @return The number of words deleted.
+        """
+        with DatabaseConnection(writable=True) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            DELETE FROM korean_words
+            WHERE NOT EXISTS (SELECT 1 FROM source_file_entries WHERE word_id = korean_words.id)
+            ''')
+            deleted = cursor.rowcount
+            conn.commit()
+            return deleted
+
     def remove_duplicates(self):
 
-        with DatabaseConnection() as conn:
+        with DatabaseConnection(writable=True) as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute('DELETE FROM korean_words WHERE id NOT IN ( SELECT MIN(id) FROM korean_words GROUP BY word, hanja);')
+                self.refresh_hanja_char_ranks(cursor)
+                self.bump_dataset_generation(cursor)
                 conn.commit()
             except sqlite3.Error as e:
                 print(f"Error deleting duplicates: {e}") 
+
+    def bump_dataset_generation(self, cursor):
+        """!
+        @brief Increases the dataset generation stored in 'dataset_info', which invalidates the cached results.
+        @param cursor A cursor on a writable connection, the caller is responsible for committing.
+        """
+        cursor.execute('CREATE TABLE IF NOT EXISTS dataset_info (key TEXT PRIMARY KEY, value INTEGER)')
+        cursor.execute('''
+        INSERT INTO dataset_info (key, value) VALUES ('generation', 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1
+        ''')
+        dataset_generation.invalidate()
+
+    def get_dataset_generation(self):
+        """!
+        @brief Retrieves the dataset generation written by the last ingestion. The value is kept by the
+        process for GENERATION_CHECK_INTERVAL seconds, so the cached results are served without a query.
+        @return The generation number, 0 if the database was never written with a generation.
+        """
+        return dataset_generation.get(self.read_dataset_generation)
+
+    def read_dataset_generation(self):
+        """!
+        @brief Reads the dataset generation from the database.
+        @return The generation number, 0 if the database was never written with a generation.
+        """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT value FROM dataset_info WHERE key = 'generation'")
+            except sqlite3.OperationalError:
+                return 0
+            rows = cursor.fetchall()
+            return rows[0][0] if rows else 0
     
     def get_hanja_for_word(self, word):
         """!
@@ -165,7 +834,7 @@ class DataAccess:
         """
         with DatabaseConnection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT hanja FROM korean_words WHERE word = ? AND hanja IS NOT NULL', (word,))
+            cursor.execute('SELECT hanja FROM korean_words WHERE word = ? AND hanja IS NOT NULL ORDER BY id', (word,))
             hanja_result = cursor.fetchall()
             if hanja_result:
                 if hanja_result is None:
@@ -204,119 +873,476 @@ class DataAccess:
                 return results
 
 
+    @cached('search')
+    def lookup_word(self, word, language):
+        """!
+        @brief Retrieves everything the search page shows for a Korean word with two queries :
+        the entries of the word, the meanings of the hanja characters of each entry in the order
+        of its hanja, and the hanja itself, then the senses of every entry.
+        @param word (str): The Korean word to search for.
+        @param language (str): The language of the page.
+        @return a list of tuples (entry, hanja_meanings, hanja), one per entry of the word, where
+                entry is (glossary, lemma, definition, pronounciation, senses), senses a list of
+                (korean definition, lemma, definition) (see get_senses) and hanja_meanings a list of
+                (character, korean, meaning). When some entries have hanja, only those are returned,
+                otherwise every entry is returned with None as hanja_meanings and hanja.
+        """
+        if language == "fr":
+            query = """
+            SELECT kw.id, kw.hanja, kw.glossary, kw.frenchLemma, kw.frenchDefinition, kw.pronounciation,
+                   h.character, h.korean, h.frenchDefinition
+            FROM korean_words kw
+            LEFT JOIN word_hanja_chars c ON c.word_id = kw.id
+            LEFT JOIN hanja_characters h ON h.character = c.character
+            WHERE kw.word = ?
+            ORDER BY kw.id, c.position;
+            """
+        else:
+            query = """
+            SELECT kw.id, kw.hanja, kw.glossary, kw.englishLemma, kw.englishDefinition, kw.pronounciation,
+                   h.character, h.korean, h.englishDefinition
+            FROM korean_words kw
+            LEFT JOIN word_hanja_chars c ON c.word_id = kw.id
+            LEFT JOIN hanja_characters h ON h.character = c.character
+            WHERE kw.word = ?
+            ORDER BY kw.id, c.position;
+            """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (word,))
+            rows = cursor.fetchall()
+            senses = self.get_senses(cursor, [word], language)
+        return self.group_lookup_rows(rows, senses)
+
+    def lookup_words(self, words, language):
+        """!
+        @brief Batch version of lookup_word : retrieves the entries and hanja meanings of many
+        words with a single query, the words being passed as one JSON array parameter.
+        @param words (list): The Korean words to search for.
+        @param language (str): The language of the definitions.
+        @return a dictionary mapping each found word to its list of (entry, hanja_meanings, hanja),
+                as returned by lookup_word. Words which are not in the dictionary are left out.
+        """
+        if not words:
+            return {}
+        if language == "fr":
+            query = """
+            SELECT kw.word, kw.id, kw.hanja, kw.glossary, kw.frenchLemma, kw.frenchDefinition, kw.pronounciation,
+                   h.character, h.korean, h.frenchDefinition
+            FROM korean_words kw
+            LEFT JOIN word_hanja_chars c ON c.word_id = kw.id
+            LEFT JOIN hanja_characters h ON h.character = c.character
+            WHERE kw.word IN (SELECT value FROM json_each(?))
+            ORDER BY kw.word, kw.id, c.position;
+            """
+        else:
+            query = """
+            SELECT kw.word, kw.id, kw.hanja, kw.glossary, kw.englishLemma, kw.englishDefinition, kw.pronounciation,
+                   h.character, h.korean, h.englishDefinition
+            FROM korean_words kw
+            LEFT JOIN word_hanja_chars c ON c.word_id = kw.id
+            LEFT JOIN hanja_characters h ON h.character = c.character
+            WHERE kw.word IN (SELECT value FROM json_each(?))
+            ORDER BY kw.word, kw.id, c.position;
+            """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (json.dumps(list(dict.fromkeys(words)), ensure_ascii=False),))
+            rows = cursor.fetchall()
+            senses = self.get_senses(cursor, words, language)
+
+        # The rows are ordered by word, so each word is a contiguous group
+        return {
+            word: self.group_lookup_rows((row[1:] for row in word_rows), senses)
+            for word, word_rows in itertools.groupby(rows, key=lambda row: row[0])
+        }
+
+    def get_senses(self, cursor, words, language):
+        """!
+        @brief Retrieves the senses of every entry of some words, with their translation in a language, in one query.
+        The primary keys of 'senses' and 'equivalents' give the senses of each entry in order.
+        @param cursor A cursor of the connection the entries were read with.
+        @param words (list): The Korean words.
+        @param language (str): The language of the translations.
+        @return A dictionary mapping the id of each entry to its list of (korean definition, lemma, definition),
+                lemma and definition being None for the senses not translated in the language.
+        """
+        cursor.execute("""
+        SELECT s.word_id, s.definition, e.lemma, e.definition
+        FROM korean_words kw
+        JOIN senses s ON s.word_id = kw.id
+        LEFT JOIN equivalents e ON e.word_id = s.word_id AND e.language = ? AND e.sense_number = s.sense_number
+        WHERE kw.word IN (SELECT value FROM json_each(?))
+        ORDER BY s.word_id, s.sense_number;
+        """, ('fr' if language == 'fr' else 'en', json.dumps(list(dict.fromkeys(words)), ensure_ascii=False)))
+        senses = {}
+        for word_id, korean_definition, lemma, definition in cursor.fetchall():
+            senses.setdefault(word_id, []).append((korean_definition, lemma, definition))
+        return senses
+
+    def group_lookup_rows(self, rows, senses=None):
+        """!
+        @brief Groups the rows of a lookup query by entry, in one pass.
+        @param rows Rows (id, hanja, glossary, lemma, definition, pronounciation, character, korean, meaning)
+               ordered by entry id and character position.
+        @param senses The senses of the entries returned by get_senses.
+        @return a list of tuples (entry, hanja_meanings, hanja), see lookup_word.
+        """
+        senses = senses or {}
+        entries = []
+        current_id = None
+        for word_id, hanja, glossary, lemma, definition, pronounciation, character, korean, meaning in rows:
+            if word_id != current_id:
+                current_id = word_id
+                meanings = []
+                seen_characters = set()
+                entries.append(((glossary, lemma, definition, pronounciation, senses.get(word_id, [])), meanings, hanja))
+            # Characters without a meaning (hangul of 하다 verbs...) are skipped, repeated ones shown once
+            if character is not None and character not in seen_characters:
+                seen_characters.add(character)
+                meanings.append((character, korean, meaning))
+
+        hanja_entries = [entry for entry in entries if entry[2]]
+        if not hanja_entries:
+            return [(entry, None, None) for entry, meanings, hanja in entries]
+        return hanja_entries
+
     def get_word_by_korean(self, korean_word, language, hanja_characters=None):
             """@brief Fetches a word entry by its Korean text.
             
             @param korean_word: The Korean word to search for.
             @param language: The language for the definition
+            @param hanja_characters: Characters the hanja of the entries must all contain.
             @return: A list of matching entries.
             """      
+            if hanja_characters is not None:
+                # Only the ideographs are in word_hanja_chars, the Hangul of a hanja such as 工夫하다 is left out
+                hanja_characters = [char for char in hanja_characters if is_ideograph(char)] or None
             with DatabaseConnection() as conn:
                 cursor = conn.cursor()
                 if hanja_characters == None :
                     if language == "fr":
-                        cursor.execute("SELECT glossary, frenchLemma, frenchDefinition, pronounciation  FROM korean_words WHERE word = ?", (korean_word,))
+                        cursor.execute("SELECT glossary, frenchLemma, frenchDefinition, pronounciation  FROM korean_words WHERE word = ? ORDER BY id", (korean_word,))
                     else :
-                        cursor.execute("SELECT glossary, englishLemma, englishDefinition, pronounciation  FROM korean_words WHERE word = ?", (korean_word,))
+                        cursor.execute("SELECT glossary, englishLemma, englishDefinition, pronounciation  FROM korean_words WHERE word = ? ORDER BY id", (korean_word,))
                     return cursor.fetchall()
                 else :
+                    # One seek in the word_hanja_chars index per character
+                    conditions = " AND ".join(["id IN (SELECT word_id FROM word_hanja_chars WHERE character = ?)"] * len(hanja_characters))
                     if language == "fr":
-                        conditions = " AND ".join(["hanja LIKE ?"] * len(hanja_characters))
                         query = f"""
                             SELECT glossary, frenchLemma, frenchDefinition, pronounciation 
                             FROM korean_words 
                             WHERE word = ? AND {conditions}
+                            ORDER BY id
                         """
-
-                        # Construire les paramètres de la requête (un '%' + caractère + '%' pour chaque caractère)
-                        params = [korean_word] + [f"%{char}%" for char in hanja_characters]
-
-                        cursor.execute(query, params)
                     else :
-                        conditions = " AND ".join(["hanja LIKE ?"] * len(hanja_characters))
                         query = f"""
                             SELECT glossary, englishLemma, englishDefinition, pronounciation 
                             FROM korean_words 
                             WHERE word = ? AND {conditions}
+                            ORDER BY id
                         """
-
-                        # Construire les paramètres de la requête (un '%' + caractère + '%' pour chaque caractère)
-                        params = [korean_word] + [f"%{char}%" for char in hanja_characters]
-
-                        cursor.execute(query, params)
+                    params = [korean_word] + list(hanja_characters)
+                    cursor.execute(query, params)
                     return cursor.fetchall()
             
-    def get_related_words(self, hanja_character, language):
-        """! @brief Gets all the words that contains the specified hanja character.
-            
+    @cached('related-words', size=rows_size('words'))
+    def get_related_words(self, hanja_character, language, original_word=None, after_id=0, limit=RELATED_WORDS_PAGE_SIZE):
+        """! @brief Gets a page of the words that contains the specified hanja character.
+            Only the first word of each pair of leading hanja is kept, and the original word is left out.
+
             @param hanja_character: the hanja character to search for.
             @param language: The language for the definition
-            @return: A list of matching entries.
-        """  
+            @param original_word: The word whose related words are searched, excluded from the results.
+            @param after_id: The cursor returned with the previous page, 0 for the first page.
+            @param limit: The maximum number of words in the page.
+            @return: A dictionary with the matching entries of the page (`words`) and the cursor of
+                     the next page (`next`), None on the last page.
+        """
+        if not hanja_character:
+            return {"words": [], "next": None}
+        # The index gives the words containing the first character,
+        # instr() only matters when more than one character is searched.
+        # MIN(id) makes SQLite take the other columns from the first word of each group,
+        # and the pages are ordered by that id, which is the cursor.
         if language == "fr" :
             query = """
-            SELECT word, hanja, glossary, frenchLemma, frenchDefinition
+            SELECT MIN(id), word, hanja, glossary, frenchLemma, frenchDefinition
             FROM korean_words
-            WHERE hanja LIKE ?;
+            WHERE id IN (SELECT word_id FROM word_hanja_chars WHERE character = ?)
+              AND instr(hanja, ?) > 0
+              AND word IS NOT ?
+            GROUP BY substr(hanja, 1, 2)
+            HAVING MIN(id) > ?
+            ORDER BY MIN(id)
+            LIMIT ?;
             """
-        elif language == "en":
+        else:
             query = """
-            SELECT word, hanja, glossary, englishLemma, englishDefinition
+            SELECT MIN(id), word, hanja, glossary, englishLemma, englishDefinition
             FROM korean_words
-            WHERE hanja LIKE ?;
+            WHERE id IN (SELECT word_id FROM word_hanja_chars WHERE character = ?)
+              AND instr(hanja, ?) > 0
+              AND word IS NOT ?
+            GROUP BY substr(hanja, 1, 2)
+            HAVING MIN(id) > ?
+            ORDER BY MIN(id)
+            LIMIT ?;
             """
         with DatabaseConnection() as conn:
             cursor = conn.cursor()
     
-            # Execute the query
-            cursor.execute(query, (f"%{hanja_character}%",))
+            # Execute the query, one more row than the page tells if there is a next page
+            cursor.execute(query, (hanja_character[0], hanja_character, original_word, after_id, limit + 1))
 
-            # Fetch all matching rows
+            # Fetch the matching rows
             results = cursor.fetchall()
 
             # Map results to a list of dictionaries
             words = [
                 {
-                    "word": row[0],
-                    "hanja": row[1],
-                    "glossary": row[2],
-                    "lemma": row[3],
-                    "definition": row[4],
+                    "word": row[1],
+                    "hanja": row[2],
+                    "glossary": row[3],
+                    "lemma": row[4],
+                    "definition": row[5],
                 }
-                for row in results
+                for row in results[:limit]
             ]
 
-            return words
+            return {"words": words, "next": results[limit - 1][0] if len(results) > limit else None}
+
+    @cached('reverse-search', size=rows_size('results'))
+    def reverse_search(self, text, language, page=1, per_page=20):
+        """!
+        @brief Finds the Korean words whose lemma, definition or glossary contain the searched words,
+        for example "price" or "prix" finds 價格. Results are ranked with BM25, a match in the
+        lemma counting more than in the definition, itself counting more than in the glossary.
+        @param text (str): The searched words, all of them must match.
+        @param language (str): The language of the searched words, "fr" or "en".
+        @param page (int): The page of results, starting at 1.
+        @param per_page (int): The number of results by page.
+        @return A dictionary with the `results` of the page (word, hanja, glossary, lemma, definition),
+                the `page` and whether there is a next page (`has_more`).
+        """
+        # Every word of the text becomes a quoted FTS5 string, so user input can't break the query syntax
+        terms = re.findall(r'\w+', text or '')
+        if not terms:
+            return {'results': [], 'page': page, 'has_more': False}
+        match = ' '.join('"{}"'.format(term) for term in terms)
+        if language == "fr":
+            query = """
+            SELECT kw.word, kw.hanja, kw.glossary, kw.frenchLemma, kw.frenchDefinition
+            FROM korean_words_fts_fr
+            JOIN korean_words kw ON kw.id = korean_words_fts_fr.rowid
+            WHERE korean_words_fts_fr MATCH ?
+            ORDER BY bm25(korean_words_fts_fr, 10.0, 2.0, 1.0), kw.id
+            LIMIT ? OFFSET ?;
+            """
+        else:
+            query = """
+            SELECT kw.word, kw.hanja, kw.glossary, kw.englishLemma, kw.englishDefinition
+            FROM korean_words_fts_en
+            JOIN korean_words kw ON kw.id = korean_words_fts_en.rowid
+            WHERE korean_words_fts_en MATCH ?
+            ORDER BY bm25(korean_words_fts_en, 10.0, 2.0, 1.0), kw.id
+            LIMIT ? OFFSET ?;
+            """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            # One more row than needed tells if there is a next page
+            cursor.execute(query, (match, per_page + 1, (page - 1) * per_page))
+            rows = cursor.fetchall()
+
+        results = [
+            {
+                "word": row[0],
+                "hanja": row[1],
+                "glossary": row[2],
+                "lemma": row[3],
+                "definition": row[4],
+            }
+            for row in rows[:per_page]
+        ]
+        return {'results': results, 'page': page, 'has_more': len(rows) > per_page}
 
+    @cached('hanja-reading')
+    def get_hanja_by_reading(self, reading, language):
+        """!
+        @brief Lists the characters having a reading, for example every character read 가.
+        The primary key of 'hanja_readings' gives them without scanning a table.
+        @param reading (str): The reading, one Hangul syllable.
+        @param language (str): The language of the meanings.
+        @return A list of dictionaries (character, reading, gloss, stroke_count, meaning, variants, variant_of),
+                ordered by stroke count.
+        """
+        if language == "fr":
+            query = """
+            SELECT r.character, r.reading, r.gloss, h.stroke_count, h.frenchDefinition
+            FROM hanja_readings r
+            LEFT JOIN hanja_characters h ON h.character = r.character
+            WHERE r.reading = ?
+            ORDER BY h.stroke_count, r.character;
+            """
+        else:
+            query = """
+            SELECT r.character, r.reading, r.gloss, h.stroke_count, h.englishDefinition
+            FROM hanja_readings r
+            LEFT JOIN hanja_characters h ON h.character = r.character
+            WHERE r.reading = ?
+            ORDER BY h.stroke_count, r.character;
+            """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, (reading,))
+            rows = cursor.fetchall()
+        return self.hanja_rows_to_dicts(rows)
 
-    def find_word_with_unique_hanja(self):
+    @cached('hanja-strokes', size=rows_size('characters'))
+    def get_hanja_by_strokes(self, min_strokes, max_strokes, language, after=None, limit=HANJA_PAGE_SIZE):
         """!
-        @brief Finds a Korean word where at least one Hanja character is unique to that word.
-        @returns list of words with unique Hanja characters.
+        @brief Gets a page of the characters written with a number of strokes in a range, ordered by
+        stroke count then character. The index on (stroke_count, character) gives the range, and the
+        page following a character starts right after it in the index.
+        @param min_strokes (int): The minimum number of strokes.
+        @param max_strokes (int): The maximum number of strokes.
+        @param language (str): The language of the meanings.
+        @param after (str): The cursor returned with the previous page, None for the first page.
+        @param limit (int): The maximum number of characters in the page.
+        @return A dictionary with the characters of the page (`characters`, see get_hanja_by_reading)
+                and the cursor of the next page (`next`), None on the last page.
         """
+        if language == "fr":
+            query = """
+            SELECT character, reading, gloss, stroke_count, frenchDefinition
+            FROM hanja_characters
+            WHERE stroke_count BETWEEN ? AND ?
+              AND (stroke_count, character) > (COALESCE((SELECT stroke_count FROM hanja_characters WHERE character = ?), ?), ?)
+            ORDER BY stroke_count, character
+            LIMIT ?;
+            """
+        else:
+            query = """
+            SELECT character, reading, gloss, stroke_count, englishDefinition
+            FROM hanja_characters
+            WHERE stroke_count BETWEEN ? AND ?
+              AND (stroke_count, character) > (COALESCE((SELECT stroke_count FROM hanja_characters WHERE character = ?), ?), ?)
+            ORDER BY stroke_count, character
+            LIMIT ?;
+            """
         with DatabaseConnection() as conn:
             cursor = conn.cursor()
-            # Step 1: Flatten all Hanja characters into a single column
-            cursor.execute("SELECT word, hanja FROM korean_words WHERE hanja IS NOT NULL;")
+            # Without a cursor, the page starts before every character of the range.
+            # One more row than the page tells if there is a next page
+            cursor.execute(query, (min_strokes, max_strokes, after, min_strokes - 1, after or '', limit + 1))
             rows = cursor.fetchall()
+        return {
+            "characters": self.hanja_rows_to_dicts(rows[:limit]),
+            "next": rows[limit - 1][0] if len(rows) > limit else None,
+        }
+
+    def hanja_rows_to_dicts(self, rows):
+        """!
+        @brief Converts rows (character, reading, gloss, stroke_count, meaning) to dictionaries, with the variant
+        links of the characters : `variants` the characters which are variants of it, and `variant_of` the
+        characters it is a variant of, each as a dictionary (character, relation).
+        @param rows The rows of get_hanja_by_reading or get_hanja_by_strokes.
+        @return A list of dictionaries, in the order of the rows.
+        """
+        if not rows:
+            return []
+        characters = json.dumps(list(dict.fromkeys(row[0] for row in rows)), ensure_ascii=False)
+        links = {}
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT character, variant, relation, 'variants' FROM hanja_variants
+            WHERE character IN (SELECT value FROM json_each(?))
+            UNION ALL
+            SELECT variant, character, relation, 'variant_of' FROM hanja_variants
+            WHERE variant IN (SELECT value FROM json_each(?))
+            """, (characters, characters))
+            for character, other, relation, kind in cursor.fetchall():
+                links.setdefault((character, kind), []).append({"character": other, "relation": relation})
+        return [
+            {
+                "character": row[0],
+                "reading": row[1],
+                "gloss": row[2],
+                "stroke_count": row[3],
+                "meaning": row[4],
+                "variants": links.get((row[0], 'variants'), []),
+                "variant_of": links.get((row[0], 'variant_of'), []),
+            }
+            for row in rows
+        ]
+
+    def get_all_words(self):
+        """!
+        @brief Retrieves every word with its English and French lemmas, used to build the autocomplete index.
+        @return A list of tuples (word, englishLemma, frenchLemma), in id order.
+        """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT word, englishLemma, frenchLemma FROM korean_words ORDER BY id')
+            return cursor.fetchall()
+
+    def get_hanja_words(self):
+        """!
+        @brief Retrieves every word written with hanja, used to build the annotation automaton.
+        @return A list of tuples (word, hanja), sorted by id.
+        """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT word, hanja FROM korean_words WHERE hanja IS NOT NULL AND hanja != '' ORDER BY id")
+            return cursor.fetchall()
+
+    def find_word_with_unique_hanja(self):
+        """!
+        @brief Finds the Korean words having at least one Hanja character that no other word uses.
+        @returns list of (word, character) tuples.
+        """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT w.word, s.character
+            FROM hanja_char_stats s
+            JOIN hanja_char_words w ON w.character = s.character
+            WHERE s.word_count = 1
+            """)
+            return cursor.fetchall()
+
+    def get_most_productive_hanja(self, limit=20):
+        """!
+        @brief Finds the Hanja characters used in the most words.
+        @param limit (int): The number of characters returned.
+        @returns list of (character, word_count, entry_count, first_word, rank) tuples, the most used first.
+        """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT s.character, s.word_count, s.entry_count, kw.word, s.rank
+            FROM hanja_char_stats s
+            LEFT JOIN korean_words kw ON kw.id = s.first_word_id
+            ORDER BY s.word_count DESC, s.character DESC
+            LIMIT ?
+            """, (limit,))
+            return cursor.fetchall()
 
-            # Step 2: Create a mapping of Hanja characters to the words they appear in
-            hanja_to_words = {}
-            for word, hanja in rows:
-                for char in hanja:  # Iterate over each character in the Hanja string
-                    if char not in hanja_to_words:
-                        hanja_to_words[char] = set()
-                    hanja_to_words[char].add(word)
-
-            # Step 3: Find unique Hanja characters and the corresponding words
-            unique_hanja_words = []
-            for char, words in hanja_to_words.items():
-                if len(words) == 1:  # This Hanja character is unique
-                    unique_hanja_words.append((list(words)[0], char))
-
-            # Step 4: Filter the words that contain unique Hanja characters
-            result_words = []
-            for word, char in unique_hanja_words:
-                result_words.append((word, char))
-
-            return result_words
+    def get_hanja_used_in(self, min_words):
+        """!
+        @brief Finds the Hanja characters used in at least a number of words.
+        @param min_words (int): The minimum number of distinct words.
+        @returns list of (character, word_count, entry_count, first_word, rank) tuples, the most used first.
+        """
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT s.character, s.word_count, s.entry_count, kw.word, s.rank
+            FROM hanja_char_stats s
+            LEFT JOIN korean_words kw ON kw.id = s.first_word_id
+            WHERE s.word_count >= ?
+            ORDER BY s.word_count DESC, s.character DESC
+            """, (min_words,))
+            return cursor.fetchall()
@@ -1,9 +1,15 @@
 #! @file src/data_processing.py
-from datapackage import Package
-import regex
 import os 
+import re
+import hashlib
+import multiprocessing
 import json 
-from deep_translator import GoogleTranslator
+from src.translation import get_translator
+
+# Start of the LexicalEntry list (or single object) in a 한국어기초사전 JSON file
+LEXICAL_ENTRY_START = re.compile(r'"LexicalEntry"\s*:\s*([\[{])')
+# Languages of the Equivalent elements kept, and their code in the database
+EQUIVALENT_LANGUAGES = {"영어": "en", "프랑스어": "fr"}
 
 class DataProcessor:
     """!
@@ -16,6 +22,17 @@ class DataProcessor:
         """
         self.folder_path = folder_path
 
+    def json_files(self):
+        """!
+        @brief Lists the JSON files of the folder in a stable order (1_..., 2_..., ..., 10_..., 11_...).
+        @return A list of paths to the JSON files.
+        """
+        def natural_key(filename):
+            return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', filename)]
+
+        filenames = sorted((f for f in os.listdir(self.folder_path) if f.endswith('.json')), key=natural_key)
+        return [os.path.join(self.folder_path, filename) for filename in filenames]
+
     def extract_data(self):
         """!
         @brief Extracts data from JSON files in the specified folder.
@@ -25,23 +42,136 @@ class DataProcessor:
         combined_data = []  # Initialize an empty list to store data
 
         # Loop through all files in the folder
-        for filename in os.listdir(self.folder_path):
-            # Check if the file has a .json extension
-            if filename.endswith('.json'):
-                file_path = os.path.join(self.folder_path, filename)  # Get the full path to the file
-
-                # Open and read the JSON file
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    try:
-                        # Load the JSON content
-                        data = json.load(file)
-                        # Append the data to the combined list
-                        combined_data.extend(data if isinstance(data, list) else [data])
-                    except json.JSONDecodeError as e:
-                        print(f"Error decoding JSON from file {filename}: {e}")
+        for file_path in self.json_files():
+            # Open and read the JSON file
+            with open(file_path, 'r', encoding='utf-8') as file:
+                try:
+                    # Load the JSON content
+                    data = json.load(file)
+                    # Append the data to the combined list
+                    combined_data.extend(data if isinstance(data, list) else [data])
+                except json.JSONDecodeError as e:
+                    print(f"Error decoding JSON from file {os.path.basename(file_path)}: {e}")
 
         return combined_data
 
+    def iter_lexical_entries(self, file_path, chunk_size=1 << 16):
+        """!
+        @brief Yields the LexicalEntry objects of a JSON file one at a time.
+        The file is read by chunks and only the entry being decoded is kept in memory.
+        Files without a LexicalEntry list are loaded entirely, like extract_data does.
+        @param file_path Path to the JSON file.
+        @param chunk_size Number of characters read at a time.
+        @return A generator of dictionaries, one per lexical entry.
+        """
+        decoder = json.JSONDecoder()
+        with open(file_path, 'r', encoding='utf-8') as file:
+            buffer = ''
+            eof = False
+            # Look for the start of the LexicalEntry list, keeping only the end of the buffer
+            while True:
+                match = LEXICAL_ENTRY_START.search(buffer)
+                if match or eof:
+                    break
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[-64:] + chunk
+
+            if not match:
+                file.seek(0)
+                try:
+                    data = json.load(file)
+                except json.JSONDecodeError as e:
+                    print(f"Error decoding JSON from file {os.path.basename(file_path)}: {e}")
+                    return
+                for resource in (data if isinstance(data, list) else [data]):
+                    yield from self.get_lexical_entries(resource)
+                return
+
+            single_entry = match.group(1) == '{'
+            pos = match.start(1) if single_entry else match.end()
+            while True:
+                # Skip the separators between two entries
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos < len(buffer) and buffer[pos] == ']':
+                    return
+                try:
+                    if pos == len(buffer):
+                        raise json.JSONDecodeError("Incomplete entry", buffer, pos)
+                    entry, pos = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if eof:
+                        print(f"Error decoding JSON from file {os.path.basename(file_path)}: {e}")
+                        return
+                    # The entry is cut by the end of the buffer, read the next chunk
+                    chunk = file.read(chunk_size)
+                    eof = not chunk
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    continue
+                yield entry
+                if single_entry:
+                    return
+
+    def get_lexical_entries(self, resource):
+        """!
+        @brief Returns the lexical entries of a decoded LexicalResource.
+        @param resource A dictionary representing the content of a JSON file.
+        @return A list of dictionaries, one per lexical entry.
+        """
+        lexical_entries = resource.get("LexicalResource", {}).get("Lexicon", {}).get("LexicalEntry", [])
+        return lexical_entries if isinstance(lexical_entries, list) else [lexical_entries]
+
+    def stream_data(self, workers=1):
+        """!
+        @brief Streams the processed entries of every JSON file of the folder.
+        Entries are decoded and transformed one at a time, so memory use doesn't depend on the size of the dump.
+        With several workers, each file is processed by a worker process and the entries are
+        yielded file by file in the same order as the serial mode, so the output is identical.
+        @param workers Number of processes used to parse and transform the files.
+        @return A generator of dictionaries with the same fields as process_data.
+        """
+        for _, entries in self.stream_files(self.json_files(), workers):
+            yield from entries
+
+    def stream_files(self, file_paths, workers=1):
+        """!
+        @brief Streams the processed entries of the given JSON files, file by file.
+        @param file_paths Paths to the JSON files, in the order they should be processed.
+        @param workers Number of processes used to parse and transform the files.
+        @return A generator of (file_path, entries) tuples, entries being an iterable of
+                dictionaries with the same fields as process_data.
+        """
+        if workers <= 1:
+            for file_path in file_paths:
+                yield file_path, self.process_entries(self.iter_lexical_entries(file_path))
+            return
+
+        with multiprocessing.Pool(workers) as pool:
+            # imap keeps the order of the files, the caller stays the only writer
+            yield from zip(file_paths, pool.imap(self.process_file, file_paths))
+
+    def hash_file(self, file_path):
+        """!
+        @brief Computes the SHA-256 of a file, read by chunks.
+        @param file_path Path to the file.
+        @return The hexadecimal digest.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def process_file(self, file_path):
+        """!
+        @brief Processes all the lexical entries of one JSON file, used by the worker processes.
+        @param file_path Path to the JSON file.
+        @return A list of dictionaries with the same fields as process_data.
+        """
+        return list(self.process_entries(self.iter_lexical_entries(file_path)))
+
     def process_data(self, raw_data):
         """!
         @brief Processes raw data to extract and transform necessary fields for further use.
@@ -96,58 +226,49 @@ class DataProcessor:
         """
         processed_data = []
         for file in raw_data:
-            lexical_entries = file.get("LexicalResource", {}).get("Lexicon", {}).get("LexicalEntry", [])
-            
-            # Variables to store data
-            korean_definition = None
-            english_lemma = None
-            english_definition = None
-            french_lemma = None
-            french_definition = None
-            language = None
-            lemma = None
-            definition = None
-            pronounciation = None
-
-            # Iterate through the Lexical Entries
-            for entry in lexical_entries:
-                lemma_data = entry.get("Lemma")
-                korean_word = self.extract_word(lemma_data)
-                hanja_datas = entry.get("feat")
-                hanja = self.extract_hanja(hanja_datas)
-                korean_definition = self.extract_korean_definition(entry)
-                equivalents = self.extract_equivalents(entry.get("Sense", {}))
-                pronounciation = self.extract_pronounciation(entry.get("WordForm", {}))
-                
-                for equivalent in equivalents:
-                    language = self.extract_language(equivalent)
-                    lemma = self.extract_lemma(equivalent)
-                    definition = self.extract_definition(equivalent)
-                    
-                    # Store the English and French data specifically
-                    if language == "영어":
-                        english_lemma = lemma.capitalize() + '.'
-                        english_definition = definition
-                    elif language == "프랑스어":
-                        french_lemma = lemma.capitalize() + '.'
-                        french_definition = definition
-
-                # Extract and transform specific fields from the raw data
-                processed_entry = {
-                    'word': korean_word,  # Korean word (surface form)
-                    'hanja': hanja,  # Hanja characters, if available
-                    'glossary': korean_definition,  # Glossary/meaning of the word
-                    'englishLemma' : english_lemma,
-                    'englishDefinition' : english_definition,
-                    'frenchLemma' : french_lemma,
-                    'frenchDefinition' : french_definition,
-                    'pronounciation' : pronounciation,
-                }
-                # Append the processed entry to the result list
-                processed_data.append(processed_entry) 
+            processed_data.extend(self.process_entries(self.get_lexical_entries(file)))
 
         # Return the fully processed data """
         return processed_data
+
+    def process_entries(self, lexical_entries):
+        """!
+        @brief Transforms the lexical entries of one file, see process_data for the structure of an entry.
+        @param lexical_entries An iterable of dictionaries representing the lexical entries.
+        @return A generator of dictionaries with processed and relevant data.
+        """
+        # Iterate through the Lexical Entries
+        for entry in lexical_entries:
+            lemma_data = entry.get("Lemma")
+            korean_word = self.extract_word(lemma_data)
+            hanja_datas = entry.get("feat")
+            hanja = self.extract_hanja(hanja_datas)
+            korean_definition = self.extract_korean_definition(entry)
+            senses = self.extract_senses(entry.get("Sense", {}))
+            pronounciation = self.extract_pronounciation(entry.get("WordForm", {}))
+
+            # The lemma and definition of each language come from the first sense translated in it,
+            # and are reset for every entry so an entry without translation doesn't get the previous one's
+            lemmas = {}
+            definitions = {}
+            for sense in senses:
+                for language, (lemma, definition) in sense['equivalents'].items():
+                    if language not in lemmas:
+                        lemmas[language] = lemma.capitalize() + '.' if lemma else None
+                        definitions[language] = definition
+
+            # Extract and transform specific fields from the raw data
+            yield {
+                'word': korean_word,  # Korean word (surface form)
+                'hanja': hanja,  # Hanja characters, if available
+                'glossary': korean_definition,  # Glossary/meaning of the word
+                'englishLemma' : lemmas.get('en'),
+                'englishDefinition' : definitions.get('en'),
+                'frenchLemma' : lemmas.get('fr'),
+                'frenchDefinition' : definitions.get('fr'),
+                'pronounciation' : pronounciation,
+                'senses' : senses,  # Every sense, in the order of the dump
+            }
     
     def extract_word(self, lemma_datas):
         """! 
@@ -180,18 +301,35 @@ class DataProcessor:
             hanja = hanja_datas.get("val")
         return hanja
 
-    def extract_equivalents(self, sense_datas):
-        """! 
-        @brief Extracts the Equivalent data from the Sense.
+    def extract_senses(self, sense_datas):
+        """!
+        @brief Extracts every Sense of an entry with its Korean definition and its English and French equivalents.
         @param sense_datas The Sense data, which can be a list or a dictionary.
-        @return The extracted Equivalent data, or an empty dictionary if not found.
+        @return A list of dictionaries, one per sense in the order of the dump, with the Korean `definition`
+                and the `equivalents` mapping "en" and "fr" to a (lemma, definition) tuple when the sense is translated.
         """
-        equivalents = {}
-        if isinstance(sense_datas, list):
-            equivalents = sense_datas[0].get('Equivalent', {}) #only getting the first one because the others are similar
-        elif isinstance(sense_datas, dict):
-            equivalents = sense_datas.get('Equivalent', {})
-        return equivalents
+        sense_list = sense_datas if isinstance(sense_datas, list) else [sense_datas]
+        senses = []
+        for sense in sense_list:
+            if not sense:
+                continue
+            sense_feat = sense.get("feat", [])
+            sense_feat_list = sense_feat if isinstance(sense_feat, list) else [sense_feat]
+            definition = next((feat.get("val") for feat in sense_feat_list if feat.get("att") == "definition"), None)
+
+            equivalent_datas = sense.get('Equivalent', [])
+            equivalents = {}
+            for equivalent in (equivalent_datas if isinstance(equivalent_datas, list) else [equivalent_datas]):
+                # The feats of an equivalent are read in one pass, the dump has one equivalent per language
+                feats = {}
+                for feat in equivalent.get("feat", []):
+                    feats.setdefault(feat["att"], feat["val"])
+                language = EQUIVALENT_LANGUAGES.get(feats.get("language"))
+                # Only the first equivalent of each language is kept
+                if language is not None and language not in equivalents:
+                    equivalents[language] = (feats.get("lemma"), feats.get("definition"))
+            senses.append({'definition': definition, 'equivalents': equivalents})
+        return senses
     
     def extract_pronounciation(self, word_form):
         """! 
@@ -220,30 +358,6 @@ class DataProcessor:
         
         return sound_url
 
-    def extract_language(self, equivalents):
-        """! 
-        @brief Extracts the 'language' from the Equivalent.
-        @param equivalents A dictionary containing equivalent data.
-        @return The language value, or None if not found.
-        """
-        return next((f["val"] for f in equivalents.get("feat", []) if f["att"] == "language"), None)
-
-    def extract_lemma(self, equivalents):
-        """! 
-        @brief Extracts the 'lemma' from the Equivalent.
-        @param equivalents A dictionary containing equivalent data.
-        @return The lemma value, or None if not found.
-        """
-        return next((f["val"] for f in equivalents.get("feat", []) if f["att"] == "lemma"), None)
-
-    def extract_definition(self, equivalents):
-        """! 
-        @brief Extracts the 'definition' from the Equivalent.
-        @param equivalents A dictionary containing equivalent data.
-        @return The definition value, or None if not found.
-        """
-        return next((f["val"] for f in equivalents.get("feat", []) if f["att"] == "definition"), None)
-
     def extract_korean_definition(self, entry):
         """! @brief Extracts the 'definition' feat value for the Korean definition from the entry.    
         @param entry A dictionary representing a single lexical entry.
@@ -273,14 +387,24 @@ class DataProcessor:
             lines = file.readlines()  # Read all lines in the file
         return lines
 
-    def process_hanja_data(self, lines):
+    def process_hanja_data(self, lines, translator=None):
         """!
         @brief Processes Hanja file lines to extract structured data.
         Groups Hanja characters, their corresponding Korean readings, and definitions.
-        Slow because of the translation process
+        A line like "仮=거짓 가, 假의 略字, falsehood, deception; vacation (6)", under the "[가]" header, gives
+        the reading 가, the gloss (훈음) "거짓 가", the variant link (假, 略字), the English definition
+        and the stroke count 6.
+        The English definitions are translated to French once all the lines are read,
+        each distinct definition being translated only once. The French definition is None when the
+        translator leaves it untranslated.
         @param lines A list of lines from the Hanja data file.
-        @return A dictionary where keys are Hanja characters and values are lists of corresponding Korean readings and definitions.
+        @param translator The Translator used for the French definitions, get_translator() by default.
+        @return A dictionary where keys are Hanja characters and values are lists of corresponding Korean readings and definitions,
+                one item per reading of the character.
         """
+        # Only needed by the ingestion, see requirements-ingest.txt
+        import regex
+
         hanja_dict = {}  # Dictionary to store processed Hanja data
         kor = ''  # Variable to keep track of the Korean context for Hanja
 
@@ -295,14 +419,27 @@ class DataProcessor:
                     # Split the line into the Hanja character and the rest of the entry
                     kor_part = []  # Korean readings (Hangul)
                     def_part = []  # Definitions (non-Hangul parts)
+                    gloss_part = []  # Meaning and sound (훈음) of the character, like "거짓 가"
+                    variants = []  # (character, relation) : "假의 略字" gives ('假', '略字')
                     chi, rest = line.split('=', 1)  # Separate the Hanja character and its data
+
+                    # The stroke count ends the line, like "(6)"
+                    strokes = re.search(r'\((\d+)\)\s*$', rest)
+                    if strokes:
+                        rest = rest[:strokes.start()]
                     parts = rest.split(',')  # Split data into individual parts
 
                     # Classify parts as Hangul or non-Hangul
                     for part in parts:
                         if regex.search(r'\p{IsHangul}', part):  # Check if the part contains Hangul
                             kor_part.append(part.strip())
-                        else:
+                            # "假의 略字", "家와 同字"... ("의 本字" without its character is dropped)
+                            variant = regex.fullmatch(r'(\p{Han})?\s*[의와과]\s*(\p{Han}+)', part.strip())
+                            if variant is None:
+                                gloss_part.append(part.strip())
+                            elif variant.group(1):
+                                variants.append((variant.group(1), variant.group(2)))
+                        elif part.strip():
                             def_part.append(part.strip())
 
                     # Join the classified parts into strings
@@ -313,8 +450,12 @@ class DataProcessor:
                     # Create a structured entry for the current Hanja character
                     item = {
                         'kor': kor_parts,  # Korean readings
+                        'reading': kor,  # Reading of the "[가]" group
+                        'gloss': ', '.join(gloss_part),
+                        'stroke_count': int(strokes.group(1)) if strokes else None,
+                        'variants': variants,
                         'english_def': english_def,  # Definitions
-                        'french_def': GoogleTranslator(source='en', target='fr').translate(english_def)  # Definitions
+                        'french_def': None  # Filled below
                     }
 
                     # Add the entry to the dictionary under the current Hanja character
@@ -323,20 +464,14 @@ class DataProcessor:
                     else:
                         hanja_dict[chi] = [item]  # Create a new list for this character
 
+        # Translate all the definitions at once
+        if translator is None:
+            translator = get_translator()
+        items = [item for items in hanja_dict.values() for item in items]
+        translations = translator.translate_many(item['english_def'] for item in items)
+        for item in items:
+            # None when the translator couldn't translate it, the French definition isn't replaced by the English one
+            item['french_def'] = translations.get(item['english_def'])
+
         # Return the fully processed Hanja dictionary
         return hanja_dict
-
-    def reorder_hanja_results(self, hanja_results, hanja_characters):
-        """! @brief Function to reorder based on the correct list
-        @param hanja_results Unordered hanja list
-        @param hanja characters Ordered hanja list
-
-        @return ordered_results
-        """
-        # Create a dictionary to map each Hanja character to its position in hanja_characters
-        hanja_order = {char: index for index, char in enumerate(hanja_characters)}
-        
-        # Sort the hanja_results based on the order of the first item in the tuple (Hanja character)
-        ordered_results = sorted(hanja_results, key=lambda x: hanja_order.get(x[0], float('inf')))
-        
-        return ordered_results
\ No newline at end of file
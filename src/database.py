@@ -1,30 +1,118 @@
 #! @file src/database.py
+import os
 import sqlite3
-from src.config import DATABASE_PATH
+import threading
+import time
+from pathlib import Path
+from src.config import DATABASE_PATH, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE, SQLITE_STATEMENT_CACHE_SIZE
+from src.metrics import InstrumentedConnection, sql_connect_seconds
+
+class ConnectionPool:
+    """!
+    @brief Keeps one persistent read-only SQLite connection per thread and per process.
+    Connections are opened lazily, so a gunicorn worker opens its own connection after the fork
+    instead of sharing the one of the master process. The prepared statements of a connection
+    are cached by sqlite3 and reused by every request served by the same thread.
+    """
+
+    def __init__(self):
+        """!
+        @brief Initializes an empty pool.
+        """
+        self._local = threading.local()
+
+    def get(self):
+        """!
+        @brief Returns the connection of the current thread, opening it if needed.
+
+        @return sqlite3.Connection object opened in read-only mode.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid() or self._local.path != DATABASE_PATH:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.path = DATABASE_PATH
+        return conn
+
+    def close(self):
+        """!
+        @brief Closes the connection of the current thread, if any.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def _connect(self):
+        """!
+        @brief Opens a read-only connection and applies the read PRAGMAs.
+
+        @return sqlite3.Connection object.
+        """
+        start = time.perf_counter()
+        uri = Path(DATABASE_PATH).resolve().as_uri() + '?mode=ro'
+        # Autocommit : a read connection never keeps a transaction, and its lock, open between requests
+        conn = sqlite3.connect(uri, uri=True, isolation_level=None, cached_statements=SQLITE_STATEMENT_CACHE_SIZE,
+                               factory=InstrumentedConnection)
+        conn.execute('PRAGMA query_only = ON')
+        conn.execute(f'PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA cache_size = {int(SQLITE_CACHE_SIZE)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        sql_connect_seconds.observe(time.perf_counter() - start, 'read')
+        return conn
+
+
+# Shared by every DatabaseConnection of the process
+read_pool = ConnectionPool()
+
 
 class DatabaseConnection:
     """!
     @brief A class to manage database connections using a context manager.
-    Provides a convenient way to handle SQLite connections, ensuring
-    the connection is properly closed after use.
+    By default it hands out the pooled read-only connection of the current thread,
+    which stays open after the `with` block. Ingestion uses `writable=True` to get
+    its own connection, which is closed after use, and `bulk_load=True` to also
+    trade durability for speed while loading the dictionary.
     """
 
+    def __init__(self, writable=False, bulk_load=False):
+        """!
+        @brief Chooses between the pooled read-only connection and a new writable one.
+
+        @param writable True to open a separate connection allowed to modify the database.
+        @param bulk_load True to open a writable connection tuned for loading data.
+        """
+        self.writable = writable or bulk_load
+        self.bulk_load = bulk_load
+        self.conn = None
+
     def __enter__(self):
         """!
         @brief Establishes a connection to the SQLite database.
 
         @return sqlite3.Connection object representing the database connection.
         """
-        self.conn = sqlite3.connect(DATABASE_PATH)
+        if self.writable:
+            start = time.perf_counter()
+            self.conn = sqlite3.connect(DATABASE_PATH, factory=InstrumentedConnection)
+            if self.bulk_load:
+                # Nothing is synced to disk until the end : a crash during a load means rebuilding the database
+                self.conn.execute('PRAGMA synchronous = OFF')
+                self.conn.execute('PRAGMA journal_mode = MEMORY')
+            sql_connect_seconds.observe(time.perf_counter() - start, 'write')
+        else:
+            self.conn = read_pool.get()
         return self.conn
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         """!
-        @brief Closes the database connection when exiting the context.
+        @brief Closes the writable connection when exiting the context.
+        The pooled read-only connection is kept open for the next request.
 
         @param exc_val The value of the exception (if any).
         @param exc_type The type of the exception (if any).
         @param exc_tb The traceback of the exception (if any).
         """
-        if self.conn:
+        if self.writable and self.conn:
             self.conn.close()
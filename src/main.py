@@ -1,38 +1,113 @@
 #! @file src/main.py
+import argparse
+import os
+import time
+from src.config import TRANSLATION_BACKEND
 from src.data_access import DataAccess
 from src.data_processing import DataProcessor
+from src.translation import get_translator
 
-def main():
+# Specify the path to the folder
+DUMP_FOLDER = "data/전체 내려받기_한국어기초사전_json_20250112"
+HANJA_FILE = "data/hanja.txt"
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+def peak_rss_mb():
+    """!
+    @brief Returns the peak resident memory of the process.
+    @return The peak RSS in MB, or None if it can't be measured on this platform.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main(workers=1, full=False, translator=TRANSLATION_BACKEND, folder_path=DUMP_FOLDER, hanja_path=HANJA_FILE):
     """
     @brief Main function to orchestrate the data extraction, processing, and database operations.
+    @param workers Number of processes parsing the JSON files, the database is written by this process only.
+    @param full True to drop the words and reload every file, even the unchanged ones.
+    @param translator Backend translating the hanja definitions : `google`, or `offline` to run without network.
+    @param folder_path Folder of the JSON files of the dictionary dump.
+    @param hanja_path Path to the hanja file.
 
     - Initializes the database and creates tables if they don't exist.
-    - Extracts and processes word data, then inserts it into the database.
-    - Reads and processes hanja data from a file, then inserts it into the database.
-    - Retrieves and displays hanja characters and meanings for a given Korean word.
+    - Compares the hash of each JSON file with the one recorded at its last ingestion, and skips the unchanged files.
+    - Streams the changed files, and the unchanged ones sharing a word with a changed or removed file, into the
+      database entry by entry in the order of the files, then deletes the words no file contains anymore.
+    - Reads, processes and inserts the hanja data if the hanja file changed, or if some of its definitions were left untranslated.
+    - Reports the ingestion speed and the peak memory use.
+
+    A word found in several files is kept with the content of the first file containing it, in the
+    order of the files, so the database is the same as after a `full` rebuild.
     """
 
     data_access = DataAccess()
-    # Specify the path to the folder
-    folder_path = "data/전체 내려받기_한국어기초사전_json_20250112"
     data_processor = DataProcessor(folder_path)
 
-    
-    # Extract and process word data
-    raw_data = data_processor.extract_data()
-    processed_data = data_processor.process_data(raw_data)
-    
+    start = time.perf_counter()
+
     # Initialize the database and create tables
-    data_access.drop_tables()
+    if full:
+        data_access.drop_tables()
     data_access.initialize_database()
-    data_access.insert_data(processed_data)
-    """
+
+    # Find the files that changed since the last ingestion
+    ingested_hashes = data_access.get_source_hashes('words')
+    file_paths = data_processor.json_files()
+    file_hashes = {path: data_processor.hash_file(path) for path in file_paths}
+    changed_paths = [path for path in file_paths if ingested_hashes.get(os.path.basename(path)) != file_hashes[path]]
+    removed_sources = set(ingested_hashes) - {os.path.basename(path) for path in file_paths}
+    print(f"{len(file_paths) - len(changed_paths)} unchanged files skipped, "
+          f"{len(changed_paths)} changed and {len(removed_sources)} removed.")
+
+    # The files sharing a word with a changed or removed file are read again, so the word takes the
+    # content of the first file containing it. Their rows are kept and updated, the others are deleted at the end.
+    sources = [os.path.basename(path) for path in file_paths]
+    changed_sources = {os.path.basename(path) for path in changed_paths}
+    sharing_sources = data_access.get_sharing_sources(sorted(removed_sources | changed_sources))
+    reload_paths = [path for path in file_paths if os.path.basename(path) in changed_sources | sharing_sources]
+    for source in sorted(removed_sources) + [os.path.basename(path) for path in reload_paths]:
+        data_access.forget_source(source)
+    # The indexes are built again once at the end when the run loads the whole dictionary
+    data_access.begin_load(drop_indexes=not ingested_hashes)
+    entry_count = 0
+    for path, entries in data_processor.stream_files(reload_paths, workers):
+        source = os.path.basename(path)
+        entry_count += data_access.insert_data(entries, source=source, earlier_sources=sources[:sources.index(source)])
+        data_access.record_source(source, 'words', file_hashes[path])
+    deleted = data_access.delete_unreferenced_words()
+    data_access.end_load()
+    print(f"{len(reload_paths) - len(changed_paths)} unchanged files sharing words reloaded, {deleted} words deleted.")
+
     # Read and process hanja data
-    lines = data_processor.read_hanja_file('data/hanja.txt')
-    hanja_dict = data_processor.process_hanja_data(lines)
-    data_access.insert_hanja_data(hanja_dict)
-    data_access.remove_duplicates()
-    """
+    hanja_hash = data_processor.hash_file(hanja_path)
+    if data_access.get_source_hashes('hanja').get(os.path.basename(hanja_path)) != hanja_hash:
+        lines = data_processor.read_hanja_file(hanja_path)
+        hanja_dict = data_processor.process_hanja_data(lines, get_translator(translator))
+        data_access.insert_hanja_data(hanja_dict, replace=True)
+        untranslated = sum(1 for items in hanja_dict.values() for item in items if item['english_def'] and item['french_def'] is None)
+        if untranslated:
+            # Not recorded, so the next ingestion reads the file again to translate them
+            print(f"{untranslated} hanja definitions left untranslated, they will be translated by the next ingestion.")
+        else:
+            data_access.record_source(os.path.basename(hanja_path), 'hanja', hanja_hash)
+
+    elapsed = time.perf_counter() - start
+    peak_rss = peak_rss_mb()
+    print(f"{entry_count} entries ingested in {elapsed:.1f} s ({entry_count / elapsed:.0f} entries/s).")
+    if peak_rss is not None:
+        print(f"Peak RSS: {peak_rss:.0f} MB.")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Builds the database from the dictionary dump.")
+    parser.add_argument('--workers', type=int, default=1, help="number of processes parsing the JSON files")
+    parser.add_argument('--full', action='store_true', help="reload every file instead of only the changed ones")
+    parser.add_argument('--translator', choices=['google', 'offline'], default=TRANSLATION_BACKEND,
+                        help="backend translating the hanja definitions, 'offline' runs without network")
+    args = parser.parse_args()
+    main(args.workers, args.full, args.translator)
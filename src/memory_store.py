@@ -0,0 +1,346 @@
+#! @file src/memory_store.py
+import itertools
+import zlib
+from array import array
+from src.data_access import DataAccess
+from src.database import DatabaseConnection
+from src.store_access import StoreDataAccess
+
+NONE = 0xFFFFFFFF  # String id of NULL values, and empty slot of the hash indexes
+ENTRY_COLUMNS = ('word', 'hanja', 'glossary', 'englishLemma', 'englishDefinition', 'frenchLemma', 'frenchDefinition', 'pronounciation')
+HANJA_COLUMNS = ('korean', 'englishDefinition', 'frenchDefinition')
+
+# Column of the meaning of a character, by language
+HANJA_LANGUAGE_COLUMN = {'fr': 'frenchDefinition', 'en': 'englishDefinition'}
+
+
+class StringPool:
+    """!
+    @brief Interned strings stored once, as UTF-8, in a single buffer. A string is known by its id,
+    string i being buffer[offsets[i]:offsets[i + 1]], and is only decoded when it is read.
+    """
+
+    def __init__(self):
+        """!
+        @brief Creates an empty pool, strings can be added until freeze is called.
+        """
+        self._ids = {}
+        self._buffer = bytearray()
+        self.buffer = b''
+        self.offsets = array('I', [0])
+
+    def intern(self, value):
+        """!
+        @brief Adds a string to the pool, if it isn't already in it.
+        @param value The string, or None.
+        @return The id of the string, NONE for None.
+        """
+        if value is None:
+            return NONE
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = self._ids[value] = len(self.offsets) - 1
+            self._buffer += value.encode('utf-8')
+            self.offsets.append(len(self._buffer))
+        return string_id
+
+    def freeze(self):
+        """!
+        @brief Drops the interning table, which is only needed while building.
+        """
+        self.buffer = bytes(self._buffer)
+        self._buffer = None
+        self._ids = None
+
+    def get(self, string_id):
+        """!
+        @brief Decodes a string.
+        @param string_id Id of the string.
+        @return The string, or None for NONE.
+        """
+        if string_id == NONE:
+            return None
+        return self.buffer[self.offsets[string_id]:self.offsets[string_id + 1]].decode('utf-8')
+
+    def key(self, string_id):
+        """!
+        @brief Returns the UTF-8 bytes of a string, used to hash and compare keys.
+        """
+        buffer = self.buffer if self._buffer is None else self._buffer
+        return bytes(buffer[self.offsets[string_id]:self.offsets[string_id + 1]])
+
+    def nbytes(self):
+        """!
+        @brief Returns the size, in bytes, of the buffer and of the offsets.
+        """
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+
+
+class HashIndex:
+    """!
+    @brief Open addressing hash table mapping the strings of a pool to their position in a list of keys.
+    The slots are an array of positions, the keys themselves stay in the pool, so the index costs
+    a few bytes per key instead of a Python string and a dictionary entry.
+    """
+
+    def __init__(self, pool, key_ids):
+        """!
+        @brief Builds the table, about half full.
+        @param pool The StringPool of the keys.
+        @param key_ids Array of the string ids of the distinct keys.
+        """
+        self.pool = pool
+        self.key_ids = key_ids
+        size = 1
+        while size < 2 * len(key_ids):
+            size *= 2
+        self.mask = size - 1
+        self.slots = array('I', [NONE]) * size
+        for position, string_id in enumerate(key_ids):
+            slot = zlib.crc32(pool.key(string_id)) & self.mask
+            while self.slots[slot] != NONE:
+                slot = (slot + 1) & self.mask
+            self.slots[slot] = position
+
+    def find(self, value):
+        """!
+        @brief Looks up a string.
+        @param value The string searched.
+        @return Its position in the keys, None if it isn't one of them.
+        """
+        key = value.encode('utf-8')
+        slot = zlib.crc32(key) & self.mask
+        while True:
+            position = self.slots[slot]
+            if position == NONE:
+                return None
+            if self.pool.key(self.key_ids[position]) == key:
+                return position
+            slot = (slot + 1) & self.mask
+
+    def nbytes(self):
+        """!
+        @brief Returns the size, in bytes, of the slots and of the keys.
+        """
+        return self.slots.itemsize * len(self.slots) + self.key_ids.itemsize * len(self.key_ids)
+
+
+def _string_column(name):
+    """!
+    @brief Property of a row view decoding one string column.
+    """
+    return property(lambda view: view.store.pool.get(view.store.columns[name][view.row]), doc=f"The `{name}` of the entry.")
+
+
+class EntryView:
+    """!
+    @brief View of a row of the store, the columns are decoded when they are read.
+    """
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        """!
+        @param store The ColumnarStore.
+        @param row Index of the row.
+        """
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self):
+        return self.store.ids[self.row]
+
+    word = _string_column('word')
+    hanja = _string_column('hanja')
+    glossary = _string_column('glossary')
+    englishLemma = _string_column('englishLemma')
+    englishDefinition = _string_column('englishDefinition')
+    frenchLemma = _string_column('frenchLemma')
+    frenchDefinition = _string_column('frenchDefinition')
+    pronounciation = _string_column('pronounciation')
+
+    def get(self, name):
+        """!
+        @brief Decodes a column given by its name.
+        """
+        return self.store.pool.get(self.store.columns[name][self.row])
+
+
+class ColumnarStore:
+    """!
+    @brief The dictionary kept in memory as columns : every column is an array of string ids into one
+    StringPool, the entries being sorted by word then id. Hash indexes give the entries of a word
+    (a contiguous range of rows), the entries whose hanja contain a character (a list of rows in id
+    order) and the row of a hanja character.
+    """
+
+    def __init__(self, entries, hanja_rows, generation=0):
+        """!
+        @brief Builds the columns and the indexes.
+        @param entries An iterable of (id, word, hanja, glossary, englishLemma, englishDefinition, frenchLemma,
+               frenchDefinition, pronounciation), sorted by word then id.
+        @param hanja_rows An iterable of (character, korean, englishDefinition, frenchDefinition).
+        @param generation The dataset generation the rows were read from.
+        """
+        self.generation = generation
+        self.pool = StringPool()
+        self.ids = array('I')
+        self.columns = {name: array('I') for name in ENTRY_COLUMNS}
+        # First row of each distinct word, and the end of the last one
+        self.word_starts = array('I')
+        word_keys = array('I')
+        rows_by_char = {}
+        previous_word = None
+        for row, entry in enumerate(entries):
+            self.ids.append(entry[0])
+            for name, value in zip(ENTRY_COLUMNS, entry[1:]):
+                self.columns[name].append(self.pool.intern(value))
+            if entry[1] != previous_word:
+                previous_word = entry[1]
+                self.word_starts.append(row)
+                word_keys.append(self.columns['word'][row])
+            for char in dict.fromkeys(entry[2] or ''):
+                rows_by_char.setdefault(char, array('I')).append(row)
+        self.word_starts.append(len(self.ids))
+
+        # Rows containing each character, in id order for the pages of related words
+        self.char_starts = array('I')
+        self.postings = array('I')
+        char_keys = array('I')
+        for char, rows in rows_by_char.items():
+            char_keys.append(self.pool.intern(char))
+            self.char_starts.append(len(self.postings))
+            self.postings.extend(sorted(rows, key=self.ids.__getitem__))
+        self.char_starts.append(len(self.postings))
+        del rows_by_char
+
+        self.hanja_columns = {name: array('I') for name in HANJA_COLUMNS}
+        hanja_keys = array('I')
+        for character, *values in hanja_rows:
+            hanja_keys.append(self.pool.intern(character))
+            for name, value in zip(HANJA_COLUMNS, values):
+                self.hanja_columns[name].append(self.pool.intern(value))
+
+        self.words = HashIndex(self.pool, word_keys)
+        self.characters = HashIndex(self.pool, char_keys)
+        self.hanja = HashIndex(self.pool, hanja_keys)
+        self.pool.freeze()
+
+    @classmethod
+    def from_database(cls):
+        """!
+        @brief Loads 'korean_words' and 'hanja_characters' from the database.
+        @return A ColumnarStore.
+        """
+        generation = DataAccess().get_dataset_generation()
+        with DatabaseConnection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT character, korean, englishDefinition, frenchDefinition FROM hanja_characters ORDER BY character')
+            hanja_rows = cursor.fetchall()
+            cursor.execute(f'''
+            SELECT id, {', '.join(ENTRY_COLUMNS)}
+            FROM korean_words
+            ORDER BY word, id
+            ''')
+            # The rows are streamed into the columns, never all held as tuples
+            rows = itertools.chain.from_iterable(iter(lambda: cursor.fetchmany(5000), []))
+            return cls(rows, hanja_rows, generation)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def word_entries(self, word):
+        """!
+        @brief Lists the entries of a word.
+        @param word The Korean word.
+        @return A list of EntryView, in id order.
+        """
+        position = self.words.find(word)
+        if position is None:
+            return []
+        return [EntryView(self, row) for row in range(self.word_starts[position], self.word_starts[position + 1])]
+
+    def char_entries(self, character):
+        """!
+        @brief Lists the entries whose hanja contain a character.
+        @param character The hanja character.
+        @return A list of EntryView, in id order.
+        """
+        position = self.characters.find(character)
+        if position is None:
+            return []
+        return [EntryView(self, row) for row in self.postings[self.char_starts[position]:self.char_starts[position + 1]]]
+
+    def hanja_meaning(self, character, language):
+        """!
+        @brief Looks up a hanja character.
+        @param character The hanja character.
+        @param language The language of the meaning.
+        @return A tuple (character, korean, meaning), or None if it isn't known.
+        """
+        row = self.hanja.find(character)
+        if row is None:
+            return None
+        meaning = self.hanja_columns[HANJA_LANGUAGE_COLUMN.get(language, 'englishDefinition')][row]
+        return character, self.pool.get(self.hanja_columns['korean'][row]), self.pool.get(meaning)
+
+    def memory_usage(self):
+        """!
+        @brief Returns the size, in bytes, of each part of the store.
+        """
+        def size(arrays):
+            return sum(values.itemsize * len(values) for values in arrays)
+
+        return {
+            'strings': self.pool.nbytes(),
+            'entry_columns': size([self.ids, *self.columns.values()]),
+            'hanja_columns': size(self.hanja_columns.values()),
+            'postings': size([self.postings, self.char_starts, self.word_starts]),
+            'hash_indexes': self.words.nbytes() + self.characters.nbytes() + self.hanja.nbytes(),
+        }
+
+
+class MemoryDataAccess(StoreDataAccess):
+    """!
+    @brief DataAccess serving the read methods of the search page from a ColumnarStore instead of SQLite.
+    The store is loaded once, like a snapshot : a new ingestion is served after a restart.
+    The other methods, and the ingestion, still use the database.
+    """
+
+    def __init__(self, store=None):
+        """!
+        @brief Loads the store from the database, unless one is given.
+        @param store A ColumnarStore.
+        """
+        self.store = store if store is not None else ColumnarStore.from_database()
+
+    def store_generation(self):
+        """!
+        @brief Retrieves the dataset generation the store was loaded from.
+        @return The generation number.
+        """
+        return self.store.generation
+
+    def word_entries(self, word):
+        """!
+        @brief Lists the entries of a word, see StoreDataAccess.word_entries.
+        """
+        return self.store.word_entries(word)
+
+    def char_entries(self, character):
+        """!
+        @brief Lists the entries whose hanja contain a character, see StoreDataAccess.char_entries.
+        """
+        return self.store.char_entries(character)
+
+    def all_entries(self):
+        """!
+        @brief Lists every entry, see StoreDataAccess.all_entries.
+        """
+        return (EntryView(self.store, row) for row in range(len(self.store)))
+
+    def hanja_meaning(self, character, language):
+        """!
+        @brief Looks up a hanja character, see StoreDataAccess.hanja_meaning.
+        """
+        return self.store.hanja_meaning(character, language)
@@ -0,0 +1,279 @@
+#! @file src/metrics.py
+import bisect
+import contextvars
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from src.config import SLOW_QUERY_THRESHOLD_MS
+
+# Upper bounds (in seconds) of the histogram buckets, from 0.1 ms to 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def escape_label(value):
+    """!
+    @brief Escapes a label value for the Prometheus text format.
+    """
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    """!
+    @brief Formats the labels of a sample, for example {route="/search",method="POST"}.
+    """
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, escape_label(value)) for name, value in pairs) + '}'
+
+
+class Counter:
+    """!
+    @brief A Prometheus counter, with one value per combination of labels.
+    """
+
+    def __init__(self, name, documentation, labels=()):
+        """!
+        @brief Creates the counter.
+        @param name Name of the metric.
+        @param documentation Help text of the metric.
+        @param labels Names of the labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        """!
+        @brief Increases the counter of a combination of labels.
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        """!
+        @brief Formats the counter in the Prometheus text format.
+        @return A list of lines.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+class Histogram:
+    """!
+    @brief A Prometheus histogram, with one set of buckets per combination of labels.
+    """
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        """!
+        @brief Creates the histogram.
+        @param name Name of the metric.
+        @param documentation Help text of the metric.
+        @param labels Names of the labels.
+        @param buckets Sorted upper bounds of the buckets, +Inf is added.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # Label values -> [count of each bucket (not cumulated), +Inf bucket, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """!
+        @brief Records a value for a combination of labels.
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(label_values)
+            if values is None:
+                values = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    def render(self):
+        """!
+        @brief Formats the histogram in the Prometheus text format.
+        @return A list of lines.
+        """
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, values in sorted(self._values.items()):
+                cumulated = 0
+                for bound, count in zip(self.buckets + ('+Inf',), values):
+                    cumulated += count
+                    lines.append(f'{self.name}_bucket{format_labels(self.labels, label_values, [("le", bound)])} {cumulated}')
+                labels = format_labels(self.labels, label_values)
+                lines.append(f'{self.name}_sum{labels} {values[-1]}')
+                lines.append(f'{self.name}_count{labels} {cumulated}')
+        return lines
+
+
+sql_statement_seconds = Histogram(
+    'hanja_sql_statement_seconds', 'Time spent executing a SQL statement and fetching its rows.', ('statement',))
+sql_rows = Counter('hanja_sql_rows_total', 'Rows returned, or modified, by the SQL statements.', ('statement',))
+sql_connect_seconds = Histogram('hanja_sql_connect_seconds', 'Time spent opening and configuring a SQLite connection.', ('mode',))
+http_request_seconds = Histogram(
+    'hanja_http_request_seconds', 'Latency of the HTTP requests.', ('route', 'method', 'status'))
+http_request_queries = Histogram(
+    'hanja_http_request_queries', 'SQL statements executed by an HTTP request.', ('route',), QUERY_COUNT_BUCKETS)
+template_render_seconds = Histogram('hanja_template_render_seconds', 'Time spent rendering a template.', ('template',))
+REGISTRY = [sql_statement_seconds, sql_rows, sql_connect_seconds, http_request_seconds, http_request_queries, template_render_seconds]
+
+# Statements executed by the current request. A context variable rather than a thread-local : the
+# ASGI server (api/asgi.py) runs the steps of a request in several threads, in the context of the request
+_request_queries = contextvars.ContextVar('request_queries', default=0)
+
+
+def start_request():
+    """!
+    @brief Starts counting the statements of the current request.
+    """
+    _request_queries.set(0)
+
+
+def request_queries():
+    """!
+    @brief Returns the number of statements executed since start_request.
+    """
+    return _request_queries.get()
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """!
+    @brief Turns a statement into a label : literals are replaced by ?, lists of parameters
+    are collapsed and whitespace is reduced, so every call of a query gets the same label.
+    @param sql The SQL statement.
+    @return The normalized statement, at most 200 characters long.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)+\s*\)', '(?, ...)', sql)
+    sql = ' '.join(sql.split()).rstrip(';').strip()
+    return sql[:200]
+
+
+def record_statement(sql, seconds, rows):
+    """!
+    @brief Records a statement executed by an instrumented connection, and logs it if it is slow.
+    @param sql The SQL statement.
+    @param seconds Time spent executing it and fetching its rows.
+    @param rows Number of rows returned or modified.
+    """
+    label = normalize_sql(sql)
+    sql_statement_seconds.observe(seconds, label)
+    if rows > 0:
+        sql_rows.inc(rows, label)
+    _request_queries.set(_request_queries.get() + 1)
+    if SLOW_QUERY_THRESHOLD_MS is not None and seconds * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        print(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows): {label}")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """!
+    @brief Cursor timing its statements. The time of a statement includes the fetch of its rows,
+    it is recorded when the rows have all been fetched, or when the cursor runs another statement.
+    """
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        cursor = super().execute(sql, parameters)
+        self._pending = [sql, time.perf_counter() - start, 0]
+        if self.description is None:
+            # No rows to fetch (INSERT, UPDATE, CREATE...)
+            self._pending[2] = max(self.rowcount, 0)
+            self._finish()
+        return cursor
+
+    def executemany(self, sql, parameters):
+        self._finish()
+        start = time.perf_counter()
+        cursor = super().executemany(sql, parameters)
+        record_statement(sql, time.perf_counter() - start, max(self.rowcount, 0))
+        return cursor
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # A statement whose rows weren't all fetched
+        self._finish()
+
+    def _fetched(self, start, rows, done):
+        """!
+        @brief Adds the time and the rows of a fetch to the pending statement.
+        """
+        if self._pending is not None:
+            self._pending[1] += time.perf_counter() - start
+            self._pending[2] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        """!
+        @brief Records the pending statement, if any.
+        """
+        if self._pending is not None:
+            sql, seconds, rows = self._pending
+            self._pending = None
+            record_statement(sql, seconds, rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """!
+    @brief Connection whose cursors are InstrumentedCursor, passed to sqlite3.connect as `factory`.
+    Python's sqlite3 module has no binding for sqlite3_profile, so the statements are timed by the cursors.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+
+def render_metrics(extra_lines=()):
+    """!
+    @brief Formats every metric in the Prometheus text format.
+    @param extra_lines Lines of other metrics to append.
+    @return The text of the /metrics response.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(extra_lines)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,284 @@
+#! @file src/snapshot.py
+import mmap
+import os
+import struct
+from collections import namedtuple
+from src.config import DATABASE_PATH
+from src.data_access import DataAccess
+from src.database import DatabaseConnection
+from src.store_access import StoreDataAccess
+
+MAGIC = b'HNJSNAP1'
+VERSION = 1
+# magic, version, generation, then the count and the offset of each section
+HEADER = struct.Struct('<8sII' + 'II' * 5)
+NONE = 0xFFFFFFFF  # String id of NULL values
+ENTRY_FIELDS = 9  # id, word, hanja, glossary, englishLemma, englishDefinition, frenchLemma, frenchDefinition, pronounciation
+HANJA_FIELDS = 4  # character, korean, englishDefinition, frenchDefinition
+POSTING_FIELDS = 3  # character, start and end of the entries containing it in the postings
+
+# An entry of the snapshot, with the columns of korean_words
+SnapshotEntry = namedtuple('SnapshotEntry', (
+    'id', 'word', 'hanja', 'glossary', 'englishLemma', 'englishDefinition', 'frenchLemma', 'frenchDefinition', 'pronounciation'
+))
+# Field of the meaning of a character, by language
+HANJA_LANGUAGE_FIELD = {'fr': 3, 'en': 2}
+
+
+def build_snapshot(output_path):
+    """!
+    @brief Compiles 'korean_words' and 'hanja_characters' into a read-only binary snapshot.
+
+    Layout (little-endian, every section aligned on 4 bytes):
+    - header : magic, version, dataset generation, then (count, offset) of each section.
+    - string offsets : uint32[count + 1], string i is pool[offsets[i]:offsets[i + 1]].
+    - string pool : the interned UTF-8 strings.
+    - entries : uint32[count * 9], the id and the string ids of each word, sorted by word then id.
+    - postings index : uint32[count * 3], a character and the range of its postings, sorted by character.
+    - postings : uint32[], indexes of the entries containing each character, in id order.
+    - hanja : uint32[count * 4], the string ids of each hanja character, sorted by character.
+
+    The file is written next to the output and renamed, so a server mapping the previous
+    snapshot keeps reading it until it reopens the file.
+    @param output_path Path of the snapshot file.
+    @return The number of entries written.
+    """
+    strings = {}
+
+    def intern(value):
+        if value is None:
+            return NONE
+        return strings.setdefault(value, len(strings))
+
+    data_access = DataAccess()
+    generation = data_access.get_dataset_generation()
+    with DatabaseConnection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT id, word, hanja, glossary, englishLemma, englishDefinition, frenchLemma, frenchDefinition, pronounciation
+        FROM korean_words
+        ''')
+        words = cursor.fetchall()
+        cursor.execute('SELECT character, korean, englishDefinition, frenchDefinition FROM hanja_characters')
+        hanja_rows = cursor.fetchall()
+
+    # UTF-8 byte order is the code point order, so the reader can compare encoded keys
+    words.sort(key=lambda row: (row[1].encode('utf-8'), row[0]))
+    entries = []
+    postings_by_char = {}
+    for index, row in enumerate(words):
+        entries.append(row[0])
+        entries.extend(intern(value) for value in row[1:])
+        for char in dict.fromkeys(row[2] or ''):
+            postings_by_char.setdefault(char, []).append((row[0], index))
+
+    postings_index = []
+    postings = []
+    for char in sorted(postings_by_char, key=lambda c: c.encode('utf-8')):
+        start = len(postings)
+        postings.extend(index for _, index in sorted(postings_by_char[char]))
+        postings_index.extend((intern(char), start, len(postings)))
+
+    hanja = []
+    for row in sorted(hanja_rows, key=lambda row: row[0].encode('utf-8')):
+        hanja.extend(intern(value) for value in row)
+
+    pool = bytearray()
+    string_offsets = [0]
+    for value in strings:  # Dictionaries keep the order of the ids
+        pool += value.encode('utf-8')
+        string_offsets.append(len(pool))
+    pool += b'\0' * (-len(pool) % 4)
+
+    sections = [
+        (len(strings), struct.pack(f'<{len(string_offsets)}I', *string_offsets) + bytes(pool)),
+        (len(words), struct.pack(f'<{len(entries)}I', *entries)),
+        (len(postings_index) // POSTING_FIELDS, struct.pack(f'<{len(postings_index)}I', *postings_index)),
+        (len(postings), struct.pack(f'<{len(postings)}I', *postings)),
+        (len(hanja_rows), struct.pack(f'<{len(hanja)}I', *hanja)),
+    ]
+    header_values = []
+    offset = HEADER.size
+    for count, payload in sections:
+        header_values.extend((count, offset))
+        offset += len(payload)
+
+    temp_path = output_path + '.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, generation, *header_values))
+        for _, payload in sections:
+            file.write(payload)
+    os.replace(temp_path, output_path)
+    return len(words)
+
+
+class Snapshot:
+    """!
+    @brief Memory-mapped reader of a snapshot written by build_snapshot.
+    Nothing is decoded when the file is opened : lookups binary search the sorted tables
+    and only decode the strings they return.
+    """
+
+    def __init__(self, path):
+        """!
+        @brief Maps the snapshot file in memory.
+        @param path Path of the snapshot file.
+        """
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        values = HEADER.unpack_from(self._mmap, 0)
+        magic, version, self.generation = values[:3]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a snapshot of version {VERSION}.")
+        (self.string_count, strings_offset, self.entry_count, entries_offset, self.char_count, index_offset,
+         postings_count, postings_offset, self.hanja_count, hanja_offset) = values[3:]
+
+        view = memoryview(self._mmap)
+        self._string_offsets = view[strings_offset:strings_offset + 4 * (self.string_count + 1)].cast('I')
+        self._pool = view[strings_offset + 4 * (self.string_count + 1):entries_offset]
+        self._entries = view[entries_offset:index_offset].cast('I')
+        self._postings_index = view[index_offset:postings_offset].cast('I')
+        self._postings = view[postings_offset:postings_offset + 4 * postings_count].cast('I')
+        self._hanja = view[hanja_offset:hanja_offset + 4 * HANJA_FIELDS * self.hanja_count].cast('I')
+
+    def string(self, string_id):
+        """!
+        @brief Decodes a string of the pool.
+        @param string_id Id of the string.
+        @return The string, or None for the NULL id.
+        """
+        if string_id == NONE:
+            return None
+        return str(self._pool[self._string_offsets[string_id]:self._string_offsets[string_id + 1]], 'utf-8')
+
+    def _key(self, string_id):
+        """!
+        @brief Returns the UTF-8 bytes of a string of the pool, used to compare keys.
+        """
+        return self._pool[self._string_offsets[string_id]:self._string_offsets[string_id + 1]].tobytes()
+
+    def _lower_bound(self, table, fields, count, key):
+        """!
+        @brief Finds the first row of a sorted table whose first column is not smaller than the key.
+        @param table uint32 view of the table.
+        @param fields Number of columns of the table.
+        @param count Number of rows of the table.
+        @param key The UTF-8 bytes searched.
+        @return The index of the row.
+        """
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(table[middle * fields]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def entry(self, index):
+        """!
+        @brief Decodes an entry.
+        @param index Index of the entry in the table.
+        @return A SnapshotEntry (id, word, hanja, glossary, englishLemma, englishDefinition, frenchLemma, frenchDefinition, pronounciation).
+        """
+        start = index * ENTRY_FIELDS
+        return SnapshotEntry(self._entries[start], *(self.string(self._entries[start + i]) for i in range(1, ENTRY_FIELDS)))
+
+    def word_entries(self, word):
+        """!
+        @brief Lists the entries of a word.
+        @param word The Korean word.
+        @return A list of entry tuples, in id order.
+        """
+        key = word.encode('utf-8')
+        index = self._lower_bound(self._entries[1:], ENTRY_FIELDS, self.entry_count, key)
+        entries = []
+        while index < self.entry_count and self._key(self._entries[index * ENTRY_FIELDS + 1]) == key:
+            entries.append(self.entry(index))
+            index += 1
+        return entries
+
+    def char_entries(self, character):
+        """!
+        @brief Lists the entries whose hanja contains a character.
+        @param character The hanja character.
+        @return A list of entry tuples, in id order.
+        """
+        key = character.encode('utf-8')
+        index = self._lower_bound(self._postings_index, POSTING_FIELDS, self.char_count, key)
+        if index == self.char_count or self._key(self._postings_index[index * POSTING_FIELDS]) != key:
+            return []
+        start = self._postings_index[index * POSTING_FIELDS + 1]
+        end = self._postings_index[index * POSTING_FIELDS + 2]
+        return [self.entry(self._postings[i]) for i in range(start, end)]
+
+    def hanja(self, character):
+        """!
+        @brief Looks up a hanja character.
+        @param character The hanja character.
+        @return A tuple (character, korean, englishDefinition, frenchDefinition), or None if it isn't known.
+        """
+        key = character.encode('utf-8')
+        index = self._lower_bound(self._hanja, HANJA_FIELDS, self.hanja_count, key)
+        if index == self.hanja_count or self._key(self._hanja[index * HANJA_FIELDS]) != key:
+            return None
+        start = index * HANJA_FIELDS
+        return tuple(self.string(self._hanja[start + i]) for i in range(HANJA_FIELDS))
+
+
+class SnapshotDataAccess(StoreDataAccess):
+    """!
+    @brief DataAccess serving the read methods of the search page from a Snapshot instead of SQLite.
+    The other methods, and the ingestion, still use the database.
+    """
+
+    def __init__(self, snapshot_path):
+        """!
+        @brief Opens the snapshot.
+        @param snapshot_path Path of the snapshot file.
+        """
+        self.snapshot = Snapshot(snapshot_path)
+
+    def store_generation(self):
+        """!
+        @brief Retrieves the dataset generation the snapshot was built from.
+        @return The generation number.
+        """
+        return self.snapshot.generation
+
+    def word_entries(self, word):
+        """!
+        @brief Lists the entries of a word, see StoreDataAccess.word_entries.
+        """
+        return self.snapshot.word_entries(word)
+
+    def char_entries(self, character):
+        """!
+        @brief Lists the entries whose hanja contain a character, see StoreDataAccess.char_entries.
+        """
+        return self.snapshot.char_entries(character)
+
+    def all_entries(self):
+        """!
+        @brief Lists every entry, see StoreDataAccess.all_entries.
+        """
+        return map(self.snapshot.entry, range(self.snapshot.entry_count))
+
+    def hanja_meaning(self, character, language):
+        """!
+        @brief Looks up a hanja character, see StoreDataAccess.hanja_meaning.
+        """
+        row = self.snapshot.hanja(character)
+        if row is None:
+            return None
+        return row[0], row[1], row[HANJA_LANGUAGE_FIELD.get(language, HANJA_LANGUAGE_FIELD['en'])]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compiles the database into a read-only snapshot for the web server.")
+    parser.add_argument('output', help="path of the snapshot file")
+    args = parser.parse_args()
+    count = build_snapshot(args.output)
+    print(f"Snapshot of {count} entries from '{DATABASE_PATH}' written to '{args.output}'.")
@@ -0,0 +1,191 @@
+#! @file src/store_access.py
+from src.config import RELATED_WORDS_PAGE_SIZE
+from src.data_access import DataAccess
+
+# Column of the lemma and of the definition of an entry, by language
+ENTRY_LANGUAGE_COLUMNS = {'fr': ('frenchLemma', 'frenchDefinition'), 'en': ('englishLemma', 'englishDefinition')}
+
+
+class StoreDataAccess(DataAccess):
+    """!
+    @brief DataAccess serving the read methods of the search page from a read-only copy of the dictionary
+    (src/snapshot.py, src/memory_store.py) instead of SQLite. The subclasses only give how the entries and
+    the characters are stored : store_generation, word_entries, char_entries, all_entries and hanja_meaning.
+    An entry has the `id` and the columns of 'korean_words' as attributes.
+    The other methods, and the ingestion, still use the database.
+    """
+
+    def store_generation(self):
+        """!
+        @brief Retrieves the dataset generation the entries were read from.
+        @return The generation number.
+        """
+        raise NotImplementedError
+
+    def get_dataset_generation(self):
+        """!
+        @brief Retrieves the generation of the data served : the one of the store, which doesn't change while
+        it is open, and the one of the database, which changes with every ingestion and is the only one that
+        matters for the methods still reading SQLite (reverse_search, get_hanja_by_reading...).
+        @return A string "store.database", tagging the cached results and the ETags.
+        """
+        return '{}.{}'.format(self.store_generation(), super().get_dataset_generation())
+
+    def word_entries(self, word):
+        """!
+        @brief Lists the entries of a word.
+        @param word The Korean word.
+        @return A list of entries, in id order.
+        """
+        raise NotImplementedError
+
+    def char_entries(self, character):
+        """!
+        @brief Lists the entries whose hanja contain a character.
+        @param character The hanja character.
+        @return A list of entries, in id order.
+        """
+        raise NotImplementedError
+
+    def all_entries(self):
+        """!
+        @brief Lists every entry.
+        @return An iterable of entries, sorted by word then id.
+        """
+        raise NotImplementedError
+
+    def hanja_meaning(self, character, language):
+        """!
+        @brief Looks up a hanja character.
+        @param character The hanja character.
+        @param language The language of the meaning.
+        @return A tuple (character, korean, meaning), or None if it isn't known.
+        """
+        raise NotImplementedError
+
+    def get_hanja_for_word(self, word):
+        """!
+        @brief Retrieves Hanja associated with a given Korean word.
+        @param word (str): The Korean word for which to fetch Hanja character.
+        @return a list of Hanja strings, None if no data is found.
+        """
+        hanja_list = [entry.hanja for entry in self.word_entries(word) if entry.hanja is not None]
+        return hanja_list or None
+
+    def get_hanja_meanings_for_word(self, word, hanja_list, language):
+        """!
+        @brief Retrieves Hanja meanings of every characters associated with a given Korean word.
+        @param word (str): The Korean word for which to fetch Hanja meanings.
+        @param hanja_list (list): The list of hanja associated to the initial words.
+        @param language (str): The language of the page.
+        @return a list of tuples containing Hanja character, Korean pronunciation, and meaning.
+        """
+        if hanja_list is None:
+            return None
+        meanings = (self.hanja_meaning(character, language) for character in sorted(set(hanja_list)))
+        return [meaning for meaning in meanings if meaning is not None]
+
+    def lookup_word(self, word, language):
+        """!
+        @brief Retrieves the entries of a word with the ordered meanings of their hanja, see DataAccess.lookup_word.
+        @param word (str): The Korean word to search for.
+        @param language (str): The language of the page.
+        @return a list of tuples (entry, hanja_meanings, hanja).
+        """
+        lemma_column, definition_column = ENTRY_LANGUAGE_COLUMNS.get(language, ENTRY_LANGUAGE_COLUMNS['en'])
+        entries = []
+        for entry in self.word_entries(word):
+            hanja = entry.hanja
+            meanings = (self.hanja_meaning(character, language) for character in dict.fromkeys(hanja or ''))
+            entries.append((
+                # The stores only keep the first sense of the entries, in the columns of korean_words
+                (entry.glossary, getattr(entry, lemma_column), getattr(entry, definition_column), entry.pronounciation, []),
+                [meaning for meaning in meanings if meaning is not None],
+                hanja,
+            ))
+
+        hanja_entries = [entry for entry in entries if entry[2]]
+        if not hanja_entries:
+            return [(entry, None, None) for entry, meanings, hanja in entries]
+        return hanja_entries
+
+    def lookup_words(self, words, language):
+        """!
+        @brief Batch version of lookup_word, see DataAccess.lookup_words.
+        @param words (list): The Korean words to search for.
+        @param language (str): The language of the definitions.
+        @return a dictionary mapping each found word to its list of (entry, hanja_meanings, hanja).
+        """
+        results = {}
+        for word in dict.fromkeys(words):
+            entries = self.lookup_word(word, language)
+            if entries:
+                results[word] = entries
+        return results
+
+    def get_word_by_korean(self, korean_word, language, hanja_characters=None):
+        """!
+        @brief Fetches a word entry by its Korean text.
+        @param korean_word: The Korean word to search for.
+        @param language: The language for the definition
+        @param hanja_characters: Characters the hanja of the entries must all contain.
+        @return: A list of matching entries.
+        """
+        lemma_column, definition_column = ENTRY_LANGUAGE_COLUMNS.get(language, ENTRY_LANGUAGE_COLUMNS['en'])
+        return [
+            (entry.glossary, getattr(entry, lemma_column), getattr(entry, definition_column), entry.pronounciation)
+            for entry in self.word_entries(korean_word)
+            if hanja_characters is None or all(char in (entry.hanja or '') for char in hanja_characters)
+        ]
+
+    def get_related_words(self, hanja_character, language, original_word=None, after_id=0, limit=RELATED_WORDS_PAGE_SIZE):
+        """!
+        @brief Gets a page of the words that contains the specified hanja character, see DataAccess.get_related_words.
+        @param hanja_character: the hanja character to search for.
+        @param language: The language for the definition
+        @param original_word: The word whose related words are searched, excluded from the results.
+        @param after_id: The cursor returned with the previous page, 0 for the first page.
+        @param limit: The maximum number of words in the page.
+        @return: A dictionary with the matching entries of the page (`words`) and the cursor of the next page (`next`).
+        """
+        if not hanja_character:
+            return {"words": [], "next": None}
+        lemma_column, definition_column = ENTRY_LANGUAGE_COLUMNS.get(language, ENTRY_LANGUAGE_COLUMNS['en'])
+        seen_hanja_pairs = set()
+        words = []
+        last_id = after_id
+        for entry in self.char_entries(hanja_character[0]):
+            hanja = entry.hanja
+            if hanja_character not in hanja or hanja[:2] in seen_hanja_pairs:
+                continue
+            word = entry.word
+            if word == original_word:
+                continue
+            seen_hanja_pairs.add(hanja[:2])
+            if entry.id <= after_id:
+                continue
+            if len(words) == limit:
+                return {"words": words, "next": last_id}
+            words.append({
+                "word": word,
+                "hanja": hanja,
+                "glossary": entry.glossary,
+                "lemma": getattr(entry, lemma_column),
+                "definition": getattr(entry, definition_column),
+            })
+            last_id = entry.id
+        return {"words": words, "next": None}
+
+    def get_all_words(self):
+        """!
+        @brief Retrieves every word with its English and French lemmas, used to build the autocomplete index.
+        @return A list of tuples (word, englishLemma, frenchLemma), sorted by word then id.
+        """
+        return [(entry.word, entry.englishLemma, entry.frenchLemma) for entry in self.all_entries()]
+
+    def get_hanja_words(self):
+        """!
+        @brief Retrieves every word written with hanja, used to build the annotation automaton.
+        @return A list of tuples (word, hanja), sorted by word then id.
+        """
+        return [(entry.word, entry.hanja) for entry in self.all_entries() if entry.hanja]
@@ -0,0 +1,184 @@
+#! @file src/translation.py
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.config import TRANSLATION_BACKEND, TRANSLATION_CACHE_PATH, TRANSLATION_BATCH_SIZE, TRANSLATION_WORKERS
+
+class Translator:
+    """!
+    @brief Interface of the translation backends used during the ingestion.
+    """
+    name = None
+
+    def __init__(self, source='en', target='fr'):
+        """!
+        @brief Initializes the translator for a pair of languages.
+        @param source Language of the texts.
+        @param target Language of the translations.
+        """
+        self.source = source
+        self.target = target
+
+    def translate_batch(self, texts):
+        """!
+        @brief Translates a list of texts.
+        @param texts A list of strings.
+        @return The list of the translations, in the same order.
+        """
+        raise NotImplementedError
+
+    def translate_many(self, texts):
+        """!
+        @brief Translates every distinct text once.
+        @param texts An iterable of strings, possibly repeated.
+        @return A dictionary mapping each text to its translation.
+        """
+        unique_texts = list(dict.fromkeys(text for text in texts if text))
+        return dict(zip(unique_texts, self.translate_batch(unique_texts)))
+
+
+class GoogleTranslatorBackend(Translator):
+    """!
+    @brief Translates with Google Translate through deep_translator.
+    """
+    name = 'google'
+
+    def translate_batch(self, texts):
+        """!
+        @brief Translates a list of texts, one request per text.
+        @param texts A list of strings.
+        @return The list of the translations, in the same order.
+        """
+        # Only needed while ingesting, so it isn't imported with the module
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source=self.source, target=self.target).translate_batch(texts)
+
+
+class OfflineTranslator(Translator):
+    """!
+    @brief Stub backend leaving the texts untranslated, to run the ingestion without network access.
+    """
+    name = 'offline'
+
+    def translate_batch(self, texts):
+        """!
+        @brief Leaves the texts untranslated.
+        @param texts A list of strings.
+        @return A list of None, one per text.
+        """
+        return [None] * len(texts)
+
+
+class CachedTranslator(Translator):
+    """!
+    @brief Wraps a backend with an on-disk SQLite memo cache keyed by (source, target, text).
+    Texts missing from the cache are sent to the backend in batches translated by a bounded
+    thread pool, and each batch is saved as soon as it is done, so an interrupted run resumes
+    where it stopped.
+    """
+
+    def __init__(self, backend, cache_path=TRANSLATION_CACHE_PATH, batch_size=TRANSLATION_BATCH_SIZE, workers=TRANSLATION_WORKERS):
+        """!
+        @brief Initializes the cache around a backend.
+        @param backend The Translator doing the actual translations.
+        @param cache_path Path to the SQLite file of the cache.
+        @param batch_size Number of texts sent to the backend by one task.
+        @param workers Maximum number of batches translated at the same time.
+        """
+        super().__init__(backend.source, backend.target)
+        self.name = backend.name
+        self.backend = backend
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.workers = workers
+        conn = sqlite3.connect(self.cache_path)
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS translations (
+            source TEXT NOT NULL,
+            target TEXT NOT NULL,
+            text TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            PRIMARY KEY (source, target, text)
+        ) WITHOUT ROWID
+        ''')
+        conn.commit()
+        conn.close()
+
+    def translate_batch(self, texts):
+        """!
+        @brief Translates a list of texts, using the cache when possible.
+        @param texts A list of strings.
+        @return The list of the translations, in the same order, None for the texts left untranslated.
+        """
+        translations = self.translate_many(texts)
+        return [translations.get(text) for text in texts]
+
+    def translate_many(self, texts):
+        """!
+        @brief Translates every distinct text once, using the cache when possible.
+        @param texts An iterable of strings, possibly repeated.
+        @return A dictionary mapping each text to its translation. The texts of a batch the backend
+                failed to translate are left out.
+        """
+        unique_texts = list(dict.fromkeys(text for text in texts if text))
+        conn = sqlite3.connect(self.cache_path)
+        try:
+            translations = self._cached(conn, unique_texts)
+            missing = [text for text in unique_texts if text not in translations]
+            if missing:
+                print(f"{len(translations)} translations found in the cache, {len(missing)} to translate.")
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(self.backend.translate_batch, batch): batch for batch in batches}
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        results = dict(zip(batch, future.result()))
+                    except Exception as e:
+                        # Left untranslated and out of the cache, so the next run tries them again
+                        print(f"Error translating a batch of {len(batch)} texts: {e}")
+                        continue
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO translations (source, target, text, translation) VALUES (?, ?, ?, ?)',
+                        [(self.source, self.target, text, translation) for text, translation in results.items() if translation is not None]
+                    )
+                    conn.commit()
+                    translations.update(results)
+        finally:
+            conn.close()
+        return translations
+
+    def _cached(self, conn, texts):
+        """!
+        @brief Looks up texts in the cache.
+        @param conn Connection to the cache.
+        @param texts A list of distinct strings.
+        @return A dictionary mapping the texts found in the cache to their translation.
+        """
+        translations = {}
+        # Stay under the default limit of SQL variables
+        for i in range(0, len(texts), 500):
+            chunk = texts[i:i + 500]
+            cursor = conn.execute(
+                'SELECT text, translation FROM translations WHERE source = ? AND target = ? AND text IN ({seq})'.format(
+                    seq=','.join(['?'] * len(chunk))
+                ),
+                [self.source, self.target] + chunk
+            )
+            translations.update(cursor.fetchall())
+        return translations
+
+
+def get_translator(name=TRANSLATION_BACKEND, source='en', target='fr'):
+    """!
+    @brief Creates the translator used by the ingestion.
+    @param name `google` for Google Translate behind the memo cache, `offline` for the stub.
+    @param source Language of the texts.
+    @param target Language of the translations.
+    @return A Translator.
+    """
+    if name == 'offline':
+        # Never cached, the definitions it leaves untranslated are translated by the next ingestion
+        return OfflineTranslator(source, target)
+    if name == 'google':
+        return CachedTranslator(GoogleTranslatorBackend(source, target))
+    raise ValueError(f"Unknown translator '{name}'.")
@@ -1,4 +1,4 @@
-function toggleDetails(hanja, original_word, text_language_no_related, text_language_error) {
+function toggleDetails(hanja, original_word, text_language_no_related, text_language_error, text_language_more) {
     const detailsDiv = document.getElementById(`details-${hanja}`);
     const resultItem = detailsDiv.closest('.result-item'); // Get the parent .result-item
     if (detailsDiv) {
@@ -14,16 +14,18 @@ function toggleDetails(hanja, original_word, text_language_no_related, text_lang
 
         // If it's visible and data isn't loaded, fetch related words
         if (detailsDiv.classList.contains('visible') && !detailsDiv.dataset.loaded) {
-            fetchRelatedWords(hanja, detailsDiv, original_word, text_language_no_related, text_language_error);
+            fetchRelatedWords(hanja, detailsDiv, original_word, text_language_no_related, text_language_error, text_language_more);
         }
     }
 }
 
 
-async function fetchRelatedWords(hanja, container, originalWord, text_language_no_related, text_language_error) {
+// Fetch a page of related words, the next pages are loaded when the "more" button is clicked
+async function fetchRelatedWords(hanja, container, originalWord, text_language_no_related, text_language_error, text_language_more, after = 0) {
     try {
         // Fetch data from your server
-        const response = await fetch(`/related-words?hanja=${encodeURIComponent(hanja)}&original_word=${encodeURIComponent(originalWord)}`);
+        // The language is part of the URL so the response can be cached by the CDN
+        const response = await fetch(`/related-words?hanja=${encodeURIComponent(hanja)}&original_word=${encodeURIComponent(originalWord)}&lang=${encodeURIComponent(container.dataset.language)}&after=${after}`);
         const data = await response.json();
         // Escape special characters to prevent XSS
         const sanitizeHTML = (str) =>
@@ -34,10 +36,19 @@ async function fetchRelatedWords(hanja, container, originalWord, text_language_n
                 .replace(/"/g, "&quot;")
                 .replace(/'/g, "&#39;");
 
+        // The first page replaces the loading message, the next ones are appended
+        if (after === 0) {
+            container.innerHTML = '';
+        }
+        const moreButton = container.querySelector('.related-more-button');
+        if (moreButton) {
+            moreButton.remove();
+        }
+
         // Check if data is not empty
-        if (data.length > 0) {
+        if (data.words.length > 0) {
             // Populate the container with the related words based on language
-            container.innerHTML = data
+            container.insertAdjacentHTML('beforeend', data.words
                 .map((word) => {
                     const sanitizedWord = sanitizeHTML(word.word);
                     const sanitizedHanja = sanitizeHTML(word.hanja);
@@ -51,12 +62,25 @@ async function fetchRelatedWords(hanja, container, originalWord, text_language_n
                         </form>
                     `;
                 })
-                .join('');
-        } else {
+                .join(''));
+        } else if (after === 0) {
             // Display a message if no related words are found
             container.innerHTML = `${text_language_no_related}`;
         }
 
+        // Button loading the next page
+        if (data.next !== null) {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'related-word-button related-more-button';
+            button.textContent = text_language_more || '…';
+            button.addEventListener('click', () => {
+                button.disabled = true;
+                fetchRelatedWords(hanja, container, originalWord, text_language_no_related, text_language_error, text_language_more, data.next);
+            });
+            container.appendChild(button);
+        }
+
         // Mark as loaded to avoid re-fetching
         container.dataset.loaded = true;
     } catch (error) {
@@ -65,6 +89,47 @@ async function fetchRelatedWords(hanja, container, originalWord, text_language_n
     }
 }
 
+// Suggest words while the user types in the search bar
+let autocompleteController = null;
+
+async function fetchSuggestions(input, datalist) {
+    const query = input.value.trim();
+    // Cancel the request of the previous keystroke
+    if (autocompleteController) {
+        autocompleteController.abort();
+    }
+    if (!query) {
+        datalist.innerHTML = '';
+        return;
+    }
+    autocompleteController = new AbortController();
+    try {
+        const response = await fetch(`/autocomplete?q=${encodeURIComponent(query)}&lang=${encodeURIComponent(input.dataset.language)}`, { signal: autocompleteController.signal });
+        const suggestions = await response.json();
+        datalist.innerHTML = '';
+        suggestions.forEach((suggestion) => {
+            const option = document.createElement('option');
+            option.value = suggestion.word;
+            if (suggestion.lemma) {
+                option.label = suggestion.lemma;
+            }
+            datalist.appendChild(option);
+        });
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error fetching suggestions:', error);
+        }
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const datalist = document.getElementById('autocomplete-words');
+    const input = document.querySelector('.search-bar input[name="word"]');
+    if (datalist && input) {
+        input.addEventListener('input', () => fetchSuggestions(input, datalist));
+    }
+});
+
 const playButton = document.getElementById("play-button");
 
 // Check if the playButton exists before adding the event listener
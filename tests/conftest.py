@@ -0,0 +1,18 @@
+import pytest
+
+from src.cache import dataset_generation, response_cache, result_cache
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """!
+    @brief Points the connections to an empty database in a temporary folder, with empty caches.
+    @return The path of the database.
+    """
+    path = str(tmp_path / 'hanja.db')
+    monkeypatch.setattr('src.database.DATABASE_PATH', path)
+    # The generations of two test databases are the same numbers
+    dataset_generation.invalidate()
+    result_cache.clear()
+    response_cache.clear()
+    return path
@@ -0,0 +1,97 @@
+import pytest
+
+from src.data_access import DataAccess
+
+
+@pytest.fixture
+def client(database):
+    DataAccess().initialize_database()
+    from api.app import app
+    return app.test_client()
+
+
+def test_unknown_language_of_the_cookie_redirects_to_french(client):
+    client.set_cookie('localhost', 'language', 'de')
+    response = client.get('/w/%EA%B3%B5%EB%B6%80')
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('lang=fr')
+
+
+def test_unknown_language_is_not_stored(client):
+    response = client.post('/set_language', data={'language': 'de'})
+    assert 'language=fr' in response.headers['Set-Cookie']
+    with client.session_transaction() as session:
+        assert session['language'] == 'fr'
+
+
+def test_lookup_falls_back_to_the_preferred_language(client):
+    client.set_cookie('localhost', 'language', 'en')
+    response = client.post('/api/lookup', json={'words': ['공부'], 'lang': 'de'})
+    assert response.get_json()['language'] == 'en'
+    response = client.post('/api/lookup', json={'words': ['공부'], 'lang': ['fr']})
+    assert response.get_json()['language'] == 'en'
+    response = client.post('/api/lookup', json={'words': ['공부'], 'lang': 'fr'})
+    assert response.get_json()['language'] == 'fr'
+
+
+def test_annotate_falls_back_to_the_preferred_language(client):
+    client.set_cookie('localhost', 'language', 'en')
+    response = client.post('/annotate', json={'text': '공부를 하다', 'lang': 'de'})
+    assert response.status_code == 200
+    assert response.get_json()['language'] == 'en'
+    response = client.post('/annotate', json={'text': '공부를 하다', 'lang': 'fr'})
+    assert response.get_json()['language'] == 'fr'
+
+
+def test_autocomplete_limit_is_clamped(client, monkeypatch):
+    data_access = DataAccess()
+    data_access.begin_load()
+    data_access.insert_data([{'word': word} for word in ('공부', '공부하다', '공항', '공원')])
+    data_access.end_load()
+    monkeypatch.setattr('src.autocomplete._index', None)
+    assert len(client.get('/autocomplete?q=공&limit=-3').get_json()) == 1
+    assert len(client.get('/autocomplete?q=공&limit=0').get_json()) == 1
+    assert len(client.get('/autocomplete?q=공&limit=3').get_json()) == 3
+
+
+def word_page_etag(client, **headers):
+    response = client.get('/w/%EA%B3%B5%EB%B6%80?lang=en', headers=headers)
+    assert response.status_code == 200
+    return response.get_etag()[0]
+
+
+def test_matching_etag_gets_an_empty_304(client):
+    etag = word_page_etag(client)
+    response = client.get('/w/%EA%B3%B5%EB%B6%80?lang=en', headers={'If-None-Match': '"{}"'.format(etag)})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.get_etag()[0] == etag
+
+
+def test_each_encoding_has_its_own_etag(client):
+    etag = word_page_etag(client)
+    response = client.get('/w/%EA%B3%B5%EB%B6%80?lang=en', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.get_etag()[0] == etag + '-gzip'
+    response = client.get('/w/%EA%B3%B5%EB%B6%80?lang=en', headers={'If-None-Match': '"{}-gzip"'.format(etag)})
+    assert response.status_code == 304
+
+
+def test_etag_changes_with_the_dataset_generation(client):
+    etag = word_page_etag(client)
+    data_access = DataAccess()
+    data_access.begin_load()
+    data_access.insert_data([{'word': '공부', 'hanja': '工夫', 'glossary': '학문이나 기술을 배우고 익힘.'}])
+    data_access.end_load()
+    assert word_page_etag(client) != etag
+    response = client.get('/w/%EA%B3%B5%EB%B6%80?lang=en', headers={'If-None-Match': '"{}"'.format(etag)})
+    assert response.status_code == 200
+    assert '학문이나 기술을 배우고 익힘.' in response.get_data(as_text=True)
+
+
+def test_brotli_has_its_own_etag(client):
+    pytest.importorskip('brotli')
+    etag = word_page_etag(client)
+    response = client.get('/w/%EA%B3%B5%EB%B6%80?lang=en', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.get_etag()[0] == etag + '-br'
@@ -0,0 +1,56 @@
+import asyncio
+
+from api.asgi import AsgiAdapter
+from src.metrics import record_statement, request_queries, start_request
+
+SCOPE = {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'', 'headers': []}
+
+
+def streaming_app(counts):
+    """!
+    @brief WSGI application streaming 1200 chunks of 100 bytes, executing a statement for each of them.
+    @param counts List receiving the number of statements counted for the request.
+    """
+    def wsgi_app(environ, start_response):
+        start_request()
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+
+        def body():
+            for _ in range(1200):
+                record_statement('SELECT 1', 0.0, 1)
+                yield b'x' * 100
+            counts.append(request_queries())
+        return body()
+    return wsgi_app
+
+
+def serve(adapter):
+    """!
+    @brief Sends a GET request to an ASGI application.
+    @return The messages sent by the application.
+    """
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(adapter.http(SCOPE, receive, send))
+    return messages
+
+
+def test_small_chunks_are_sent_together():
+    messages = serve(AsgiAdapter(streaming_app([])))
+    body = b''.join(message.get('body', b'') for message in messages)
+    assert len(body) == 120000
+    # The start, two parts of 64 KB at most and the end of the body
+    assert len(messages) == 4
+
+
+def test_statements_are_counted_across_threads():
+    counts = []
+    # Small parts, so the steps of the request run in several threads of the pool
+    serve(AsgiAdapter(streaming_app(counts), threads=4, buffer_size=1000))
+    assert counts == [1200]
@@ -0,0 +1,46 @@
+from src.cache import cached, result_cache, rows_size
+
+
+class Pages:
+    """!
+    @brief Read methods returning pages of rows in a dictionary, like DataAccess.get_related_words.
+    """
+
+    def get_dataset_generation(self):
+        return 1
+
+    def __init__(self):
+        self.calls = 0
+
+    @cached('test-pages', size=rows_size('words'))
+    def page(self, number, rows=30):
+        self.calls += 1
+        return {'words': [(number, row) for row in range(rows)], 'next': None}
+
+
+def test_dictionary_results_are_sized_by_their_rows(monkeypatch):
+    monkeypatch.setattr(result_cache, 'max_size', 100)
+    result_cache.clear()
+    pages = Pages()
+    for number in range(4):
+        pages.page(number, 30)
+
+    stats = result_cache.stats()
+    # 4 pages of 31 rows don't fit in 100 rows : the first one was evicted
+    assert stats['size'] == 93
+    assert stats['entries'] == 3
+    assert stats['evictions'] == 1
+    result_cache.clear()
+
+
+def test_key_does_not_depend_on_how_the_arguments_are_passed():
+    result_cache.clear()
+    pages = Pages()
+    first = pages.page(1, 30)
+    assert pages.page(1) is first
+    assert pages.page(number=1, rows=30) is first
+    assert pages.page(1, rows=30) is first
+    assert pages.calls == 1
+    pages.page(1, 20)
+    assert pages.calls == 2
+    result_cache.clear()
@@ -0,0 +1,59 @@
+import sqlite3
+
+from src.data_access import DataAccess
+
+ENTRIES = [
+    {'word': '공부하다', 'hanja': '工夫하다', 'glossary': '학문이나 기술을 배우고 익히다.'},
+    {'word': '공부', 'hanja': '工夫', 'glossary': '학문이나 기술을 배우고 익힘.'},
+    {'word': '하다', 'hanja': None, 'glossary': '사람이나 동물이 행동을 이루다.'},
+]
+
+
+def test_only_ideographs_are_indexed(database):
+    data_access = DataAccess()
+    data_access.initialize_database()
+    data_access.begin_load()
+    data_access.insert_data(ENTRIES)
+    data_access.end_load()
+
+    conn = sqlite3.connect(database)
+    indexed = conn.execute('SELECT DISTINCT character FROM word_hanja_chars').fetchall()
+    stats = conn.execute('SELECT character, word_count, entry_count FROM hanja_char_stats').fetchall()
+    conn.close()
+    assert sorted(indexed) == [('夫',), ('工',)]
+    assert sorted(stats) == [('夫', 2, 2), ('工', 2, 2)]
+
+
+def test_hangul_indexed_by_earlier_versions_is_removed(database):
+    data_access = DataAccess()
+    data_access.initialize_database()
+    data_access.begin_load()
+    data_access.insert_data(ENTRIES)
+    data_access.end_load()
+    # Rows written before the filter of the ideographs, which didn't go through the triggers
+    conn = sqlite3.connect(database)
+    conn.execute("INSERT INTO word_hanja_chars (character, position, word_id) SELECT '하', 2, id FROM korean_words WHERE word = '공부하다'")
+    conn.execute("INSERT INTO hanja_char_words (character, word, entry_count) VALUES ('하', '공부하다', 1)")
+    conn.execute("INSERT INTO hanja_char_stats (character, word_count, entry_count, first_word_id) VALUES ('하', 1, 1, 1)")
+    conn.commit()
+    conn.close()
+
+    data_access.initialize_database()
+    conn = sqlite3.connect(database)
+    assert conn.execute("SELECT COUNT(*) FROM word_hanja_chars WHERE character = '하'").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM hanja_char_words WHERE character = '하'").fetchone()[0] == 0
+    assert sorted(conn.execute('SELECT character FROM hanja_char_stats').fetchall()) == [('夫',), ('工',)]
+    conn.close()
+
+
+def test_word_by_korean_with_hangul_in_its_hanja(database):
+    data_access = DataAccess()
+    data_access.initialize_database()
+    data_access.begin_load()
+    data_access.insert_data(ENTRIES)
+    data_access.end_load()
+
+    entries = data_access.get_word_by_korean('공부하다', 'en', '工夫하다')
+    assert [entry[0] for entry in entries] == ['학문이나 기술을 배우고 익히다.']
+    assert data_access.get_word_by_korean('공부하다', 'en', '工하다') == entries
+    assert data_access.get_word_by_korean('공부하다', 'en', '人하다') == []
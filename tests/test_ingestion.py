@@ -0,0 +1,90 @@
+import json
+import os
+import sqlite3
+
+from benchmarks.synthetic import generate
+from src.data_access import DataAccess
+from src.main import main
+
+HANJA_LINES = '[가]\n價=값 가, price, value (15)\n[인]\n人=사람 인, man, person (2)\n'
+
+
+def dump(path):
+    """!
+    @brief Reads the words of a database with their senses, without their ids.
+    @return A sorted list of tuples.
+    """
+    conn = sqlite3.connect(path)
+    rows = conn.execute('''
+    SELECT word, hanja, glossary, englishLemma, englishDefinition, frenchLemma, frenchDefinition, pronounciation,
+           (SELECT json_group_array(json_array(sense_number, definition)) FROM senses WHERE word_id = korean_words.id),
+           (SELECT json_group_array(json_array(language, sense_number, lemma, definition)) FROM equivalents WHERE word_id = korean_words.id)
+    FROM korean_words
+    ''').fetchall()
+    characters = conn.execute('SELECT character, word_count, entry_count, rank FROM hanja_char_stats').fetchall()
+    conn.close()
+    return sorted(rows, key=repr), sorted(characters)
+
+
+def rewrite(path, change):
+    """!
+    @brief Changes the entries of a JSON file of the dump.
+    @param change Function receiving the list of the entries and returning the new one.
+    """
+    with open(path, encoding='utf-8') as file:
+        document = json.load(file)
+    lexicon = document['LexicalResource']['Lexicon']
+    lexicon['LexicalEntry'] = change(lexicon['LexicalEntry'])
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(document, file, ensure_ascii=False)
+
+
+def rebuild(monkeypatch, path, folder, hanja_path):
+    """!
+    @brief Builds a new database from every file of the dump.
+    @return The content of the database, see dump.
+    """
+    with monkeypatch.context() as context:
+        context.setattr('src.database.DATABASE_PATH', path)
+        main(translator='offline', folder_path=folder, hanja_path=hanja_path)
+    return dump(path)
+
+
+def test_incremental_ingestion_matches_full_rebuild(database, tmp_path, monkeypatch):
+    folder = str(tmp_path / 'dump')
+    hanja_path = str(tmp_path / 'hanja.txt')
+    with open(hanja_path, 'w', encoding='utf-8') as file:
+        file.write(HANJA_LINES)
+    paths = generate(folder, 1200, per_file=300, seed=0)
+    sources = [os.path.basename(path) for path in paths]
+    main(translator='offline', folder_path=folder, hanja_path=hanja_path)
+    # The common words of the synthetic dictionary are found in several files
+    assert DataAccess().get_sharing_sources(sources[1:3])
+
+    # A file changes : its first entries are removed and the lemmas of the others change
+    rewrite(paths[1], lambda entries: json.loads(json.dumps(entries[50:], ensure_ascii=False).replace('meaning ', 'new meaning ')))
+    main(translator='offline', folder_path=folder, hanja_path=hanja_path)
+    assert dump(database) == rebuild(monkeypatch, str(tmp_path / 'changed.db'), folder, hanja_path)
+
+    # A file is removed
+    os.remove(paths[2])
+    main(translator='offline', folder_path=folder, hanja_path=hanja_path)
+    assert dump(database) == rebuild(monkeypatch, str(tmp_path / 'removed.db'), folder, hanja_path)
+
+
+def test_secondary_indexes_are_kept_by_incremental_ingestion(database, tmp_path, monkeypatch):
+    folder = str(tmp_path / 'dump')
+    hanja_path = str(tmp_path / 'hanja.txt')
+    with open(hanja_path, 'w', encoding='utf-8') as file:
+        file.write(HANJA_LINES)
+    paths = generate(folder, 600, per_file=300, seed=1)
+    main(translator='offline', folder_path=folder, hanja_path=hanja_path)
+    rewrite(paths[1], lambda entries: entries[10:])
+    dropped = []
+    monkeypatch.setattr(DataAccess, 'drop_secondary_indexes', lambda self, cursor: dropped.append(True))
+    main(translator='offline', folder_path=folder, hanja_path=hanja_path)
+    conn = sqlite3.connect(database)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert not dropped
+    assert {'idx_word_hanja_chars_word_id', 'idx_korean_words_word_id'} <= indexes
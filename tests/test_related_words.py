@@ -0,0 +1,59 @@
+import pytest
+
+from src.data_access import DataAccess
+from src.memory_store import MemoryDataAccess
+
+ENTRIES = [
+    {'word': '학교', 'hanja': '學校'},
+    {'word': '학생', 'hanja': '學生'},
+    # Same leading pair as 학생 : only the first word is kept
+    {'word': '학생회', 'hanja': '學生會'},
+    {'word': '과학', 'hanja': '科學'},
+    {'word': '수학', 'hanja': '數學'},
+    {'word': '문학', 'hanja': '文學'},
+    {'word': '공부', 'hanja': '工夫'},
+    {'word': '대학', 'hanja': '大學'},
+    {'word': '학자', 'hanja': '學者'},
+    {'word': '학문', 'hanja': '學問'},
+]
+
+
+@pytest.fixture
+def data_access(database):
+    data_access = DataAccess()
+    data_access.initialize_database()
+    data_access.begin_load()
+    data_access.insert_data(ENTRIES)
+    data_access.end_load()
+    return data_access
+
+
+def walk(data_access, original_word, limit):
+    """!
+    @brief Reads every page of the related words of 學.
+    @return The list of the pages.
+    """
+    pages = [data_access.get_related_words('學', 'en', original_word, 0, limit)]
+    while pages[-1]['next'] is not None:
+        pages.append(data_access.get_related_words('學', 'en', original_word, pages[-1]['next'], limit))
+    return pages
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 7, 8])
+def test_pages_have_no_duplicates_nor_gaps(data_access, limit):
+    pages = walk(data_access, '학교', limit)
+    words = [word['word'] for page in pages for word in page['words']]
+    assert words == ['학생', '과학', '수학', '문학', '대학', '학자', '학문']
+    assert all(len(page['words']) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]['words']) <= limit
+    assert pages[-1]['next'] is None
+
+
+def test_without_original_word(data_access):
+    pages = walk(data_access, None, 4)
+    words = [word['word'] for page in pages for word in page['words']]
+    assert words == ['학교', '학생', '과학', '수학', '문학', '대학', '학자', '학문']
+
+
+def test_memory_store_gives_the_same_pages(data_access):
+    assert walk(MemoryDataAccess(), '학교', 3) == walk(data_access, '학교', 3)
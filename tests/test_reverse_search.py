@@ -0,0 +1,61 @@
+import pytest
+
+from src.data_access import DataAccess
+
+ENTRIES = [
+    # The searched word in the definition only
+    {'word': '값어치', 'glossary': '일정한 값에 해당하는 분량.', 'englishLemma': 'worth', 'englishDefinition': 'The price of something.'},
+    # The searched word in the lemma
+    {'word': '가격', 'hanja': '價格', 'glossary': '물건의 값.', 'englishLemma': 'price', 'englishDefinition': 'The value of an object.'},
+    {'word': '물가', 'hanja': '物價', 'glossary': '물건의 값.', 'englishLemma': 'cost of living', 'englishDefinition': 'The price of goods in general.'},
+] + [
+    {'word': '단어{}'.format(number), 'glossary': '단어.', 'englishLemma': 'word {}'.format(number), 'englishDefinition': 'A common word.'}
+    for number in range(7)
+]
+
+
+@pytest.fixture
+def data_access(database):
+    data_access = DataAccess()
+    data_access.initialize_database()
+    data_access.begin_load()
+    data_access.insert_data(ENTRIES)
+    data_access.end_load()
+    return data_access
+
+
+def test_lemma_matches_rank_first(data_access):
+    results = data_access.reverse_search('price', 'en')['results']
+    words = [result['word'] for result in results]
+    assert words[0] == '가격'
+    assert sorted(words[1:]) == ['값어치', '물가']
+
+
+def test_every_term_must_match(data_access):
+    results = data_access.reverse_search('price goods', 'en')['results']
+    assert [result['word'] for result in results] == ['물가']
+
+
+@pytest.mark.parametrize('text', ['"price', 'price*', '(price)', 'price^', '-price', 'price"'])
+def test_syntax_of_the_user_is_ignored(data_access, text):
+    results = data_access.reverse_search(text, 'en')['results']
+    assert len(results) == 3
+
+
+def test_operators_are_searched_as_words(data_access):
+    # Quoted, OR is a word that no entry contains, and NOT doesn't exclude anything
+    assert data_access.reverse_search('price OR worth', 'en')['results'] == []
+    assert data_access.reverse_search('price NOT goods', 'en')['results'] == []
+    assert data_access.reverse_search('NEAR(price worth)', 'en')['results'] == []
+    assert data_access.reverse_search('englishLemma:price', 'en')['results'] == []
+
+
+def test_no_terms(data_access):
+    assert data_access.reverse_search('"*-', 'en') == {'results': [], 'page': 1, 'has_more': False}
+
+
+def test_pages_do_not_overlap(data_access):
+    pages = [data_access.reverse_search('common word', 'en', page, 3) for page in (1, 2, 3)]
+    assert [page['has_more'] for page in pages] == [True, True, False]
+    words = [result['word'] for page in pages for result in page['results']]
+    assert sorted(words) == sorted('단어{}'.format(number) for number in range(7))
@@ -0,0 +1,27 @@
+from src.data_access import DataAccess
+from src.data_processing import DataProcessor
+from src.memory_store import MemoryDataAccess
+from src.translation import get_translator
+
+
+def insert_hanja(lines):
+    hanja_dict = DataProcessor(None).process_hanja_data(lines, get_translator('offline'))
+    DataAccess().insert_hanja_data(hanja_dict, replace=True)
+
+
+def test_routes_reading_the_database_follow_its_generation(database):
+    data_access = DataAccess()
+    data_access.initialize_database()
+    data_access.begin_load()
+    data_access.insert_data([{'word': '가격', 'hanja': '價格', 'glossary': '물건의 값.'}])
+    data_access.end_load()
+    insert_hanja(['[가]', '價=값 가, price, value (15)'])
+    store_access = MemoryDataAccess()
+    generation = store_access.get_dataset_generation()
+    assert [row['character'] for row in store_access.get_hanja_by_reading('가', 'en')] == ['價']
+
+    # The store keeps its entries, the characters are read from the database again
+    insert_hanja(['[가]', '價=값 가, price, value (15)', '家=집 가, house (10)'])
+    assert store_access.get_dataset_generation() != generation
+    assert [row['character'] for row in store_access.get_hanja_by_reading('가', 'en')] == ['家', '價']
+    assert store_access.lookup_word('가격', 'en')
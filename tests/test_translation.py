@@ -0,0 +1,34 @@
+import sqlite3
+
+from src.translation import CachedTranslator, Translator
+
+
+class FlakyBackend(Translator):
+    """!
+    @brief Backend failing on the batches containing a given text.
+    """
+    name = 'flaky'
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = failing
+
+    def translate_batch(self, texts):
+        if self.failing in texts:
+            raise ConnectionError("Too many requests")
+        return [text.upper() for text in texts]
+
+
+def test_failed_batches_are_left_untranslated_and_retried(tmp_path):
+    cache_path = str(tmp_path / 'translations.db')
+    texts = ['one', 'two', 'three', 'four']
+    translator = CachedTranslator(FlakyBackend('three'), cache_path=cache_path, batch_size=2, workers=2)
+    assert translator.translate_batch(texts) == ['ONE', 'TWO', None, None]
+
+    conn = sqlite3.connect(cache_path)
+    cached = sorted(row[0] for row in conn.execute('SELECT text FROM translations'))
+    conn.close()
+    assert cached == ['one', 'two']
+
+    translator = CachedTranslator(FlakyBackend(None), cache_path=cache_path, batch_size=2, workers=2)
+    assert translator.translate_batch(texts) == ['ONE', 'TWO', 'THREE', 'FOUR']